@@ -0,0 +1,7 @@
+# Admin-URLs, erst beim ersten Request unter admin/ importiert (siehe urls.py).
+# SimpleAdminConfig überspringt das Autodiscover beim Start, deshalb hier.
+from django.contrib import admin
+
+admin.autodiscover()
+
+urlpatterns = admin.site.get_urls()
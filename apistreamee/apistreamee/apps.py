@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class ApistreameeConfig(AppConfig):
+    name = "apistreamee"
+
+    def ready(self):
+        from . import slow_queries
+
+        slow_queries.install()
@@ -0,0 +1,136 @@
+"""
+Harness für die opt-in Benchmarks (<app>/benchmarks.py, von `manage.py test`
+nicht gefunden):
+
+    python manage.py test communities.benchmarks integrations.benchmarks
+
+Default klein (eine Größe, wenige Runden). Volle Matrix und Verlauf nur auf Wunsch:
+
+    BENCH_SIZES=10,100,1000 BENCH_REPEAT=15 BENCH_HISTORY=/tmp/bench_history.json \
+        python manage.py test communities.benchmarks
+"""
+import json
+import os
+import statistics
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+# Konfiguration per Env, damit CI und lokale Läufe dieselben Tests nutzen.
+# Ohne BENCH_HISTORY wird nichts geschrieben (und nichts verglichen)
+BENCH_HISTORY = Path(os.environ["BENCH_HISTORY"]) if os.getenv("BENCH_HISTORY") else None
+BENCH_COMPARE = os.getenv("BENCH_COMPARE") == "1"
+BENCH_THRESHOLD = float(os.getenv("BENCH_THRESHOLD", "0.5"))
+BENCH_MIN_DELTA_MS = float(os.getenv("BENCH_MIN_DELTA_MS", "1.0"))
+BENCH_SIZES = [int(s) for s in os.getenv("BENCH_SIZES", "10").split(",") if s]
+BENCH_REPEAT = int(os.getenv("BENCH_REPEAT", "3"))
+BENCH_KEEP_RUNS = 200
+BENCH_BASELINE_RUNS = 5
+
+
+def load_history() -> dict:
+    if BENCH_HISTORY is None:
+        return {"runs": []}
+    try:
+        with open(BENCH_HISTORY, encoding="utf-8") as fh:
+            return json.load(fh)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {"runs": []}
+
+
+def baseline_results(suite: str) -> dict:
+    """
+    Vergleichswerte je Key: Query-Count aus dem jüngsten Lauf, Zeit als
+    Median der letzten BENCH_BASELINE_RUNS Läufe (ein Ausreißer verschiebt
+    die Baseline nicht).
+    """
+    counts, timings = {}, {}
+    for run in load_history()["runs"]:
+        if run["suite"] != suite:
+            continue
+        for key, values in run["results"].items():
+            if "queries" in values:
+                counts[key] = values["queries"]
+            if "min_ms" in values:
+                timings.setdefault(key, []).append(values["min_ms"])
+
+    results = {key: {"queries": n} for key, n in counts.items()}
+    for key, values in timings.items():
+        results.setdefault(key, {})["min_ms"] = statistics.median(values[-BENCH_BASELINE_RUNS:])
+    return results
+
+
+def append_history(suite: str, results: dict) -> None:
+    if not results or BENCH_HISTORY is None:
+        return
+    history = load_history()
+    history["runs"].append(
+        {"suite": suite, "at": datetime.now(timezone.utc).isoformat(timespec="seconds"), "results": results}
+    )
+    history["runs"] = history["runs"][-BENCH_KEEP_RUNS:]
+    BENCH_HISTORY.parent.mkdir(parents=True, exist_ok=True)
+    with open(BENCH_HISTORY, "w", encoding="utf-8") as fh:
+        json.dump(history, fh, indent=2, sort_keys=True)
+
+
+class BenchmarkMixin:
+    """
+    Für TestCase: exakte Query-Counts pro Endpoint plus Micro-Benchmarks
+    (Selector + Serializer). Ergebnisse landen pro Testklasse als ein Lauf
+    in BENCH_HISTORY, falls gesetzt. Mit BENCH_COMPARE=1 schlägt ein Test fehl, wenn er
+    mehr Queries braucht als im letzten Lauf oder seine schnellste Runde um mehr als
+    BENCH_THRESHOLD (und mindestens BENCH_MIN_DELTA_MS) langsamer ist.
+    """
+
+    suite = ""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls._bench_results = {}
+        cls._bench_baseline = baseline_results(cls.suite) if BENCH_COMPARE else {}
+
+    @classmethod
+    def tearDownClass(cls):
+        append_history(cls.suite, cls._bench_results)
+        super().tearDownClass()
+
+    def _record(self, key: str, **values) -> dict:
+        entry = self._bench_results.setdefault(key, {})
+        entry.update(values)
+        return self._bench_baseline.get(key, {})
+
+    def assertQueries(self, key: str, expected: int, func):
+        with CaptureQueriesContext(connection) as ctx:
+            result = func()
+        count = len(ctx.captured_queries)
+        baseline = self._record(key, queries=count)
+
+        sql = "\n".join(q["sql"] for q in ctx.captured_queries)
+        self.assertEqual(count, expected, f"{key}: {count} queries, expected {expected}\n{sql}")
+        if "queries" in baseline:
+            self.assertLessEqual(count, baseline["queries"], f"{key}: query count grew from {baseline['queries']}")
+        return result
+
+    def bench(self, key: str, func, rounds: int = BENCH_REPEAT) -> float:
+        func()  # warm-up (Query-Plan, Serializer-Felder)
+        samples = []
+        for _ in range(rounds):
+            started = time.perf_counter()
+            func()
+            samples.append((time.perf_counter() - started) * 1000)
+
+        # Verglichen wird das Minimum: robuster gegen GC/Scheduler-Ausreißer als der Median
+        best = round(min(samples), 3)
+        baseline = self._record(key, min_ms=best, p50_ms=round(statistics.median(samples), 3))
+        before = baseline.get("min_ms")
+        if before is not None and best - before > BENCH_MIN_DELTA_MS:
+            self.assertLessEqual(
+                best,
+                before * (1 + BENCH_THRESHOLD),
+                f"{key}: {best}ms vs baseline {before}ms (+{(best - before) / before * 100:.0f}%)",
+            )
+        return best
@@ -0,0 +1,105 @@
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+
+# Replica für die Reads des aktuellen Requests. None (Default: Commands, Cron,
+# Hintergrund-Threads, schreibende Requests) -> alles auf den Primary.
+_read_replica: ContextVar = ContextVar("read_replica", default=None)
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+def _pin_key(user_id) -> str:
+    return f"db-pin:{user_id}"
+
+
+def pin_user_to_primary(user) -> None:
+    """
+    Nach einem eigenen Write (join/leave/patch/create) liest der User für
+    DB_REPLICA_PIN_SECONDS vom Primary, damit er seine Änderung sofort sieht,
+    auch wenn die Replica noch hinterherhängt.
+    """
+    if not settings.DATABASE_REPLICAS or not user or not user.is_authenticated:
+        return
+    _read_replica.set(None)
+    cache.set(_pin_key(user.pk), True, settings.DB_REPLICA_PIN_SECONDS)
+
+
+def _user_id_from_bearer(request):
+    """
+    JWT-Auth läuft erst in der DRF-View; hier reicht die (signaturgeprüfte)
+    user_id aus dem Access Token, ohne DB-Lookup.
+    """
+    header = request.META.get("HTTP_AUTHORIZATION", "")
+    if not header.startswith("Bearer "):
+        return None
+
+    from rest_framework_simplejwt.exceptions import TokenError
+    from rest_framework_simplejwt.settings import api_settings
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    try:
+        token = AccessToken(header[len("Bearer "):].strip())
+    except TokenError:
+        return None
+    return token.get(api_settings.USER_ID_CLAIM)
+
+
+class ReplicaPinningMiddleware:
+    """
+    Opt-in für Replicas: nur GET/HEAD/OPTIONS von nicht gepinnten Usern lesen
+    von einer Replica, und zwar von einer pro Request (eine Antwort mischt
+    keine Replicas mit unterschiedlichem Lag).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        replica = None
+        if settings.DATABASE_REPLICAS and request.method in SAFE_METHODS:
+            user_id = _user_id_from_bearer(request)
+            if user_id is None or not cache.get(_pin_key(user_id)):
+                replica = random.choice(settings.DATABASE_REPLICAS)
+
+        token = _read_replica.set(replica)
+        try:
+            return self.get_response(request)
+        finally:
+            _read_replica.reset(token)
+
+
+def read_alias() -> str:
+    """
+    DB-Alias für Reads im aktuellen Kontext. Für Streaming-Antworten, deren
+    Iterator erst nach der Middleware läuft: Alias in der View festhalten.
+    """
+    replica = _read_replica.get()
+    # In einer Transaktion auf dem Primary nie zur Replica: die eigenen, noch nicht committeten Writes fehlen dort
+    if replica is None or connections["default"].in_atomic_block:
+        return "default"
+    return replica
+
+
+class PrimaryReplicaRouter:
+    """
+    Writes -> default. Reads -> default, außer die ReplicaPinningMiddleware
+    hat für den Request eine Replica gewählt (siehe read_alias).
+    """
+
+    def db_for_read(self, model, **hints):
+        return read_alias()
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas spiegeln den Primary -> Relationen über Aliase hinweg sind ok
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == "default"
@@ -0,0 +1,102 @@
+import hashlib
+import time
+import uuid
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import Http404
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.response import Response
+from rest_framework.views import exception_handler
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+_MAX_KEY_LENGTH = 255
+_POLL_INTERVAL = 0.05
+
+
+def _fingerprint(request) -> str:
+    return hashlib.sha256(b"%s %s\n%s" % (request.method.encode(), request.path.encode(), request.body)).hexdigest()
+
+
+def _replay(stored: dict) -> Response:
+    response = Response(stored["data"], status=stored["status"])
+    response[REPLAYED_HEADER] = "true"
+    return response
+
+
+def idempotent(scope: str):
+    """
+    Idempotency-Key für POST-Views (DRF, unterhalb von @api_view bzw. per
+    method_decorator): die erste Antwort (alles < 500) liegt IDEMPOTENCY_TTL
+    Sekunden im Cache und wird bei Retries mit demselben Key ausgeliefert,
+    ohne die View erneut auszuführen. Läuft der erste Request noch, wartet
+    ein Duplikat bis zu IDEMPOTENCY_WAIT_SECONDS auf dessen Ergebnis.
+    Ohne Header unverändert.
+    """
+
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            key = request.headers.get(IDEMPOTENCY_HEADER)
+            if key is None or request.method in ("GET", "HEAD", "OPTIONS"):
+                return view_func(request, *args, **kwargs)
+            if not key or len(key) > _MAX_KEY_LENGTH:
+                return Response(
+                    {"detail": f"{IDEMPOTENCY_HEADER} must be 1-{_MAX_KEY_LENGTH} characters."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+            fingerprint = _fingerprint(request)
+            # Keys gelten pro User. Anonym (z.B. Register) pro Request-Inhalt: sonst teilen sich fremde
+            # Clients mit gleichem Key einen Eintrag und bekämen gegenseitig ihre Antworten/422
+            principal = request.user.pk if request.user.is_authenticated else f"anon-{fingerprint}"
+            cache_key = f"idempotency:{scope}:{principal}:{hashlib.sha256(key.encode()).hexdigest()}"
+            lock_key = f"{cache_key}:lock"
+            token = uuid.uuid4().hex
+
+            deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_SECONDS
+            while True:
+                stored = cache.get(cache_key)
+                if stored is not None:
+                    if stored["fingerprint"] != fingerprint:
+                        return Response(
+                            {"detail": f"{IDEMPOTENCY_HEADER} was already used for a different request."},
+                            status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                        )
+                    return _replay(stored)
+                if cache.add(lock_key, token, settings.IDEMPOTENCY_LOCK_SECONDS):
+                    break
+                if time.monotonic() >= deadline:
+                    return Response(
+                        {"detail": "A request with this idempotency key is still in progress."},
+                        status=status.HTTP_409_CONFLICT,
+                    )
+                time.sleep(_POLL_INTERVAL)
+
+            try:
+                try:
+                    response = view_func(request, *args, **kwargs)
+                except (APIException, Http404) as exc:
+                    # Auch Validierungsfehler speichern (z.B. "Twitch user not found"), sonst läuft der Retry erneut zu Helix
+                    response = exception_handler(exc, {"request": request, "view": None})
+                    if response is None:
+                        raise
+                if response.status_code < 500:
+                    cache.set(
+                        cache_key,
+                        {"fingerprint": fingerprint, "status": response.status_code, "data": response.data},
+                        settings.IDEMPOTENCY_TTL,
+                    )
+                return response
+            finally:
+                # Lief die View länger als IDEMPOTENCY_LOCK_SECONDS, gehört der Lock evtl. schon einem Retry
+                if cache.get(lock_key) == token:
+                    cache.delete(lock_key)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,60 @@
+from django.conf import settings
+from django.core.handlers.exception import convert_exception_to_response
+from django.utils.module_loading import import_string
+
+
+class PathScopedMiddleware:
+    """
+    Baut die Middlewares aus FULL_STACK_MIDDLEWARE als eigene Kette und
+    überspringt sie für Pfade aus LEAN_PATH_PREFIXES (JWT/JSON-API: keine
+    Session, kein CSRF-Cookie, keine Messages). admin/ & Co. laufen wie gehabt
+    durch die volle Kette.
+
+    Django ruft process_view/process_exception nur für Middlewares aus
+    settings.MIDDLEWARE auf, deshalb werden die Hooks hier weitergereicht.
+    """
+
+    sync_capable = True
+    async_capable = False
+
+    def __init__(self, get_response):
+        self.lean = get_response
+        self.prefixes = tuple(settings.LEAN_PATH_PREFIXES)
+
+        self._view_hooks = []
+        self._exception_hooks = []
+        handler = convert_exception_to_response(get_response)
+        for path in reversed(settings.FULL_STACK_MIDDLEWARE):
+            mw = import_string(path)(handler)
+            if hasattr(mw, "process_view"):
+                self._view_hooks.insert(0, mw.process_view)
+            if hasattr(mw, "process_exception"):
+                self._exception_hooks.append(mw.process_exception)
+            handler = convert_exception_to_response(mw)
+        self.full = handler
+
+    def is_lean(self, request) -> bool:
+        return request.path_info.startswith(self.prefixes)
+
+    def __call__(self, request):
+        if self.is_lean(request):
+            return self.lean(request)
+        return self.full(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if self.is_lean(request):
+            return None
+        for hook in self._view_hooks:
+            response = hook(request, view_func, view_args, view_kwargs)
+            if response is not None:
+                return response
+        return None
+
+    def process_exception(self, request, exception):
+        if self.is_lean(request):
+            return None
+        for hook in self._exception_hooks:
+            response = hook(request, exception)
+            if response is not None:
+                return response
+        return None
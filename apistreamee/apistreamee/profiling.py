@@ -0,0 +1,168 @@
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import FileResponse, Http404
+from django.utils.text import slugify
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_ID_HEADER = "X-Profile-Id"
+
+_NAME_RE = re.compile(r"^[\w.-]+\.folded$")
+_write_lock = threading.Lock()
+
+
+class StackSampler:
+    """
+    Sampling-Profiler für genau einen Thread: ein Hilfsthread liest alle
+    `interval` Sekunden dessen aktuellen Stack (sys._current_frames) und
+    zählt ihn. Ergebnis im "collapsed"-Format von flamegraph.pl/speedscope:
+    eine Zeile pro Stack, Frames mit ';' getrennt, am Ende die Anzahl.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.stacks = Counter()
+        self._target = threading.get_ident()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({_short_path(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(stack))] += 1
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+def _short_path(filename: str) -> str:
+    marker = "site-packages" + os.sep
+    if marker in filename:
+        return filename.split(marker, 1)[1]
+    base = str(settings.BASE_DIR) + os.sep
+    return filename[len(base):] if filename.startswith(base) else filename
+
+
+def _profile_dir() -> Path:
+    return Path(settings.PROFILER_DIR)
+
+
+def _store(name: str, content: str) -> None:
+    """Ring-Buffer: nach dem Schreiben nur die neuesten PROFILER_MAX_FILES behalten."""
+    directory = _profile_dir()
+    with _write_lock:
+        directory.mkdir(parents=True, exist_ok=True)
+        (directory / name).write_text(content, encoding="utf-8")
+        files = sorted(directory.glob("*.folded"), key=lambda p: p.name)
+        for old in files[: max(0, len(files) - settings.PROFILER_MAX_FILES)]:
+            old.unlink(missing_ok=True)
+
+
+def _is_admin_request(request) -> bool:
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated:
+        return user.is_staff
+
+    # API-Pfade haben keine Session (lean chain) -> Bearer-Token prüfen
+    from django.contrib.auth import get_user_model
+
+    from .db_router import _user_id_from_bearer
+
+    user_id = _user_id_from_bearer(request)
+    return user_id is not None and get_user_model().objects.filter(pk=user_id, is_staff=True).exists()
+
+
+class SamplingProfilerMiddleware:
+    """
+    Profiliert einen Request, wenn er zufällig gezogen wird
+    (PROFILER_SAMPLE_RATE) oder ein Admin "X-Profile: 1" mitschickt.
+    Ohne PROFILER_ENABLED wird die Middleware gar nicht erst geladen.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PROFILER_ENABLED:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        rate = settings.PROFILER_SAMPLE_RATE
+        sampled = rate > 0 and random.random() < rate
+        forced = not sampled and PROFILE_HEADER in request.headers and _is_admin_request(request)
+        if not (sampled or forced):
+            return self.get_response(request)
+
+        started = time.perf_counter()
+        with StackSampler(settings.PROFILER_INTERVAL_MS / 1000) as sampler:
+            response = self.get_response(request)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        match = getattr(request, "resolver_match", None)
+        label = slugify(match.view_name if match else request.path)[:60] or "root"
+        name = f"{time.time_ns() // 1_000_000}-{request.method}-{label}-{elapsed_ms:.0f}ms.folded"
+        try:
+            _store(name, sampler.folded())
+        except OSError:
+            logger.exception("profiler: could not write %s", name)
+            return response
+
+        if forced:
+            response[PROFILE_ID_HEADER] = name
+        return response
+
+
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def profile_list(request):
+    directory = _profile_dir()
+    files = sorted(directory.glob("*.folded"), key=lambda p: p.name, reverse=True) if directory.exists() else []
+    entries = []
+    for path in files:
+        try:
+            size = path.stat().st_size
+        except FileNotFoundError:
+            # Zwischen glob und stat vom Ring-Buffer eines anderen Workers gelöscht
+            continue
+        entries.append({"name": path.name, "size": size})
+    return Response(entries)
+
+
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def profile_download(request, name: str):
+    path = _profile_dir() / name
+    if not _NAME_RE.match(name):
+        raise Http404()
+    try:
+        handle = open(path, "rb")
+    except (FileNotFoundError, IsADirectoryError):
+        raise Http404()
+    return FileResponse(handle, as_attachment=True, filename=name, content_type="text/plain")
@@ -12,14 +12,19 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 
 from pathlib import Path
 import os
-from dotenv import load_dotenv
+import sys
 from datetime import timedelta
 
 
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
-load_dotenv(BASE_DIR / ".env")
+
+# In Containern kommt die Config aus der Umgebung: python-dotenv nur laden, wenn es eine .env gibt
+if (BASE_DIR / ".env").is_file():
+    from dotenv import load_dotenv
+
+    load_dotenv(BASE_DIR / ".env")
 
 SECRET_KEY = os.getenv("DJANGO_SECRET_KEY", "dev-secret")
 DEBUG = os.getenv("DJANGO_DEBUG", "0") == "1"
@@ -33,15 +38,18 @@ ALLOWED_HOSTS = os.getenv("DJANGO_ALLOWED_HOSTS", "127.0.0.1,localhost").split("
 # SECURITY WARNING: keep the secret key used in production secret!
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
-
-ALLOWED_HOSTS = []
+# DEBUG / ALLOWED_HOSTS kommen aus DJANGO_DEBUG / DJANGO_ALLOWED_HOSTS (siehe oben);
+# mit DEBUG=True hält Django jede Query pro Verbindung im Speicher.
 
 
 # Application definition
 
+# Reine API-Worker brauchen den Admin nicht: DJANGO_ADMIN_ENABLED=0 spart Import und URLs beim Kaltstart.
+# Sonst SimpleAdminConfig: Autodiscover erst beim ersten admin/-Request (apistreamee.admin_urls).
+ADMIN_ENABLED = os.getenv("DJANGO_ADMIN_ENABLED", "1") == "1"
+
 INSTALLED_APPS = [
-    'django.contrib.admin',
+    *(['django.contrib.admin.apps.SimpleAdminConfig'] if ADMIN_ENABLED else []),
     'django.contrib.auth',
     'django.contrib.contenttypes',
     'django.contrib.sessions',
@@ -59,13 +67,25 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
+    'apistreamee.slow_queries.SlowQueryContextMiddleware',
+    'apistreamee.db_router.ReplicaPinningMiddleware',
     'django.middleware.common.CommonMiddleware',
+    'apistreamee.middleware.PathScopedMiddleware',
+    'apistreamee.profiling.SamplingProfilerMiddleware',
+]
+
+# Nur für Nicht-API-Pfade (admin/): JWT-Endpoints brauchen weder Session noch CSRF noch Messages
+FULL_STACK_MIDDLEWARE = [
+    'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
+LEAN_PATH_PREFIXES = ("/auth/", "/communities/", "/me/", "/export/", "/integrations/", "/debug/")
+
+# Admin-Checks suchen Session/Auth/Messages in MIDDLEWARE; sie laufen über FULL_STACK_MIDDLEWARE
+SILENCED_SYSTEM_CHECKS = ["admin.E408", "admin.E409", "admin.E410"]
 
 ROOT_URLCONF = 'apistreamee.urls'
 
@@ -95,17 +115,108 @@ REST_FRAMEWORK = {
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 
-DATABASES = {
-    'default': {
+def _postgres(host: str, port: str) -> dict:
+    cfg = {
         'ENGINE': 'django.db.backends.postgresql',
-        'NAME': 'streameeDB',  # Name Ihrer Datenbank
-        'USER': 'postgres',        # Ihr Datenbankbenutzer  
-        'PASSWORD': 'SimonKucher2022!',  # Ihr Datenbankpasswort
-        'HOST': 'localhost',  # Ihr Datenbankserver (oder eine URL)
-        'PORT': '5432',  # Der Port Ihrer Datenbank
+        'NAME': os.getenv("DB_NAME", "streameeDB"),
+        'USER': os.getenv("DB_USER", "postgres"),
+        'PASSWORD': os.getenv("DB_PASSWORD", ""),
+        'HOST': host,
+        'PORT': port,
+        # Persistente Verbindungen statt connect() pro Request; vor Wiederverwendung geprüft
+        'CONN_MAX_AGE': int(os.getenv("DB_CONN_MAX_AGE", "60")),
+        'CONN_HEALTH_CHECKS': True,
+        # Hinter PgBouncer (transaction pooling) funktionieren server-side Cursor nicht
+        'DISABLE_SERVER_SIDE_CURSORS': os.getenv("DB_DISABLE_SERVER_SIDE_CURSORS", "0") == "1",
+        'OPTIONS': {},
     }
+    if os.getenv("DB_POOL", "0") == "1":
+        # psycopg3 Connection-Pool (benötigt psycopg[pool]); schließt CONN_MAX_AGE aus
+        cfg['CONN_MAX_AGE'] = 0
+        cfg['OPTIONS']['pool'] = {
+            'min_size': int(os.getenv("DB_POOL_MIN_SIZE", "2")),
+            'max_size': int(os.getenv("DB_POOL_MAX_SIZE", "10")),
+            'timeout': int(os.getenv("DB_POOL_TIMEOUT", "10")),
+        }
+    return cfg
+
+
+DATABASES = {
+    'default': _postgres(os.getenv("DB_HOST", "localhost"), os.getenv("DB_PORT", "5432")),
+}
+
+# Read-Replicas: DB_REPLICA_HOSTS=replica1:5432,replica2
+DATABASE_REPLICAS = []
+for i, entry in enumerate(filter(None, os.getenv("DB_REPLICA_HOSTS", "").split(",")), start=1):
+    host, _, port = entry.strip().partition(":")
+    alias = f"replica_{i}"
+    DATABASES[alias] = {**_postgres(host, port or os.getenv("DB_PORT", "5432")), 'TEST': {'MIRROR': 'default'}}
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ["apistreamee.db_router.PrimaryReplicaRouter"]
+
+# Nach eigenen Writes (join/leave/patch) liest der User so lange vom Primary (read-your-writes)
+DB_REPLICA_PIN_SECONDS = int(os.getenv("DB_REPLICA_PIN_SECONDS", "5"))
+
+# Slow-Query-Log (apistreamee.slow_queries): 0 schaltet ab
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+SLOW_QUERY_LOG_INTERVAL = float(os.getenv("SLOW_QUERY_LOG_INTERVAL", "60"))
+SLOW_QUERY_EXPLAIN = os.getenv("SLOW_QUERY_EXPLAIN", "1") == "1"
+# Eigener Handler: in eine Datei (SLOW_QUERY_LOG_FILE), sonst stderr; unter `manage.py test` stumm,
+# die Benchmarks erzeugen absichtlich langsame Queries
+SLOW_QUERY_LOG_FILE = os.getenv("SLOW_QUERY_LOG_FILE", "")
+TESTING = sys.argv[1:2] == ["test"]
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'slow_queries': (
+            {'class': 'logging.handlers.WatchedFileHandler', 'filename': SLOW_QUERY_LOG_FILE}
+            if SLOW_QUERY_LOG_FILE
+            else {'class': 'logging.NullHandler'} if TESTING else {'class': 'logging.StreamHandler'}
+        ),
+    },
+    'loggers': {
+        'apistreamee.slow_queries': {'handlers': ['slow_queries'], 'level': 'WARNING', 'propagate': False},
+    },
 }
 
+# Shared Cache (Replica-Pinning u.a.); ohne REDIS_URL nur pro Prozess
+if os.getenv("REDIS_URL"):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv("REDIS_URL"),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Idempotency-Key (apistreamee.idempotency): gespeicherte Antworten im Cache (mit REDIS_URL über alle Worker)
+IDEMPOTENCY_TTL = int(os.getenv("IDEMPOTENCY_TTL", str(24 * 3600)))
+# Solange wartet ein Duplikat auf den noch laufenden ersten Request (danach 409)
+IDEMPOTENCY_WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "10"))
+IDEMPOTENCY_LOCK_SECONDS = int(os.getenv("IDEMPOTENCY_LOCK_SECONDS", "30"))
+
+# >0: Joins werden gepuffert und alle N ms als Multi-Row-INSERT geschrieben (Join-Storms)
+COMMUNITY_JOIN_BUFFER_MS = int(os.getenv("COMMUNITY_JOIN_BUFFER_MS", "0"))
+
+# Takt von poll_live_status; Live-Zeilen älter als 2 Intervalle gelten als offline (Poller steht)
+LIVE_STATUS_POLL_SECONDS = float(os.getenv("LIVE_STATUS_POLL_SECONDS", "60"))
+
+# Sampling-Profiler (apistreamee.profiling): aus, solange PROFILER_ENABLED nicht gesetzt ist.
+# Admins können einzelne Requests mit "X-Profile: 1" profilieren, zusätzlich zufällig PROFILER_SAMPLE_RATE.
+PROFILER_ENABLED = os.getenv("PROFILER_ENABLED", "0") == "1"
+PROFILER_SAMPLE_RATE = float(os.getenv("PROFILER_SAMPLE_RATE", "0"))
+PROFILER_INTERVAL_MS = float(os.getenv("PROFILER_INTERVAL_MS", "2"))
+PROFILER_DIR = os.getenv("PROFILER_DIR", str(BASE_DIR / "profiles"))
+PROFILER_MAX_FILES = int(os.getenv("PROFILER_MAX_FILES", "200"))
+
 
 #cors headers allowed for React Usage
 CORS_ALLOWED_ORIGINS = [
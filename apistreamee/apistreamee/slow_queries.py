@@ -0,0 +1,222 @@
+import hashlib
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger(__name__)
+
+# URL-Name des aktuellen Requests (gesetzt von SlowQueryContextMiddleware)
+_url_name: ContextVar[str] = ContextVar("slow_query_url_name", default="-")
+
+_EXPLAINABLE = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE")
+
+_NORMALIZE = [
+    (re.compile(r"'(?:[^']|'')*'"), "?"),  # String-Literale
+    (re.compile(r"\b\d+(?:\.\d+)?\b"), "?"),  # Zahlen
+    (re.compile(r"%s"), "?"),
+    (re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)"), "(?+)"),  # IN (...) beliebiger Länge
+    (re.compile(r'"s\d+_x\d+"'), '"sp"'),  # Savepoint-Namen
+    (re.compile(r"\s+"), " "),
+]
+
+
+def fingerprint(sql: str) -> tuple[str, str]:
+    normalized = sql
+    for pattern, replacement in _NORMALIZE:
+        normalized = pattern.sub(replacement, normalized)
+    normalized = normalized.strip()
+    return hashlib.sha1(normalized.encode()).hexdigest()[:12], normalized
+
+
+def _redact(params, many: bool):
+    if params is None:
+        return None
+    if many:
+        return f"<{len(params)} rows>"
+    if isinstance(params, dict):
+        return {k: type(v).__name__ for k, v in params.items()}
+    return [type(v).__name__ for v in params]
+
+
+# Konstanten in Plan-Zeilen (Filter, Index Cond, ...); Knotenzeilen mit "(cost=" bleiben unverändert
+_PLAN_LITERALS = [
+    (re.compile(r"'(?:[^']|'')*'"), "'?'"),
+    (re.compile(r"(?<![\w$.])-?\d+(?:\.\d+)?\b"), "?"),
+]
+
+_PLACEHOLDER = re.compile(r"%%|%\((\w+)\)s|%s")
+
+
+def _scrub_plan(plan: str) -> str:
+    lines = []
+    for line in plan.splitlines():
+        if "(cost=" not in line:
+            for pattern, replacement in _PLAN_LITERALS:
+                line = pattern.sub(replacement, line)
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def _numbered(sql: str, params) -> str:
+    """%s / %(name)s -> $1, $2, ... für EXPLAIN (GENERIC_PLAN), das ohne Parameterwerte plant."""
+    names = list(params) if isinstance(params, dict) else []
+    positions = iter(range(1, 10**6))
+
+    def replace(match):
+        if match.group(0) == "%%":
+            return "%"
+        if match.group(1) is not None:
+            return f"${names.index(match.group(1)) + 1}"
+        return f"${next(positions)}"
+
+    return _PLACEHOLDER.sub(replace, sql)
+
+
+def _call_site() -> str:
+    """Erster Frame aus unserem Code (nicht Django/DRF/diese Datei)."""
+    base = str(settings.BASE_DIR) + os.sep
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(base) and filename != __file__ and "site-packages" not in filename:
+            return f"{filename[len(base):]}:{frame.f_lineno} ({frame.f_code.co_name})"
+        frame = frame.f_back
+    return "-"
+
+
+class _Shape:
+    __slots__ = ("count", "total_ms", "max_ms", "logged_at")
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.logged_at = 0.0
+
+
+class SlowQueryLogger:
+    """
+    execute_wrapper: Statements über SLOW_QUERY_MS werden pro Fingerprint
+    (normalisiertes SQL) aggregiert und höchstens einmal pro
+    SLOW_QUERY_LOG_INTERVAL geloggt, mit Aufrufstelle, URL-Name und
+    Parameter-Typen statt Werten. Beim ersten Auftreten einer Form wird
+    (nur Postgres) der Plan per EXPLAIN (ohne ANALYZE) mitgeloggt: ab PG16
+    als GENERIC_PLAN ohne Parameterwerte, Konstanten im Plan immer maskiert.
+    """
+
+    def __init__(self):
+        self._shapes: dict[str, _Shape] = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        result = execute(sql, params, many, context)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if elapsed_ms >= settings.SLOW_QUERY_MS:
+            self._report(sql, params, many, elapsed_ms, context["connection"])
+        return result
+
+    def _report(self, sql, params, many, elapsed_ms, connection) -> None:
+        key, normalized = fingerprint(sql)
+        now = time.monotonic()
+        with self._lock:
+            shape = self._shapes.get(key)
+            is_new = shape is None
+            if is_new:
+                shape = self._shapes[key] = _Shape()
+            shape.count += 1
+            shape.total_ms += elapsed_ms
+            shape.max_ms = max(shape.max_ms, elapsed_ms)
+            if not is_new and now - shape.logged_at < settings.SLOW_QUERY_LOG_INTERVAL:
+                return
+            count, total_ms, max_ms = shape.count, shape.total_ms, shape.max_ms
+            shape.count, shape.total_ms, shape.max_ms, shape.logged_at = 0, 0.0, 0.0, now
+
+        plan = self._explain(sql, params, connection) if is_new and not many else None
+        logger.warning(
+            "slow query %s: %.1fms (%d in interval, avg %.1fms, max %.1fms) url=%s at %s params=%s\n%s%s",
+            key,
+            elapsed_ms,
+            count,
+            total_ms / count,
+            max_ms,
+            _url_name.get(),
+            _call_site(),
+            _redact(params, many),
+            normalized,
+            f"\n{plan}" if plan else "",
+        )
+
+    def _explain(self, sql, params, connection):
+        if not settings.SLOW_QUERY_EXPLAIN or connection.vendor != "postgresql":
+            return None
+        if not sql.lstrip().upper().startswith(_EXPLAINABLE):
+            return None
+
+        # Roher DB-API-Cursor: läuft nicht durch die execute_wrappers und zählt nicht als Query.
+        # In einer Transaktion mit Savepoint, damit ein fehlschlagendes EXPLAIN sie nicht abbricht.
+        in_transaction = connection.in_atomic_block
+        try:
+            with connection.connection.cursor() as cursor:
+                if in_transaction:
+                    cursor.execute("SAVEPOINT slow_query_explain")
+                try:
+                    if connection.pg_version >= 160000:
+                        cursor.execute(f"EXPLAIN (GENERIC_PLAN) {_numbered(sql, params or ())}")
+                    else:
+                        cursor.execute(f"EXPLAIN (ANALYZE off) {sql}", params)
+                    return _scrub_plan("\n".join(row[0] for row in cursor.fetchall()))
+                except Exception:
+                    if in_transaction:
+                        cursor.execute("ROLLBACK TO SAVEPOINT slow_query_explain")
+                    raise
+                finally:
+                    if in_transaction:
+                        cursor.execute("RELEASE SAVEPOINT slow_query_explain")
+        except Exception as e:
+            logger.debug("slow query: EXPLAIN failed: %s", e)
+            return None
+
+
+_slow_query_logger = SlowQueryLogger()
+
+
+def _install(sender, connection, **kwargs) -> None:
+    if _slow_query_logger not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_slow_query_logger)
+
+
+def install() -> None:
+    """Hängt den Logger an jede (auch später geöffnete) DB-Verbindung."""
+    if settings.SLOW_QUERY_MS > 0:
+        connection_created.connect(_install, dispatch_uid="slow_query_logger")
+
+
+class SlowQueryContextMiddleware:
+    """Merkt sich den URL-Namen des Requests für das Slow-Query-Log."""
+
+    def __init__(self, get_response):
+        if settings.SLOW_QUERY_MS <= 0:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _url_name.set(request.path)
+        try:
+            return self.get_response(request)
+        finally:
+            _url_name.reset(token)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        match = request.resolver_match
+        if match is not None and match.view_name:
+            _url_name.set(match.view_name)
+        return None
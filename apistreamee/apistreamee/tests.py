@@ -0,0 +1,293 @@
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection, connections
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework.test import force_authenticate
+from rest_framework_simplejwt.tokens import AccessToken
+
+from communities.models import Community
+
+from .db_router import ReplicaPinningMiddleware, pin_user_to_primary, read_alias
+from .idempotency import idempotent
+from .profiling import PROFILE_ID_HEADER, SamplingProfilerMiddleware, _store
+from .slow_queries import SlowQueryLogger, _scrub_plan
+
+User = get_user_model()
+
+REPLICAS = ["replica1", "replica2"]
+
+
+@override_settings(DATABASE_REPLICAS=REPLICAS)
+class ReplicaRoutingTests(SimpleTestCase):
+    """Ohne DB: geprüft wird nur, welchen Alias read_alias() im Request liefert."""
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.user = User(pk=4711, username="pinned")
+
+    def aliases(self, method: str, user=None, during=None) -> list[str]:
+        seen = []
+
+        def view(request):
+            seen.append(read_alias())
+            if during:
+                during()
+            seen.append(read_alias())
+
+        headers = {"HTTP_AUTHORIZATION": f"Bearer {AccessToken.for_user(user)}"} if user else {}
+        ReplicaPinningMiddleware(view)(getattr(self.factory, method.lower())("/communities/", **headers))
+        return seen
+
+    def test_reads_default_to_primary_outside_requests(self):
+        self.assertEqual(read_alias(), "default")
+
+    def test_safe_methods_stick_to_one_replica(self):
+        for _ in range(10):
+            first, second = self.aliases("GET")
+            self.assertIn(first, REPLICAS)
+            self.assertEqual(first, second)
+        self.assertEqual(self.aliases("POST"), ["default", "default"])
+
+    def test_primary_after_own_write(self):
+        # Write im Request: ab da Primary, und für die nächsten Requests des Users auch
+        first, second = self.aliases("GET", self.user, during=lambda: pin_user_to_primary(self.user))
+        self.assertIn(first, REPLICAS)
+        self.assertEqual(second, "default")
+        self.assertEqual(self.aliases("GET", self.user), ["default", "default"])
+        self.assertIn(self.aliases("GET", User(pk=4712, username="other"))[0], REPLICAS)
+
+    def test_primary_inside_transaction(self):
+        with mock.patch.object(connections["default"], "in_atomic_block", True):
+            self.assertEqual(self.aliases("GET"), ["default", "default"])
+
+
+class LeanMiddlewareTests(TestCase):
+    def test_api_paths_skip_the_full_stack(self):
+        response = self.client.get("/communities/")
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("X-Frame-Options", response)
+        self.assertNotIn("csrftoken", response.cookies)
+        self.assertFalse(hasattr(response.wsgi_request, "session"))
+
+    def test_admin_runs_the_full_stack(self):
+        response = self.client.get("/admin/login/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["X-Frame-Options"], "DENY")
+        self.assertIn("csrftoken", response.cookies)
+        self.assertTrue(hasattr(response.wsgi_request, "session"))
+
+
+@override_settings(SLOW_QUERY_MS=0, SLOW_QUERY_EXPLAIN=True)
+class SlowQueryRedactionTests(TestCase):
+    def test_log_contains_no_values(self):
+        with self.assertLogs("apistreamee.slow_queries", "WARNING") as logs, \
+                connection.execute_wrapper(SlowQueryLogger()):
+            Community.objects.filter(name="geheimer-name", description__contains="sk_live_4711").count()
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT id FROM communities_community WHERE slug = 'inline-secret' AND id > 8150")
+
+        output = "\n".join(logs.output)
+        for secret in ("geheimer-name", "sk_live_4711", "4711", "inline-secret", "8150"):
+            self.assertNotIn(secret, output)
+        # Plan ist trotzdem dabei
+        self.assertIn("Seq Scan on communities_community", output)
+        self.assertIn("params=['str', 'str']", output)
+
+    def test_scrub_plan_keeps_costs(self):
+        plan = (
+            "Index Scan using communities_community_pkey on communities_community  (cost=0.15..8.17 rows=1 width=8)\n"
+            "  Index Cond: (id = 8150)\n"
+            "  Filter: ((name)::text = 'geheim'::text)"
+        )
+        self.assertEqual(
+            _scrub_plan(plan).splitlines(),
+            [
+                "Index Scan using communities_community_pkey on communities_community  (cost=0.15..8.17 rows=1 width=8)",
+                "  Index Cond: (id = ?)",
+                "  Filter: ((name)::text = '?'::text)",
+            ],
+        )
+
+
+class IdempotencyTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.calls = 0
+
+    def view(self, handler):
+        @api_view(["POST"])
+        @permission_classes([AllowAny])
+        @idempotent("test")
+        def view(request):
+            self.calls += 1
+            return handler(request)
+
+        return view
+
+    def post(self, view, data: dict, key: str = "k", user=None):
+        request = RequestFactory().post("/", data, content_type="application/json", headers={"Idempotency-Key": key})
+        if user is not None:
+            force_authenticate(request, user)
+        return view(request)
+
+    def test_replays_first_response(self):
+        view = self.view(lambda request: Response({"n": self.calls}, status=201))
+        first = self.post(view, {"a": 1})
+        retry = self.post(view, {"a": 1})
+        self.assertEqual((retry.status_code, retry.data, retry["Idempotent-Replayed"]), (201, first.data, "true"))
+        self.assertEqual(self.calls, 1)
+
+        # Anonym gilt der Key pro Request-Inhalt, eingeloggt pro User: anderer Body -> 422
+        self.assertEqual(self.post(view, {"a": 2}).status_code, 201)
+        user = User(pk=1, username="idempotent")
+        self.assertEqual(self.post(view, {"a": 1}, user=user).status_code, 201)
+        self.assertEqual(self.post(view, {"a": 2}, user=user).status_code, 422)
+        self.assertEqual(self.calls, 3)
+
+    def test_client_errors_are_stored_server_errors_are_not(self):
+        self.post(self.view(lambda request: Response({"detail": "nope"}, status=404)), {"a": 1})
+        self.assertEqual(self.post(self.view(lambda request: Response(status=200)), {"a": 1}).status_code, 404)
+        self.assertEqual(self.calls, 1)
+
+        self.post(self.view(lambda request: Response(status=503)), {"a": 2})
+        self.assertEqual(self.post(self.view(lambda request: Response(status=200)), {"a": 2}).status_code, 200)
+        self.assertEqual(self.calls, 3)
+
+    @override_settings(IDEMPOTENCY_WAIT_SECONDS=0)
+    def test_in_progress_and_invalid_keys(self):
+        duplicate = []
+
+        def handler(request):
+            # Retry, während der erste Request noch läuft
+            if not duplicate:
+                duplicate.append(self.post(view, {"a": 1}).status_code)
+            return Response(status=201)
+
+        view = self.view(handler)
+        self.assertEqual(self.post(view, {"a": 1}).status_code, 201)
+        self.assertEqual(duplicate, [409])
+
+        for key in ("", "x" * 256):
+            self.assertEqual(self.post(view, {"a": 1}, key=key).status_code, 400)
+        self.assertEqual(self.calls, 1)
+
+    def test_releases_only_own_lock(self):
+        lock_keys = []
+
+        def handler(request):
+            lock_keys.append(add.call_args.args[0])
+            if request.data["slow"]:
+                # IDEMPOTENCY_LOCK_SECONDS abgelaufen, ein Retry hält jetzt den Lock
+                cache.set(lock_keys[-1], "retry")
+            return Response({"ok": True})
+
+        with mock.patch.object(cache, "add", wraps=cache.add) as add:
+            self.post(self.view(handler), {"slow": True})
+            self.post(self.view(handler), {"slow": False})
+        self.assertEqual(cache.get(lock_keys[0]), "retry")
+        self.assertIsNone(cache.get(lock_keys[1]))
+
+
+class AnonymousIdempotencyTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def register(self, username: str, key: str = "1"):
+        data = {"username": username, "email": f"{username}@example.com", "password": "kein-gutes-Passwort-4711"}
+        return self.client.post("/auth/register/", data, content_type="application/json", headers={"Idempotency-Key": key})
+
+    def test_anonymous_keys_are_scoped_per_request(self):
+        first = self.register("alice")
+        self.assertEqual(first.status_code, 201)
+        # Fremder Client, gleicher (naiver) Key: eigener Eintrag, kein 422 und nicht alices Antwort
+        other = self.register("bob")
+        self.assertEqual(other.status_code, 201)
+        self.assertEqual(other.json()["username"], "bob")
+        self.assertNotIn("Idempotent-Replayed", other)
+
+        retry = self.register("alice")
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertEqual(retry.json(), first.json())
+        self.assertEqual(User.objects.filter(username__in=["alice", "bob"]).count(), 2)
+
+
+class ProfilerTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.dir = Path(directory.name)
+        settings = override_settings(
+            PROFILER_ENABLED=True, PROFILER_SAMPLE_RATE=0, PROFILER_INTERVAL_MS=1, PROFILER_DIR=directory.name,
+            PROFILER_MAX_FILES=3,
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.staff = User.objects.create_user("profiler-staff", "profiler-staff@example.com", "pw-profiler-1", is_staff=True)
+        self.user = User.objects.create_user("profiler-user", "profiler-user@example.com", "pw-profiler-1")
+
+    def headers(self, user) -> dict:
+        return {"HTTP_AUTHORIZATION": f"Bearer {AccessToken.for_user(user)}"}
+
+    def profile(self, **headers):
+        middleware = SamplingProfilerMiddleware(lambda request: HttpResponse("ok"))
+        return middleware(RequestFactory().get("/communities/", **headers))
+
+    def profiles(self) -> list[str]:
+        return sorted(p.name for p in self.dir.glob("*.folded"))
+
+    def test_sampling_trigger(self):
+        self.profile()
+        self.profile(HTTP_X_PROFILE="1", **self.headers(self.user))
+        self.assertEqual(self.profiles(), [])
+
+        response = self.profile(HTTP_X_PROFILE="1", **self.headers(self.staff))
+        self.assertEqual(self.profiles(), [response[PROFILE_ID_HEADER]])
+
+        with self.settings(PROFILER_SAMPLE_RATE=1):
+            response = self.profile()
+        self.assertEqual(len(self.profiles()), 2)
+        # Zufällig gezogen: Id nur für explizit angeforderte Profile
+        self.assertNotIn(PROFILE_ID_HEADER, response)
+
+    def test_ring_buffer_keeps_newest(self):
+        for i in range(5):
+            _store(f"{i}-GET-x.folded", "main 1\n")
+        self.assertEqual(self.profiles(), ["2-GET-x.folded", "3-GET-x.folded", "4-GET-x.folded"])
+
+    def test_views_are_staff_only(self):
+        _store("1-GET-x.folded", "main 1\n")
+        self.assertEqual(self.client.get("/debug/profiles/").status_code, 401)
+        self.assertEqual(self.client.get("/debug/profiles/", **self.headers(self.user)).status_code, 403)
+        self.assertEqual(self.client.get("/debug/profiles/1-GET-x.folded", **self.headers(self.user)).status_code, 403)
+
+        response = self.client.get("/debug/profiles/", **self.headers(self.staff))
+        self.assertEqual(response.json(), [{"name": "1-GET-x.folded", "size": 7}])
+        response = self.client.get("/debug/profiles/1-GET-x.folded", **self.headers(self.staff))
+        self.assertEqual(b"".join(response.streaming_content), b"main 1\n")
+        for name in ("2-GET-x.folded", "..%2Fsettings.py"):
+            self.assertEqual(self.client.get(f"/debug/profiles/{name}", **self.headers(self.staff)).status_code, 404)
+
+    def test_list_skips_files_deleted_concurrently(self):
+        _store("1-GET-x.folded", "main 1\n")
+        _store("2-GET-x.folded", "main 1\n")
+        stat = Path.stat
+
+        def vanishing(path, *args, **kwargs):
+            # Ring-Buffer eines anderen Workers löscht die Datei nach dem glob
+            if path.name == "1-GET-x.folded":
+                raise FileNotFoundError(path)
+            return stat(path, *args, **kwargs)
+
+        with mock.patch.object(Path, "stat", vanishing):
+            response = self.client.get("/debug/profiles/", **self.headers(self.staff))
+        self.assertEqual([p["name"] for p in response.json()], ["2-GET-x.folded"])
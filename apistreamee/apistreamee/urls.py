@@ -14,11 +14,23 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
-from django.contrib import admin
-from django.urls import path, include
+from django.conf import settings
+from django.urls import URLResolver, path, include
+from django.urls.resolvers import RoutePattern
+
+from . import profiling
 
 urlpatterns = [
-    path('admin/', admin.site.urls),
     path("auth/", include("authenticate.urls")),
+    path("integrations/", include("integrations.urls")),
+    path("debug/profiles/", profiling.profile_list, name="profile-list"),
+    path("debug/profiles/<str:name>", profiling.profile_download, name="profile-download"),
     path("", include("communities.urls")),
 ]
+
+if settings.ADMIN_ENABLED:
+    # Wie path("admin/", admin.site.urls), aber include() würde das Modul sofort importieren;
+    # URLResolver lädt apistreamee.admin_urls (Autodiscover, ModelAdmins) erst beim ersten admin/-Request
+    urlpatterns.insert(
+        0, URLResolver(RoutePattern("admin/"), "apistreamee.admin_urls", app_name="admin", namespace="admin")
+    )
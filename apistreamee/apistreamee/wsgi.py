@@ -10,7 +10,12 @@ https://docs.djangoproject.com/en/5.1/howto/deployment/wsgi/
 import os
 
 from django.core.wsgi import get_wsgi_application
+from django.urls import get_resolver
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'apistreamee.settings')
 
 application = get_wsgi_application()
+
+# URLconf (Views, Serializer, DRF) schon beim Worker-Start laden statt im ersten Request.
+# Admin und Provider bleiben lazy: apistreamee.admin_urls bzw. integrations.providers.get_provider.
+get_resolver().urlconf_module
@@ -1,15 +1,19 @@
+from django.utils.decorators import method_decorator
 from rest_framework import permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.views import TokenObtainPairView
 
+from apistreamee.idempotency import idempotent
+
 from .serializers import RegisterSerializer, LogoutSerializer, EmailTokenObtainPairSerializer
 
 
 class RegisterView(APIView):
     permission_classes = [permissions.AllowAny]
 
+    @method_decorator(idempotent("auth-register"))
     def post(self, request):
         s = RegisterSerializer(data=request.data)
         s.is_valid(raise_exception=True)
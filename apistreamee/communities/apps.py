@@ -3,3 +3,12 @@ from django.apps import AppConfig
 
 class CommunitiesConfig(AppConfig):
     name = 'communities'
+
+    def ready(self):
+        from django.contrib.auth import get_user_model
+        from django.db.models.signals import pre_delete
+
+        from .services.membership_stats import record_cascade_leaves
+
+        # Community-Deletes brauchen das nicht: Rollups und Events hängen selbst per CASCADE an der Community
+        pre_delete.connect(record_cascade_leaves, sender=get_user_model(), dispatch_uid="membership_cascade_leaves")
@@ -0,0 +1,404 @@
+"""
+Endpoint-Benchmarks: exakte Query-Counts plus Latenz (Selector + Serializer)
+pro Datensatzgröße. Opt-in, `manage.py test` findet nur tests.py:
+
+    python manage.py test communities.benchmarks integrations.benchmarks
+    BENCH_SIZES=10,100,1000 BENCH_REPEAT=15 BENCH_HISTORY=/tmp/bench.json python manage.py test communities.benchmarks
+
+Verhaltenstests stehen in tests.py.
+"""
+from contextlib import contextmanager
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Sum
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from apistreamee.benchmarking import BENCH_SIZES, BenchmarkMixin
+from authenticate.serializers import EmailTokenObtainPairSerializer, RegisterSerializer
+from integrations.providers import ProviderUser
+
+from .exports import iter_export
+from .models import (
+    Community,
+    CommunityActivityBucket,
+    CommunityLiveStream,
+    CommunityMembership,
+    MembershipEvent,
+    MembershipEventKind,
+    SimilarCommunity,
+)
+from .selectors.communities import (
+    communities_detail_batch,
+    communities_of_user,
+    communities_with_counts,
+    community_detail_with_user_flags,
+    similar_communities,
+)
+from .selectors.members import community_members
+from .selectors.stats import community_daily_stats
+from .serializers import (
+    CommunityDetailSerializer,
+    CommunityListSerializer,
+    CommunityMemberSerializer,
+    SimilarCommunitySerializer,
+)
+from .services import trending
+from .services.membership_stats import rebuild_from_memberships, rollup_pending
+from .services.seeding import SEED_PASSWORD, seed_scale
+
+User = get_user_model()
+
+
+class Dataset:
+    def __init__(self, size: int, prefix: str):
+        self.size = size
+        self.communities = Community.objects.filter(slug__startswith=f"{prefix}-").order_by("pk")
+        self.community = self.communities.first()
+        self.admin = self.community.created_by
+        self.user = User.objects.filter(username__startswith=f"{prefix}_").exclude(pk=self.admin.pk).order_by("pk").first()
+        self.staff = User.objects.create_user(f"{prefix}-staff", f"{prefix}-staff@example.com", SEED_PASSWORD, is_staff=True)
+
+
+class EndpointBenchmarkBase(BenchmarkMixin, TestCase):
+    """
+    Pro Datensatzgröße (BENCH_SIZES Communities, doppelt so viele User,
+    Memberships power-law verteilt) werden die Daten in einer Transaktion
+    angelegt und danach zurückgerollt.
+    """
+
+    suite = "communities"
+
+    def setUp(self):
+        cache.clear()
+        trending._local.update(expires=0.0, data=None)
+
+    @contextmanager
+    def dataset(self, size: int):
+        with transaction.atomic():
+            prefix = f"bench{size}"
+            seed_scale(users=size * 2, communities=size, memberships_per_user=5, prefix=prefix, seed=size)
+            yield Dataset(size, prefix)
+            transaction.set_rollback(True)
+
+    def client_for(self, user=None) -> APIClient:
+        client = APIClient()
+        if user is not None:
+            client.credentials(HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(user).access_token}")
+        return client
+
+    def request(self, client, method: str, path: str, expected_status: int, **kwargs):
+        response = getattr(client, method)(path, format="json", **kwargs)
+        if response.streaming:
+            b"".join(response.streaming_content)
+        self.assertEqual(response.status_code, expected_status, getattr(response, "data", None))
+        return response
+
+
+class CommunityReadBenchmarks(EndpointBenchmarkBase):
+    def test_list(self):
+        for size in BENCH_SIZES:
+            with self.dataset(size):
+                client = self.client_for()
+                self.assertQueries(f"list@{size}", 1, lambda: self.request(client, "get", "/communities/", 200))
+                self.assertQueries(
+                    f"list_sparse@{size}", 1, lambda: self.request(client, "get", "/communities/?fields=id,name", 200)
+                )
+                self.assertQueries(
+                    f"list_live@{size}", 1, lambda: self.request(client, "get", "/communities/?sort=live", 200)
+                )
+                sparse = self.request(client, "get", "/communities/?fields=id,name", 200)
+                self.assertEqual(set(sparse.data[0]), {"id", "name"})
+                unknown = self.request(client, "get", "/communities/?fields=id,password", 400)
+                self.assertIn("password", str(unknown.data["fields"]))
+                self.bench(
+                    f"list@{size}",
+                    lambda: CommunityListSerializer(communities_with_counts().order_by("-created_at"), many=True).data,
+                )
+
+    def test_trending(self):
+        for size in BENCH_SIZES:
+            with self.dataset(size) as data:
+                cache.delete(trending.CACHE_KEY)
+                trending._local.update(expires=0.0, data=None)
+                trending.backfill_from_memberships(hours=24 * 90)
+                CommunityLiveStream.objects.create(community=data.community, viewer_count=10, started_at=timezone.now(), checked_at=timezone.now())
+                client = self.client_for()
+                # Cache leer: kein Neuberechnen im Request, leer bis zum nächsten materialize_trending
+                miss = self.assertQueries(
+                    f"trending_miss@{size}", 0, lambda: self.request(client, "get", "/communities/trending/", 200)
+                )
+                self.assertEqual(miss.data, [])
+                trending.materialize_trending()
+                self.assertQueries(
+                    f"trending@{size}", 0, lambda: self.request(client, "get", "/communities/trending/", 200)
+                )
+                self.bench(f"trending_materialize@{size}", trending.materialize_trending, rounds=5)
+
+    def test_detail(self):
+        for size in BENCH_SIZES:
+            with self.dataset(size) as data:
+                slug = data.community.slug
+                anon, member = self.client_for(), self.client_for(data.admin)
+                self.assertQueries(
+                    f"detail_anon@{size}", 1, lambda: self.request(anon, "get", f"/communities/slug/{slug}/", 200)
+                )
+                # JWT-User + Detail
+                self.assertQueries(
+                    f"detail_auth@{size}", 2, lambda: self.request(member, "get", f"/communities/slug/{slug}/", 200)
+                )
+                self.bench(
+                    f"detail@{size}",
+                    lambda: CommunityDetailSerializer(community_detail_with_user_flags(slug, data.admin).get()).data,
+                )
+
+    def test_batch(self):
+        for size in BENCH_SIZES:
+            with self.dataset(size) as data:
+                communities = list(data.communities.reverse()[:100])
+                ids = ",".join(str(c.pk) for c in communities) + ",0"
+                slugs = ",".join(c.slug for c in communities)
+                anon, member = self.client_for(), self.client_for(data.admin)
+                response = self.assertQueries(
+                    f"batch_ids@{size}", 1, lambda: self.request(anon, "get", f"/communities/batch/?ids={ids}", 200)
+                )
+                self.assertEqual([c["id"] for c in response.data["results"]], [c.pk for c in communities])
+                self.assertEqual(response.data["missing"], [0])
+                # JWT-User + Batch
+                self.assertQueries(
+                    f"batch_slugs_auth@{size}",
+                    2,
+                    lambda: self.request(member, "get", f"/communities/batch/?slugs={slugs}&fields=id,name", 200),
+                )
+                keys = [c.pk for c in communities]
+                self.bench(
+                    f"batch@{size}",
+                    lambda: CommunityDetailSerializer(communities_detail_batch(ids=keys, user=data.admin), many=True).data,
+                )
+
+    def test_members(self):
+        for size in BENCH_SIZES:
+            with self.dataset(size) as data:
+                pk = data.community.pk
+                admin, staff = self.client_for(data.admin), self.client_for(data.staff)
+                self.request(self.client_for(data.user), "get", f"/communities/{pk}/members/", 403)
+
+                # JWT-User, Community, Admin-Check, Seite
+                response = self.assertQueries(
+                    f"members@{size}", 4, lambda: self.request(admin, "get", f"/communities/{pk}/members/?limit=10", 200)
+                )
+                seen, cursor = [m["id"] for m in response.data["results"]], response.data["next_cursor"]
+                while cursor:
+                    page = self.request(staff, "get", f"/communities/{pk}/members/?limit=10&cursor={cursor}", 200).data
+                    seen += [m["id"] for m in page["results"]]
+                    cursor = page["next_cursor"]
+                expected = CommunityMembership.objects.filter(community_id=pk).order_by("-joined_at", "-pk")
+                self.assertEqual(seen, list(expected.values_list("pk", flat=True)))
+
+                admins = self.request(staff, "get", f"/communities/{pk}/members/?role=admin", 200).data["results"]
+                self.assertEqual({m["role"] for m in admins}, {"admin"})
+                self.bench(
+                    f"members@{size}",
+                    lambda: CommunityMemberSerializer(community_members(pk)[:50], many=True).data,
+                )
+
+    def test_similar(self):
+        for size in BENCH_SIZES:
+            with self.dataset(size) as data:
+                others = list(data.communities[1:11])
+                SimilarCommunity.objects.bulk_create(
+                    SimilarCommunity(community=data.community, similar=c, rank=i, score=1 / i)
+                    for i, c in enumerate(others, start=1)
+                )
+                client, pk = self.client_for(), data.community.pk
+                self.assertQueries(
+                    f"similar@{size}", 1, lambda: self.request(client, "get", f"/communities/{pk}/similar/", 200)
+                )
+                self.bench(f"similar@{size}", lambda: SimilarCommunitySerializer(similar_communities(pk), many=True).data)
+
+    def test_me_communities(self):
+        for size in BENCH_SIZES:
+            with self.dataset(size) as data:
+                client = self.client_for(data.user)
+                self.assertQueries(
+                    f"me_communities@{size}", 2, lambda: self.request(client, "get", "/me/communities/", 200)
+                )
+                self.bench(
+                    f"me_communities@{size}",
+                    lambda: CommunityListSerializer(communities_of_user(data.user).order_by("-created_at"), many=True).data,
+                )
+
+    def test_export(self):
+        for size in BENCH_SIZES:
+            with self.dataset(size) as data:
+                client = self.client_for(data.staff)
+                for kind, fmt in (("communities", "ndjson"), ("memberships", "csv")):
+                    # JWT-User + ein Cursor über alle Zeilen (bei diesen Größen ein Fetch)
+                    self.assertQueries(
+                        f"export_{kind}@{size}", 2, lambda: self.request(client, "get", f"/export/{kind}.{fmt}", 200)
+                    )
+                    self.bench(f"export_{kind}@{size}", lambda: "".join(iter_export(kind, fmt, 2000)), rounds=5)
+
+
+class CommunityWriteBenchmarks(EndpointBenchmarkBase):
+    def test_create(self):
+        for size in BENCH_SIZES:
+            with self.dataset(size) as data:
+                client = self.client_for(data.user)
+                counter = iter(range(10**6))
+
+                def create():
+                    n = next(counter)
+                    twitch_user = ProviderUser(id=f"bench-create-{n}", login=f"benchcreate{n}", display_name=f"Bench {n}", profile_image_url="")
+                    with mock.patch("integrations.providers.twitch.TwitchProvider.resolve", return_value=twitch_user):
+                        return self.request(client, "post", "/communities/", 201, data={"twitch": f"benchcreate{n}"})
+
+                # JWT-User, Login-Check, Savepoint, Slug-Check, INSERT Community, Release,
+                # INSERT Membership, INSERT Event, Detail
+                self.assertQueries(f"create@{size}", 9, create)
+                # Community gibt es schon: Login-Check + Detail, kein Helix-Call
+                existing = ProviderUser(id="x", login=data.community.external_login, display_name="", profile_image_url="")
+                with mock.patch("integrations.providers.twitch.TwitchProvider.resolve", return_value=existing) as resolve:
+                    self.assertQueries(
+                        f"create_existing@{size}",
+                        3,
+                        lambda: self.request(client, "post", "/communities/", 200, data={"twitch": existing.login}),
+                    )
+                resolve.assert_not_called()
+                self.bench(f"create@{size}", create, rounds=5)
+
+    def test_idempotent_create(self):
+        for size in BENCH_SIZES:
+            with self.dataset(size) as data:
+                client = self.client_for(data.user)
+                twitch_user = ProviderUser(id=f"bench-idem-{size}", login=f"benchidem{size}", display_name="Bench", profile_image_url="")
+                create = lambda: self.request(
+                    client, "post", "/communities/", 201, data={"twitch": twitch_user.login}, headers={"Idempotency-Key": f"k{size}"}
+                )
+                with mock.patch("integrations.providers.twitch.TwitchProvider.resolve", return_value=twitch_user) as resolve:
+                    first = create()
+                    # Retry: nur noch JWT-User, kein Helix-Call, kein Insert
+                    replay = self.assertQueries(f"create_replay@{size}", 1, create)
+                self.assertEqual(resolve.call_count, 1)
+                self.assertEqual(replay.data, first.data)
+                self.assertEqual(replay["Idempotent-Replayed"], "true")
+                self.bench(f"create_replay@{size}", create)
+
+    def test_patch(self):
+        for size in BENCH_SIZES:
+            with self.dataset(size) as data:
+                client, pk = self.client_for(data.admin), data.community.pk
+                patch = lambda: self.request(client, "patch", f"/communities/{pk}/", 200, data={"description": "bench"})
+                # JWT-User, Community, Admin-Check, UPDATE, Detail
+                self.assertQueries(f"patch@{size}", 5, patch)
+                self.bench(f"patch@{size}", patch, rounds=5)
+
+    def test_join_leave(self):
+        for size in BENCH_SIZES:
+            with self.dataset(size) as data:
+                client, pk = self.client_for(data.staff), data.community.pk
+                join = lambda: self.request(client, "post", f"/communities/{pk}/join/", 201)
+                leave = lambda: self.request(client, "post", f"/communities/{pk}/leave/", 200)
+                # JWT-User, Community, get_or_create (SELECT, Savepoint, INSERT, Release), Event;
+                # Aktivitäts-Buckets zählt der Rollup-Worker aus den Events
+                self.assertQueries(f"join@{size}", 7, join)
+                # JWT-User, Community, Membership, DELETE, Event
+                self.assertQueries(f"leave@{size}", 5, leave)
+                self.bench(f"join_leave@{size}", lambda: (join(), leave()), rounds=5)
+
+
+class CommunityStatsBenchmarks(EndpointBenchmarkBase):
+    def test_rollup_and_stats(self):
+        for size in BENCH_SIZES:
+            with self.dataset(size) as data:
+                pk = data.community.pk
+                rebuild_from_memberships()
+                today = timezone.localdate()
+                joins_yesterday = community_daily_stats(pk, today - timedelta(days=1), today)[0]["joins"]
+
+                client, staff = self.client_for(data.user), self.client_for(data.staff)
+                self.request(client, "post", f"/communities/{pk}/leave/", 200)
+                self.request(client, "post", f"/communities/{pk}/join/", 201)
+                self.request(staff, "post", f"/communities/{pk}/join/", 201)
+                # Nachzügler von gestern: zieht den heutigen Stand mit
+                yesterday = timezone.now() - timedelta(days=1)
+                MembershipEvent.objects.filter(community_id=pk, user=data.staff).update(created_at=yesterday)
+                activity = lambda: list(
+                    CommunityActivityBucket.objects.filter(community_id=pk).aggregate(Sum("joins"), Sum("leaves")).values()
+                )
+                joins_before, leaves_before = (n or 0 for n in activity())
+                pending = MembershipEvent.objects.filter(community_id=pk, rolled_up_at__isnull=True)
+                joins, leaves = (pending.filter(kind=kind).count() for kind in (MembershipEventKind.JOIN, MembershipEventKind.LEAVE))
+                rollup_pending()
+                # Trending-Buckets kommen aus demselben Rollup
+                self.assertEqual(activity(), [joins_before + joins, leaves_before + leaves])
+
+                admin = self.client_for(data.admin)
+                # JWT-User, Community, Admin-Check, Rollup-Range, Stand davor
+                days = self.assertQueries(
+                    f"stats@{size}", 5, lambda: self.request(admin, "get", f"/communities/{pk}/stats/?to={today}", 200)
+                ).data
+                self.assertEqual(len(days), 30)
+                self.assertEqual(days[-1]["members"], CommunityMembership.objects.filter(community_id=pk).count())
+                self.assertEqual(days[-2]["joins"], joins_yesterday + 1)
+
+                def churn():
+                    MembershipEvent.objects.bulk_create(
+                        MembershipEvent(community_id=c.pk, user=data.user, kind=kind)
+                        for c in data.communities
+                        for kind in ("join", "leave")
+                    )
+                    rollup_pending()
+
+                self.bench(f"rollup@{size}", churn, rounds=5)
+                self.bench(f"stats_year@{size}", lambda: community_daily_stats(pk, today - timedelta(days=365), today))
+
+
+class AuthBenchmarks(EndpointBenchmarkBase):
+    def test_register_login_me_logout(self):
+        for size in BENCH_SIZES:
+            with self.dataset(size):
+                client = self.client_for()
+                counter = iter(range(10**6))
+
+                def register():
+                    n = next(counter)
+                    payload = {"username": f"benchreg{n}", "email": f"benchreg{n}@example.com", "password": SEED_PASSWORD}
+                    return self.request(client, "post", "/auth/register/", 201, data=payload), payload
+
+                # Username-Check, Email-Check, INSERT
+                _, payload = self.assertQueries(f"register@{size}", 3, register)
+                login = lambda: self.request(
+                    client, "post", "/auth/login/", 200, data={"email": payload["email"], "password": payload["password"]}
+                )
+                # User per Email, authenticate(), OutstandingToken INSERT
+                tokens = self.assertQueries(f"login@{size}", 3, login).data
+
+                authed = self.client_for()
+                authed.credentials(HTTP_AUTHORIZATION=f"Bearer {tokens['access']}")
+                self.assertQueries(f"me@{size}", 1, lambda: self.request(authed, "get", "/auth/me/", 200))
+                # JWT-User, Blacklist-Check (Refresh), User-Check, OutstandingToken,
+                # Blacklist get_or_create (SELECT, Savepoint, INSERT, Release)
+                self.assertQueries(
+                    f"logout@{size}",
+                    8,
+                    lambda: self.request(authed, "post", "/auth/logout/", 204, data={"refresh": tokens["refresh"]}),
+                )
+
+                self.bench(
+                    f"register_serializer@{size}",
+                    lambda: RegisterSerializer(
+                        data={"username": "benchx", "email": "benchx@example.com", "password": SEED_PASSWORD}
+                    ).is_valid(),
+                )
+                self.bench(
+                    f"login_serializer@{size}",
+                    lambda: EmailTokenObtainPairSerializer(data={"email": payload["email"], "password": SEED_PASSWORD}).is_valid(),
+                    rounds=3,
+                )
@@ -0,0 +1,84 @@
+import csv
+from typing import Iterable, Iterator, Sequence
+
+from django.core.serializers.json import DjangoJSONEncoder
+from rest_framework.renderers import JSONRenderer
+
+from .selectors.communities import (
+    COMMUNITY_EXPORT_FIELDS,
+    MEMBERSHIP_EXPORT_FIELDS,
+    communities_for_export,
+    memberships_for_export,
+)
+
+
+EXPORT_KINDS = {
+    "communities": (communities_for_export, COMMUNITY_EXPORT_FIELDS),
+    "memberships": (memberships_for_export, MEMBERSHIP_EXPORT_FIELDS),
+}
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+DEFAULT_CHUNK_SIZE = 2000
+
+
+class NDJSONRenderer(JSONRenderer):
+    # Nur für Content-Negotiation (Accept: application/x-ndjson); der Body
+    # kommt als StreamingHttpResponse, Fehler werden weiterhin als JSON gerendert.
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+
+
+class CSVRenderer(JSONRenderer):
+    media_type = "text/csv"
+    format = "csv"
+
+
+class _Echo:
+    """
+    Pseudo-Buffer für csv.writer: write() gibt die Zeile einfach zurück,
+    statt sie irgendwo zu sammeln.
+    """
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def _ndjson_lines(fields: Sequence[str], rows: Iterable[tuple]) -> Iterator[str]:
+    encoder = DjangoJSONEncoder(ensure_ascii=False, separators=(",", ":"))
+    for row in rows:
+        yield encoder.encode(dict(zip(fields, row))) + "\n"
+
+
+def _csv_lines(fields: Sequence[str], rows: Iterable[tuple]) -> Iterator[str]:
+    writer = csv.writer(_Echo())
+    yield writer.writerow(fields)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def iter_export(kind: str, fmt: str, chunk_size: int = DEFAULT_CHUNK_SIZE, using=None) -> Iterator[str]:
+    """
+    Streamt alle Zeilen von `kind` als NDJSON oder CSV.
+
+    Nutzt iterator(chunk_size=...) -> auf Postgres ein server-side Cursor,
+    d.h. der Speicherverbrauch hängt nur von chunk_size ab, nicht von der
+    Tabellengröße. Zeilen werden pro Chunk gebündelt ausgegeben, damit der
+    WSGI-Server nicht für jede einzelne Zeile schreibt. `using`: DB-Alias,
+    Default Router.
+    """
+    selector, fields = EXPORT_KINDS[kind]
+    rows = selector().using(using).iterator(chunk_size=chunk_size)
+    lines = _ndjson_lines(fields, rows) if fmt == "ndjson" else _csv_lines(fields, rows)
+
+    buf = []
+    for line in lines:
+        buf.append(line)
+        if len(buf) >= chunk_size:
+            yield "".join(buf)
+            buf = []
+    if buf:
+        yield "".join(buf)
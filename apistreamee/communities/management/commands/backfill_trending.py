@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from communities.services.trending import WINDOW, backfill_from_memberships, materialize_trending
+
+
+class Command(BaseCommand):
+    help = "Füllt die Activity-Buckets aus der Membership-Historie und materialisiert danach Trending."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--hours", type=int, default=int(WINDOW.total_seconds() // 3600))
+
+    def handle(self, *args, **options):
+        buckets = backfill_from_memberships(options["hours"])
+        data = materialize_trending()
+        self.stdout.write(f"buckets={buckets} trending={len(data)}")
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from communities.services.similarity import METRICS, SimilarityDependencyError, compute_similar_communities
+
+
+class Command(BaseCommand):
+    help = "Berechnet offline die ähnlichsten Communities (Co-Membership, benötigt numpy + scipy)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--top-k", type=int, default=10)
+        parser.add_argument("--metric", choices=METRICS, default="cosine")
+        parser.add_argument("--chunk-size", type=int, default=50_000, help="Memberships pro Cursor-Fetch.")
+        parser.add_argument("--block-rows", type=int, default=512, help="Communities pro Matrix-Block.")
+
+    def handle(self, *args, **options):
+        try:
+            written = compute_similar_communities(
+                top_k=options["top_k"],
+                metric=options["metric"],
+                chunk_size=options["chunk_size"],
+                block_rows=options["block_rows"],
+            )
+        except SimilarityDependencyError as e:
+            raise CommandError(str(e))
+        self.stdout.write(f"similar entries written: {written}")
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from communities.exports import DEFAULT_CHUNK_SIZE, EXPORT_FORMATS, EXPORT_KINDS, iter_export
+
+
+class Command(BaseCommand):
+    help = "Streamt Communities oder Memberships als NDJSON/CSV (server-side Cursor, konstanter Speicher)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("kind", choices=sorted(EXPORT_KINDS))
+        parser.add_argument("--format", dest="fmt", choices=sorted(EXPORT_FORMATS), default="ndjson")
+        parser.add_argument("--output", "-o", default="-", help="Zieldatei, '-' für stdout.")
+        parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        chunks = iter_export(options["kind"], options["fmt"], options["chunk_size"])
+
+        if options["output"] == "-":
+            for chunk in chunks:
+                self.stdout.write(chunk, ending="")
+            return
+
+        with open(options["output"], "w", encoding="utf-8", newline="") as fh:
+            for chunk in chunks:
+                fh.write(chunk)
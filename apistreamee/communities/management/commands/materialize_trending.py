@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from communities.services.trending import TOP_N, materialize_trending
+
+
+class Command(BaseCommand):
+    help = "Berechnet die Trending-Top-N aus den Activity-Buckets und legt sie in den Cache (für Cron)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--top", type=int, default=TOP_N)
+
+    def handle(self, *args, **options):
+        data = materialize_trending(options["top"])
+        self.stdout.write(f"trending: {len(data)} communities")
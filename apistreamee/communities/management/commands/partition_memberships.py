@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from communities.services import partitioning
+
+
+class Command(BaseCommand):
+    help = (
+        "Online-Migration von CommunityMembership auf Hash-Partitionierung nach community_id. "
+        "Schritte: prepare -> backfill -> reconcile -> swap (status jederzeit)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("step", choices=["prepare", "backfill", "reconcile", "swap", "status"])
+        parser.add_argument("--partitions", type=int, default=16)
+        parser.add_argument("--batch-size", type=int, default=50_000)
+        parser.add_argument("--max-batches", type=int, default=None)
+        parser.add_argument("--restart", action="store_true", help="backfill: Cursor ignorieren.")
+        parser.add_argument("--exact", action="store_true", help="status: COUNT(*) statt Schätzung.")
+
+    def _progress(self, done, total):
+        self.stdout.write(f"  id {done}/{total}")
+
+    def handle(self, *args, **options):
+        step = options["step"]
+        try:
+            if step == "prepare":
+                created = partitioning.prepare(options["partitions"])
+                self.stdout.write("shadow table created" if created else "shadow table already exists")
+            elif step == "backfill":
+                copied = partitioning.backfill(
+                    options["batch_size"], options["max_batches"], options["restart"], on_batch=self._progress
+                )
+                self.stdout.write(f"copied={copied}")
+            elif step == "reconcile":
+                fixed = partitioning.reconcile(options["batch_size"], on_batch=self._progress)
+                self.stdout.write(f"fixed={fixed}")
+            elif step == "swap":
+                partitioning.swap()
+                self.stdout.write(f"swapped; old table kept as {partitioning.LEGACY}")
+            else:
+                for key, value in partitioning.status(options["exact"]).items():
+                    self.stdout.write(f"{key}: {value}")
+        except partitioning.PartitioningError as e:
+            raise CommandError(str(e))
@@ -0,0 +1,34 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from communities.services.live_status import poll_live_status
+from integrations.providers import ProviderUnavailable
+
+
+class Command(BaseCommand):
+    help = "Pollt Helix /streams für alle Communities in festem Takt und speichert den Live-Status."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=settings.LIVE_STATUS_POLL_SECONDS,
+            help="Sekunden zwischen zwei Durchläufen (Default LIVE_STATUS_POLL_SECONDS).",
+        )
+        parser.add_argument("--once", action="store_true")
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.monotonic()
+            try:
+                live = poll_live_status()
+                self.stdout.write(f"live={live} took={time.monotonic() - started:.1f}s")
+            except ProviderUnavailable as e:
+                # Status bleibt bis zum nächsten Durchlauf auf dem letzten Stand
+                self.stderr.write(f"poll skipped: {e}")
+
+            if options["once"]:
+                return
+            time.sleep(max(0.0, options["interval"] - (time.monotonic() - started)))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from communities.services.profile_refresh import refresh_twitch_profiles
+from integrations.providers.twitch import HELIX_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = "Aktualisiert Twitch-Profilfelder aller Communities (für Cron, fortsetzbar nach Abbruch)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=HELIX_BATCH_SIZE)
+        parser.add_argument("--max-batches", type=int, default=None, help="Nach N Batches stoppen (Rest beim nächsten Lauf).")
+        parser.add_argument("--restart", action="store_true", help="Cursor ignorieren und von vorne beginnen.")
+
+    def handle(self, *args, **options):
+        stats = refresh_twitch_profiles(
+            batch_size=options["batch_size"],
+            max_batches=options["max_batches"],
+            restart=options["restart"],
+        )
+        state = "complete" if stats.finished else "paused"
+        self.stdout.write(
+            f"{state}: scanned={stats.scanned} updated={stats.updated} missing={stats.missing} batches={stats.batches}"
+        )
@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from communities.services.membership_stats import rebuild_from_memberships, rollup_pending
+
+
+class Command(BaseCommand):
+    help = "Worker: rechnet neue Join/Leave-Events in die Tages-Rollups (CommunityDailyStats) ein."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--idle-sleep", type=float, default=5.0, help="Pause in Sekunden, wenn keine Events offen sind.")
+        parser.add_argument("--once", action="store_true", help="Offene Events einmal abarbeiten und beenden.")
+        parser.add_argument(
+            "--rebuild",
+            action="store_true",
+            help="Rollups einmalig aus den bestehenden Memberships neu aufbauen (Einführung) und beenden.",
+        )
+
+    def handle(self, *args, **options):
+        if options["rebuild"]:
+            days = rebuild_from_memberships()
+            self.stdout.write(f"rebuilt={days} community-days")
+            return
+
+        total = 0
+        while True:
+            processed = rollup_pending(options["batch_size"])
+            total += processed
+            if processed:
+                continue
+            if options["once"]:
+                break
+            time.sleep(options["idle_sleep"])
+
+        self.stdout.write(f"rolled_up={total}")
@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from communities.services.seeding import SEED_PASSWORD, SeedError, seed_scale
+
+
+class Command(BaseCommand):
+    help = "Erzeugt synthetische User/Communities/Memberships (Power-Law) für Skalierungs-Benchmarks."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=100_000)
+        parser.add_argument("--communities", type=int, default=10_000)
+        parser.add_argument("--memberships-per-user", type=float, default=20.0, help="Mittelwert (lognormal).")
+        parser.add_argument("--alpha", type=float, default=1.1, help="Zipf-Exponent der Community-Beliebtheit.")
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument("--prefix", default="seed", help="Präfix für Usernames/Slugs, muss neu sein.")
+        parser.add_argument("--days", type=int, default=90, help="Zeitraum für joined_at/created_at.")
+        parser.add_argument("--chunk-size", type=int, default=50_000, help="Zeilen pro COPY/bulk_create.")
+        parser.add_argument("--no-copy", action="store_true", help="bulk_create auch auf Postgres.")
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        try:
+            stats = seed_scale(
+                users=options["users"],
+                communities=options["communities"],
+                memberships_per_user=options["memberships_per_user"],
+                alpha=options["alpha"],
+                seed=options["seed"],
+                prefix=options["prefix"],
+                days=options["days"],
+                chunk_size=options["chunk_size"],
+                use_copy=not options["no_copy"],
+            )
+        except SeedError as e:
+            raise CommandError(str(e))
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            f"{stats.method}: users={stats.users} communities={stats.communities} "
+            f"memberships={stats.memberships} in {elapsed:.1f}s "
+            f"(login: {options['prefix']}_0@example.com / {SEED_PASSWORD})"
+        )
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('communities', '0002_remove_community_communities_created_4d42e1_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CommunityLiveStream',
+            fields=[
+                ('community', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='live_stream', serialize=False, to='communities.community')),
+                ('viewer_count', models.PositiveIntegerField(default=0)),
+                ('started_at', models.DateTimeField()),
+                ('checked_at', models.DateTimeField()),
+            ],
+        ),
+    ]
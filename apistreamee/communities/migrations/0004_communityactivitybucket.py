@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('communities', '0003_communitylivestream'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CommunityActivityBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket_start', models.DateTimeField()),
+                ('joins', models.PositiveIntegerField(default=0)),
+                ('leaves', models.PositiveIntegerField(default=0)),
+                ('community', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='activity_buckets', to='communities.community')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['bucket_start'], name='communities_bucket__55bd6c_idx')],
+                'constraints': [models.UniqueConstraint(fields=('community', 'bucket_start'), name='uniq_activity_community_bucket')],
+            },
+        ),
+    ]
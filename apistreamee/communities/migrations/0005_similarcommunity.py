@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('communities', '0004_communityactivitybucket'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SimilarCommunity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('score', models.FloatField()),
+                ('community', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similar_entries', to='communities.community')),
+                ('similar', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='communities.community')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('community', 'rank'), name='uniq_similar_community_rank')],
+            },
+        ),
+    ]
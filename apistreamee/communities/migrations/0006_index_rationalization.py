@@ -0,0 +1,92 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+from communities.migrations._online_ddl import create_index_online, replace_unique_online
+
+MEMBERSHIP = 'communities_communitymembership'
+
+
+# Neue Indexe zuerst und ohne Schreibsperre (CONCURRENTLY bzw. pro Partition),
+# danach übernimmt der Constraint den fertigen Index, erst dann wird gedroppt.
+def create_membership_indexes(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        create_index_online(cursor, MEMBERSHIP, 'membership_user_cover_idx', 'USING btree (user_id) INCLUDE (community_id)')
+        create_index_online(
+            cursor, MEMBERSHIP, 'membership_admin_idx',
+            "USING btree (community_id, user_id) WHERE role = 'admin'",
+        )
+        replace_unique_online(
+            cursor, MEMBERSHIP, 'uniq_membership_community_user', '(community_id, user_id) INCLUDE (role)'
+        )
+
+
+def drop_membership_indexes(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        replace_unique_online(cursor, MEMBERSHIP, 'uniq_membership_community_user', '(community_id, user_id)')
+        cursor.execute('DROP INDEX IF EXISTS membership_admin_idx')
+        cursor.execute('DROP INDEX IF EXISTS membership_user_cover_idx')
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('communities', '0005_similarcommunity'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(
+                    model_name='communitymembership',
+                    index=models.Index(fields=['user'], include=('community',), name='membership_user_cover_idx'),
+                ),
+                migrations.AddIndex(
+                    model_name='communitymembership',
+                    index=models.Index(condition=models.Q(('role', 'admin')), fields=['community', 'user'], name='membership_admin_idx'),
+                ),
+                migrations.RemoveConstraint(
+                    model_name='communitymembership',
+                    name='uniq_membership_community_user',
+                ),
+                migrations.AddConstraint(
+                    model_name='communitymembership',
+                    constraint=models.UniqueConstraint(fields=('community', 'user'), include=('role',), name='uniq_membership_community_user'),
+                ),
+            ],
+            database_operations=[
+                migrations.RunPython(create_membership_indexes, drop_membership_indexes),
+            ],
+        ),
+        migrations.RemoveIndex(
+            model_name='community',
+            name='communities_slug_81f3ae_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='community',
+            name='communities_platfor_0ee675_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='communitymembership',
+            name='communities_communi_f9047f_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='communitymembership',
+            name='communities_user_id_31aa3d_idx',
+        ),
+        migrations.AlterField(
+            model_name='communitymembership',
+            name='community',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='memberships', to='communities.community'),
+        ),
+        migrations.AlterField(
+            model_name='communitymembership',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='community_memberships', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
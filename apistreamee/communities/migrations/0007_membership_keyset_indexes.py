@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:24
+
+from django.conf import settings
+from django.db import migrations, models
+
+from communities.migrations._online_ddl import AddIndexOnline
+
+
+class Migration(migrations.Migration):
+
+    # CONCURRENTLY geht nicht in einer Transaktion
+    atomic = False
+
+    dependencies = [
+        ('communities', '0006_index_rationalization'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexOnline(
+            model_name='communitymembership',
+            index=models.Index(fields=['community', '-joined_at', '-id'], name='membership_joined_idx'),
+        ),
+        AddIndexOnline(
+            model_name='communitymembership',
+            index=models.Index(fields=['community', 'role', '-joined_at', '-id'], name='membership_role_joined_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:32
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('communities', '0008_membership_events_daily_stats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='community',
+            index=models.Index(fields=['platform', 'external_login'], name='community_platform_login_idx'),
+        ),
+    ]
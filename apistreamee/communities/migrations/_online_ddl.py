@@ -0,0 +1,122 @@
+"""
+Online-DDL für Migrationen (CREATE INDEX ohne Schreibsperre, auch auf der
+hash-partitionierten Membership-Tabelle).
+
+Bewusst eine eingefrorene Kopie von communities.services.partitioning: Migrationen
+dürfen sich nicht ändern, wenn der Service weiterentwickelt wird. Nur SQL, keine
+Models. Der Loader ignoriert Module mit führendem Unterstrich.
+"""
+import re
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import transaction
+
+_REMAINDER_RE = re.compile(r"remainder (\d+)")
+
+
+def _name(base: str, suffix: str) -> str:
+    # Postgres kürzt Identifier auf 63 Zeichen
+    return base[: 63 - len(suffix)] + suffix
+
+
+def _q(cursor, identifier: str) -> str:
+    return cursor.db.ops.quote_name(identifier)
+
+
+def is_partitioned(cursor, table: str) -> bool:
+    cursor.execute("SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass(%s)", [table])
+    row = cursor.fetchone()
+    return bool(row and row[0])
+
+
+def _partitions(cursor, table: str):
+    """[(Partition, Remainder)], nach Remainder sortiert."""
+    cursor.execute(
+        "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = %s::regclass",
+        [table],
+    )
+    partitions = [(name, int(_REMAINDER_RE.search(bound).group(1))) for name, bound in cursor.fetchall()]
+    return sorted(partitions, key=lambda p: p[1])
+
+
+def _unique_constraints(cursor, table: str) -> list[str]:
+    cursor.execute("SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass AND contype = 'u'", [table])
+    return [row[0] for row in cursor.fetchall()]
+
+
+def create_index_online(cursor, table: str, index_name: str, definition: str, unique: bool = False) -> None:
+    """
+    `definition`: alles nach "ON <table>". Normale Tabelle: CONCURRENTLY.
+    Partitioniert: Parent-Index ON ONLY, pro Partition CONCURRENTLY, dann ATTACH.
+    """
+    kind = "UNIQUE INDEX" if unique else "INDEX"
+    if not is_partitioned(cursor, table):
+        cursor.execute(f"CREATE {kind} CONCURRENTLY IF NOT EXISTS {_q(cursor, index_name)} ON {_q(cursor, table)} {definition}")
+        return
+
+    cursor.execute(f"CREATE {kind} IF NOT EXISTS {_q(cursor, index_name)} ON ONLY {_q(cursor, table)} {definition}")
+    for partition, remainder in _partitions(cursor, table):
+        child = _name(index_name, f"_p{remainder}")
+        cursor.execute(f"CREATE {kind} CONCURRENTLY IF NOT EXISTS {_q(cursor, child)} ON {_q(cursor, partition)} {definition}")
+        cursor.execute("SELECT 1 FROM pg_inherits WHERE inhrelid = to_regclass(%s)", [child])
+        if cursor.fetchone() is None:
+            cursor.execute(f"ALTER INDEX {_q(cursor, index_name)} ATTACH PARTITION {_q(cursor, child)}")
+
+
+def replace_unique_online(cursor, table: str, constraint_name: str, definition: str) -> None:
+    """
+    Ersetzt einen UNIQUE-Constraint durch `UNIQUE <definition>` unter gleichem
+    Namen: Index CONCURRENTLY (pro Partition), dann nur ein kurzes ALTER TABLE.
+    """
+    name = _q(cursor, constraint_name)
+    if not is_partitioned(cursor, table):
+        new_index = _q(cursor, _name(constraint_name, "_new"))
+        cursor.execute(f"CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS {new_index} ON {_q(cursor, table)} {definition}")
+        with transaction.atomic(using=cursor.db.alias):
+            cursor.execute(f"ALTER TABLE {_q(cursor, table)} DROP CONSTRAINT IF EXISTS {name}")
+            cursor.execute(f"ALTER TABLE {_q(cursor, table)} ADD CONSTRAINT {name} UNIQUE USING INDEX {new_index}")
+        return
+
+    for partition, remainder in _partitions(cursor, table):
+        child = _name(constraint_name, f"_p{remainder}")
+        cursor.execute(f"CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS {_q(cursor, child)} ON {_q(cursor, partition)} {definition}")
+        if child not in _unique_constraints(cursor, partition):
+            cursor.execute(
+                f"ALTER TABLE {_q(cursor, partition)} ADD CONSTRAINT {_q(cursor, child)} UNIQUE USING INDEX {_q(cursor, child)}"
+            )
+    # Der neue Parent-Constraint übernimmt die passenden Partition-Constraints
+    with transaction.atomic(using=cursor.db.alias):
+        cursor.execute(f"ALTER TABLE {_q(cursor, table)} DROP CONSTRAINT IF EXISTS {name}")
+        cursor.execute(f"ALTER TABLE {_q(cursor, table)} ADD CONSTRAINT {name} UNIQUE {definition}")
+
+
+class AddIndexOnline(AddIndexConcurrently):
+    """
+    AddIndexConcurrently, das auch auf der partitionierten Membership-Tabelle
+    läuft (dort kann Postgres CONCURRENTLY nicht auf dem Parent): dann über
+    create_index_online. Rückwärts auf Partitionen ein normales DROP INDEX,
+    DROP INDEX CONCURRENTLY geht dort ebenfalls nicht.
+    """
+
+    def _partitioned(self, schema_editor, model) -> bool:
+        with schema_editor.connection.cursor() as cursor:
+            return is_partitioned(cursor, model._meta.db_table)
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if not self.allow_migrate_model(schema_editor.connection.alias, model) or not self._partitioned(schema_editor, model):
+            return super().database_forwards(app_label, schema_editor, from_state, to_state)
+        self._ensure_not_in_transaction(schema_editor)
+        table = model._meta.db_table
+        statement = str(self.index.create_sql(model, schema_editor))
+        definition = statement.partition(f" ON {schema_editor.quote_name(table)} ")[2]
+        with schema_editor.connection.cursor() as cursor:
+            create_index_online(cursor, table, self.index.name, definition)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        model = from_state.apps.get_model(app_label, self.model_name)
+        if not self.allow_migrate_model(schema_editor.connection.alias, model) or not self._partitioned(schema_editor, model):
+            return super().database_backwards(app_label, schema_editor, from_state, to_state)
+        self._ensure_not_in_transaction(schema_editor)
+        schema_editor.remove_index(model, self.index)
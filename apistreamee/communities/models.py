@@ -43,28 +43,138 @@ class Community(models.Model):
             models.UniqueConstraint(fields=["platform", "external_id"], name="uniq_community_platform_external_id"),
         ]
         indexes = [
-            models.Index(fields=["slug"]),
-            models.Index(fields=["platform", "external_id"]),
+            # slug (unique=True) und (platform, external_id) (Constraint) haben schon eigene Indexe
             models.Index(fields=["status"]),
+            # Create: bestehende Community per Login finden, bevor Helix gefragt wird
+            models.Index(fields=["platform", "external_login"], name="community_platform_login_idx"),
         ]
 
+    def save(self, *args, **kwargs):
+        # Slug einmalig aus dem Namen (bzw. Twitch-Login), bei Kollision mit -2, -3, ...
+        if not self.slug:
+            base = slugify(self.name or self.external_login)[:130] or "community"
+            slug, n = base, 2
+            while Community.objects.filter(slug=slug).exists():
+                slug, n = f"{base}-{n}", n + 1
+            self.slug = slug
+        super().save(*args, **kwargs)
+
 class MembershipRole(models.TextChoices):
     MEMBER = "member", "Member"
     ADMIN = "admin", "Admin"
 
 
 class CommunityMembership(models.Model):
-    community = models.ForeignKey(Community, on_delete=models.CASCADE, related_name="memberships")
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="community_memberships")
+    # Kein FK-Index: (community, user) aus dem Unique-Constraint deckt community_id mit ab
+    community = models.ForeignKey(Community, on_delete=models.CASCADE, related_name="memberships", db_index=False)
+    # Kein FK-Index: ersetzt durch den Covering-Index (user) INCLUDE (community)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="community_memberships", db_index=False)
 
     role = models.CharField(max_length=32, choices=MembershipRole.choices, default=MembershipRole.MEMBER)
     joined_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         constraints = [
-            models.UniqueConstraint(fields=["community", "user"], name="uniq_membership_community_user")
+            # INCLUDE role: is_member/my_role-Lookups sind Index-Only-Scans
+            models.UniqueConstraint(fields=["community", "user"], include=["role"], name="uniq_membership_community_user")
         ]
         indexes = [
-            models.Index(fields=["community", "user"]),
-            models.Index(fields=["user"]),
+            # me/communities: community_ids eines Users ohne Heap-Zugriff
+            models.Index(fields=["user"], include=["community"], name="membership_user_cover_idx"),
+            # Admin-Checks (IsCommunityAdmin, last-admin Guard beim Leave)
+            models.Index(fields=["community", "user"], condition=models.Q(role="admin"), name="membership_admin_idx"),
+            # Mitgliederliste (Keyset auf joined_at, id), mit und ohne ?role=
+            models.Index(fields=["community", "-joined_at", "-id"], name="membership_joined_idx"),
+            models.Index(fields=["community", "role", "-joined_at", "-id"], name="membership_role_joined_idx"),
+        ]
+
+
+class CommunityLiveStream(models.Model):
+    """
+    Vom poll_live_status Poller gepflegt: eine Zeile pro Community, die gerade
+    live ist (offline -> Zeile wird gelöscht). Bleibt dadurch klein.
+    """
+
+    community = models.OneToOneField(Community, on_delete=models.CASCADE, primary_key=True, related_name="live_stream")
+    viewer_count = models.PositiveIntegerField(default=0)
+    started_at = models.DateTimeField()
+    checked_at = models.DateTimeField()
+
+
+class CommunityActivityBucket(models.Model):
+    """
+    Stündliche Join/Leave-Zähler pro Community (Basis für Trending).
+    Vom Rollup-Worker aus MembershipEvent hochgezählt, nie aus Memberships neu gescannt.
+    """
+
+    community = models.ForeignKey(Community, on_delete=models.CASCADE, related_name="activity_buckets")
+    bucket_start = models.DateTimeField()
+    joins = models.PositiveIntegerField(default=0)
+    leaves = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["community", "bucket_start"], name="uniq_activity_community_bucket"),
+        ]
+        indexes = [
+            models.Index(fields=["bucket_start"]),
+        ]
+
+
+class SimilarCommunity(models.Model):
+    """
+    Offline berechnete Co-Membership-Ähnlichkeit (compute_similar_communities),
+    top-k pro Community, damit /similar/ nur ein Index-Read ist.
+    """
+
+    community = models.ForeignKey(Community, on_delete=models.CASCADE, related_name="similar_entries")
+    similar = models.ForeignKey(Community, on_delete=models.CASCADE, related_name="+")
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["community", "rank"], name="uniq_similar_community_rank"),
+        ]
+
+
+class MembershipEventKind(models.TextChoices):
+    JOIN = "join", "Join"
+    LEAVE = "leave", "Leave"
+
+
+class MembershipEvent(models.Model):
+    """
+    Append-only Log aller Joins/Leaves (Memberships selbst werden beim Leave
+    gelöscht). Gleichzeitig Queue für die Tages-Rollups (rolled_up_at IS NULL).
+    """
+
+    id = models.BigAutoField(primary_key=True)
+    community = models.ForeignKey(Community, on_delete=models.CASCADE, related_name="membership_events")
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name="+", db_index=False)
+    kind = models.CharField(max_length=8, choices=MembershipEventKind.choices)
+    created_at = models.DateTimeField(auto_now_add=True)
+    rolled_up_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["id"], condition=models.Q(rolled_up_at__isnull=True), name="membership_event_pending_idx"),
+        ]
+
+
+class CommunityDailyStats(models.Model):
+    """
+    Tages-Rollup aus MembershipEvent (rollup_membership_stats): Joins/Leaves
+    des Tages und Mitgliederstand am Tagesende. Tage ohne Events haben keine Zeile.
+    """
+
+    community = models.ForeignKey(Community, on_delete=models.CASCADE, related_name="daily_stats", db_index=False)
+    day = models.DateField()
+    joins = models.PositiveIntegerField(default=0)
+    leaves = models.PositiveIntegerField(default=0)
+    members = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["community", "day"], name="uniq_daily_stats_community_day"),
         ]
@@ -1,24 +1,134 @@
-from django.db.models import Count, Exists, OuterRef, Value, CharField, Subquery
-from ..models import Community, CommunityMembership
+from datetime import timedelta
 
+from django.conf import settings
+from django.db.models import BooleanField, Count, Exists, ExpressionWrapper, F, FilteredRelation, OuterRef, Q, Value, CharField, Subquery
+from django.utils import timezone
+from ..models import Community, CommunityMembership, SimilarCommunity
 
-def communities_with_counts():
-    return Community.objects.annotate(member_count=Count("memberships"))
 
+def _sparse(qs, fields):
+    """
+    Beschränkt das SELECT auf die angefragten Model-Felder (?fields=).
+    Annotationen (member_count, is_member, ...) werden hier ignoriert.
+    """
+    if fields is None:
+        return qs
+    concrete = {f.name for f in Community._meta.concrete_fields}
+    return qs.only("id", *[f for f in fields if f in concrete])
 
-def community_detail_with_user_flags(slug: str, user=None):
-    qs = Community.objects.filter(slug=slug).annotate(member_count=Count("memberships"))
+
+def _wants(fields, name: str) -> bool:
+    return fields is None or name in fields
+
+
+def live_fresh_after(now=None):
+    """
+    CommunityLiveStream-Zeilen mit älterem checked_at gelten als offline: steht
+    der Poller, bleibt sonst alles ewig live (Liste, Trending-Boost).
+    """
+    return (now or timezone.now()) - timedelta(seconds=2 * settings.LIVE_STATUS_POLL_SECONDS)
+
+
+def communities_with_counts(fields=None, live_only: bool = False, live_first: bool = False):
+    qs = _sparse(Community.objects.all(), fields)
+    if _wants(fields, "member_count"):
+        qs = qs.annotate(member_count=Count("memberships"))
+
+    # Live-Status kommt nur aus CommunityLiveStream (vom Poller gepflegt), nie live von Helix
+    wants_live = live_only or live_first or any(_wants(fields, f) for f in ("is_live", "viewer_count", "live_started_at"))
+    if wants_live:
+        fresh = Q(live_stream__checked_at__gte=live_fresh_after())
+        qs = qs.annotate(live=FilteredRelation("live_stream", condition=fresh))
+    if live_only:
+        qs = qs.filter(live__isnull=False)
+    if _wants(fields, "is_live") or live_first:
+        qs = qs.annotate(is_live=ExpressionWrapper(Q(live__isnull=False), output_field=BooleanField()))
+    if _wants(fields, "viewer_count") or live_first:
+        qs = qs.annotate(viewer_count=F("live__viewer_count"))
+    if _wants(fields, "live_started_at"):
+        qs = qs.annotate(live_started_at=F("live__started_at"))
+    if live_first:
+        qs = qs.order_by("-is_live", F("viewer_count").desc(nulls_last=True), "-created_at")
+    return qs
+
+
+def communities_of_user(user, fields=None, pending_ids=()):
+    # pk__in statt JOIN-Filter, sonst zählt member_count nur die eigene Membership
+    member_of = Q(pk__in=CommunityMembership.objects.filter(user=user).values("community_id"))
+    if pending_ids:
+        # Gepufferte, noch nicht geflushte Joins (JoinBuffer)
+        member_of |= Q(pk__in=pending_ids)
+    return communities_with_counts(fields).filter(member_of)
+
+
+def community_detail_with_user_flags(slug: str, user=None, fields=None):
+    return _with_user_flags(Community.objects.filter(slug=slug), user, fields)
+
+
+def communities_detail_batch(ids=None, slugs=None, user=None, fields=None):
+    """
+    Multi-Get: dieselben Felder wie die Detail-Ansicht, aber für viele
+    Communities in einer Query. Reihenfolge/fehlende Keys regelt der Aufrufer.
+    """
+    qs = Community.objects.filter(pk__in=ids) if ids is not None else Community.objects.filter(slug__in=slugs)
+    return _with_user_flags(qs, user, fields)
+
+
+def _with_user_flags(qs, user=None, fields=None):
+    qs = _sparse(qs, fields)
+    if _wants(fields, "member_count"):
+        qs = qs.annotate(member_count=Count("memberships"))
 
     if user and user.is_authenticated:
         membership_qs = CommunityMembership.objects.filter(community=OuterRef("pk"), user=user)
-        qs = qs.annotate(
-            is_member=Exists(membership_qs),
-            my_role=Subquery(membership_qs.values("role")[:1]),
-        )
+        is_member = Exists(membership_qs)
+        my_role = Subquery(membership_qs.values("role")[:1])
     else:
-        qs = qs.annotate(
-            is_member=Value(False),
-            my_role=Value("", output_field=CharField()),
-        )
+        is_member = Value(False)
+        my_role = Value("", output_field=CharField())
+
+    if _wants(fields, "is_member"):
+        qs = qs.annotate(is_member=is_member)
+    if _wants(fields, "my_role"):
+        qs = qs.annotate(my_role=my_role)
 
     return qs
+
+
+def similar_communities(community_id: int):
+    # Ein Index-Read auf uniq_similar_community_rank (community, rank)
+    return (
+        SimilarCommunity.objects.filter(community_id=community_id)
+        .select_related("similar")
+        .only("rank", "score", "similar__id", "similar__name", "similar__slug")
+        .order_by("rank")
+    )
+
+
+COMMUNITY_EXPORT_FIELDS = (
+    "id",
+    "name",
+    "slug",
+    "platform",
+    "external_id",
+    "external_login",
+    "external_display_name",
+    "external_profile_image_url",
+    "status",
+    "created_by_id",
+    "owner_id",
+    "description",
+    "created_at",
+    "updated_at",
+)
+
+MEMBERSHIP_EXPORT_FIELDS = ("id", "community_id", "user_id", "role", "joined_at")
+
+
+def communities_for_export():
+    # values_list: keine Model-Instanzen, nur Tupel -> flacher Speicher beim Streamen
+    return Community.objects.order_by("pk").values_list(*COMMUNITY_EXPORT_FIELDS)
+
+
+def memberships_for_export():
+    return CommunityMembership.objects.order_by("pk").values_list(*MEMBERSHIP_EXPORT_FIELDS)
@@ -0,0 +1,44 @@
+import base64
+from datetime import datetime
+
+from django.db.models import Q
+
+from ..models import CommunityMembership
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_member_cursor(membership) -> str:
+    raw = f"{membership.joined_at.isoformat()}|{membership.pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_member_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        joined_at, pk = raw.split("|")
+        return datetime.fromisoformat(joined_at), int(pk)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise InvalidCursor(cursor) from e
+
+
+def community_members(community_id: int, role: str = None, after: tuple[datetime, int] = None):
+    """
+    Neueste Mitglieder zuerst, Keyset auf (joined_at, id) statt OFFSET:
+    jede Seite ist ein Range-Scan auf membership_joined_idx bzw.
+    membership_role_joined_idx (mit ?role=).
+    """
+    qs = CommunityMembership.objects.filter(community_id=community_id)
+    if role:
+        qs = qs.filter(role=role)
+    if after is not None:
+        joined_at, pk = after
+        # joined_at__lte grenzt den Index-Range ein, das OR entscheidet nur noch bei Gleichstand
+        qs = qs.filter(Q(joined_at__lt=joined_at) | Q(joined_at=joined_at, pk__lt=pk), joined_at__lte=joined_at)
+    return (
+        qs.select_related("user")
+        .only("id", "role", "joined_at", "user__id", "user__username")
+        .order_by("-joined_at", "-pk")
+    )
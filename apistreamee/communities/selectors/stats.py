@@ -0,0 +1,31 @@
+from datetime import date, timedelta
+
+from ..models import CommunityDailyStats
+
+
+def community_daily_stats(community_id: int, start: date, end: date) -> list[dict]:
+    """
+    Eine Zeile pro Tag in [start, end] aus den Rollups: ein Range-Read auf
+    uniq_daily_stats_community_day plus der letzte Stand vor `start`.
+    Tage ohne Events übernehmen den Mitgliederstand des Vortags.
+    """
+    rows = {
+        day: (joins, leaves, members)
+        for day, joins, leaves, members in CommunityDailyStats.objects.filter(
+            community_id=community_id, day__range=(start, end)
+        ).values_list("day", "joins", "leaves", "members")
+    }
+    members = (
+        CommunityDailyStats.objects.filter(community_id=community_id, day__lt=start)
+        .order_by("-day")
+        .values_list("members", flat=True)
+        .first()
+    ) or 0
+
+    days = []
+    day = start
+    while day <= end:
+        joins, leaves, members = rows.get(day, (0, 0, members))
+        days.append({"day": day, "joins": joins, "leaves": leaves, "members": members})
+        day += timedelta(days=1)
+    return days
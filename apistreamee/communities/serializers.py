@@ -1,19 +1,70 @@
-from rest_framework import serializers
-from .models import Community, CommunityMembership
-from integrations.providers.twitch import resolve_user_by_login, TwitchNotFoundError, TwitchConfigError
-from django.db import IntegrityError
+from rest_framework import serializers, status
+from rest_framework.exceptions import APIException
+from .models import Community, CommunityMembership, CommunityPlatform, MembershipEventKind
+from .services.membership_stats import record_membership_event
+from .services.single_flight import single_flight
+from integrations.providers import ProviderConfigError, ProviderNotFoundError, ProviderUnavailable, get_provider
+from django.db import IntegrityError, transaction
 import re
 
+PLATFORM_EXTERNAL_ID_CONSTRAINT = "uniq_community_platform_external_id"
+# Neue Slug-Versuche, wenn ein paralleler Create denselben Slug gerade belegt hat
+SLUG_ATTEMPTS = 3
 
-class CommunityListSerializer(serializers.ModelSerializer):
+
+def parse_sparse_fields(raw, serializer_class):
+    """
+    ?fields=id,name,slug -> ["id", "name", "slug"]; None wenn nicht gesetzt.
+    Unbekannte Felder -> ValidationError (400).
+    """
+    if raw is None:
+        return None
+
+    requested = [f.strip() for f in raw.split(",") if f.strip()]
+    if not requested:
+        raise serializers.ValidationError({"fields": "At least one field is required."})
+
+    allowed = serializer_class.Meta.fields
+    unknown = [f for f in requested if f not in allowed]
+    if unknown:
+        raise serializers.ValidationError({"fields": f"Unknown fields: {', '.join(unknown)}."})
+    return list(dict.fromkeys(requested))
+
+
+class SparseFieldsMixin:
+    """
+    Serializer-kwarg `fields=[...]` entfernt alle nicht angefragten Felder.
+    """
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class CommunityListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     member_count = serializers.IntegerField(read_only=True)
+    is_live = serializers.BooleanField(read_only=True)
+    viewer_count = serializers.IntegerField(read_only=True, allow_null=True)
+    live_started_at = serializers.DateTimeField(read_only=True, allow_null=True)
 
     class Meta:
         model = Community
-        fields = ["id", "name", "slug", "description", "member_count", "created_at"]
+        fields = [
+            "id",
+            "name",
+            "slug",
+            "description",
+            "member_count",
+            "is_live",
+            "viewer_count",
+            "live_started_at",
+            "created_at",
+        ]
 
 
-class CommunityDetailSerializer(serializers.ModelSerializer):
+class CommunityDetailSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     member_count = serializers.IntegerField(read_only=True)
     is_member = serializers.BooleanField(read_only=True)
     my_role = serializers.CharField(read_only=True)
@@ -35,6 +86,18 @@ class CommunityDetailSerializer(serializers.ModelSerializer):
         read_only_fields = ["created_by", "created_at", "updated_at"]
 
 
+class TwitchUnavailableError(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Twitch is temporarily unavailable, please retry shortly."
+    default_code = "twitch_unavailable"
+
+
+class CommunityCreateInProgressError(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "This community is being created by another request, please retry shortly."
+    default_code = "create_in_progress"
+
+
 def extract_twitch_login(value: str) -> str:
     v = value.strip()
     m = re.search(r"twitch\.tv/([A-Za-z0-9_]+)", v, re.IGNORECASE)
@@ -55,47 +118,100 @@ class CommunityCreateSerializer(serializers.Serializer):
         return login
 
     def create(self, validated_data):
-        request = self.context["request"]
         login = validated_data["twitch"]
-
+        self.created = False
+
+        # Single-Flight pro Login: gleichzeitige Creates für denselben Streamer (auch auf
+        # anderen Workern) warten hier, nur der erste fragt Helix und legt an; die anderen
+        # finden danach die fertige Community und bekommen sie zurück
+        with single_flight(f"community-create:twitch:{login}") as acquired:
+            existing = _existing_community(login)
+            if existing is not None:
+                return existing
+            if not acquired:
+                # Der Halter arbeitet noch: nicht parallel anlegen, Client soll es erneut versuchen
+                raise CommunityCreateInProgressError()
+            return self._create(login, validated_data)
+
+    def _create(self, login, validated_data):
+        request = self.context["request"]
         try:
-            twitch_user = resolve_user_by_login(login)
-        except TwitchConfigError:
+            twitch_user = get_provider(CommunityPlatform.TWITCH).resolve(login)
+        except ProviderConfigError:
             raise serializers.ValidationError({"twitch": "Twitch is not configured on server (missing client id/secret)."})
-        except TwitchNotFoundError:
+        except ProviderNotFoundError:
             raise serializers.ValidationError({"twitch": "Twitch user not found."})
+        except ProviderUnavailable:
+            raise TwitchUnavailableError()
 
         # Name default: Twitch display_name
         name = (validated_data.get("name") or twitch_user.display_name).strip()
         description = (validated_data.get("description") or "").strip()
 
-        try:
-            community = Community.objects.create(
-                name=name,
-                platform="twitch",
-                external_id=twitch_user.id,
-                external_login=twitch_user.login,
-                external_display_name=twitch_user.display_name,
-                external_profile_image_url=twitch_user.profile_image_url,
-                status="unclaimed",
-                created_by=request.user,
-                description=description,
-            )
-        except IntegrityError:
-            # unique(platform, external_id) -> community exists already
-            raise serializers.ValidationError({"twitch": "Community for this streamer already exists."})
-
-        CommunityMembership.objects.create(community=community, user=request.user, role="admin")
+        # Community, Admin-Membership und Join-Event ganz oder gar nicht
+        with transaction.atomic(savepoint=False):
+            for attempt in range(SLUG_ATTEMPTS):
+                community = Community(
+                    name=name,
+                    platform="twitch",
+                    external_id=twitch_user.id,
+                    external_login=twitch_user.login,
+                    external_display_name=twitch_user.display_name,
+                    external_profile_image_url=twitch_user.profile_image_url,
+                    status="unclaimed",
+                    created_by=request.user,
+                    description=description,
+                )
+                try:
+                    with transaction.atomic():
+                        community.save(force_insert=True)
+                    break
+                except IntegrityError as e:
+                    if _violated_constraint(e) == PLATFORM_EXTERNAL_ID_CONSTRAINT:
+                        # z.B. umbenannter Streamer, dessen Community noch den alten Login hat
+                        return Community.objects.get(platform="twitch", external_id=twitch_user.id)
+                    # Slug-Suche in Community.save() ist check-then-insert: parallele Creates mit
+                    # gleichem Namen können denselben Slug wählen, dann mit neuem Slug nochmal
+                    if attempt == SLUG_ATTEMPTS - 1 or not Community.objects.filter(slug=community.slug).exists():
+                        raise
+
+            CommunityMembership.objects.create(community=community, user=request.user, role="admin")
+            record_membership_event(community.pk, request.user.pk, MembershipEventKind.JOIN)
+        self.created = True
         return community
 
 
+def _violated_constraint(error: IntegrityError):
+    return getattr(getattr(error.__cause__, "diag", None), "constraint_name", None)
+
+
+def _existing_community(login: str):
+    return Community.objects.filter(platform="twitch", external_login=login).first()
+
+
 class CommunityPatchSerializer(serializers.ModelSerializer):
     class Meta:
         model = Community
         fields = ["name", "description"]
 
 
+class SimilarCommunitySerializer(serializers.Serializer):
+    id = serializers.IntegerField(source="similar.id")
+    name = serializers.CharField(source="similar.name")
+    slug = serializers.CharField(source="similar.slug")
+    score = serializers.FloatField()
+
+
 class MembershipSerializer(serializers.ModelSerializer):
     class Meta:
         model = CommunityMembership
         fields = ["community", "role", "joined_at"]
+
+
+class CommunityMemberSerializer(serializers.ModelSerializer):
+    user_id = serializers.IntegerField(source="user.id")
+    username = serializers.CharField(source="user.username")
+
+    class Meta:
+        model = CommunityMembership
+        fields = ["id", "user_id", "username", "role", "joined_at"]
@@ -0,0 +1,211 @@
+import atexit
+import logging
+import threading
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from ..models import Community, CommunityMembership, MembershipEventKind, MembershipRole
+from .membership_stats import record_membership_events
+
+logger = logging.getLogger(__name__)
+
+# Marker im (shared) Cache, bis der Join geflusht ist -> is_member stimmt sofort, auch auf anderen Workern
+PENDING_TTL = 30
+# Zeilen pro INSERT: 2 Parameter pro Zeile, Postgres erlaubt max. 65535 pro Statement
+WRITE_CHUNK = 1000
+# Mehr gepufferte Joins (z.B. DB länger weg) werden verworfen statt unbegrenzt zu wachsen
+MAX_PENDING = 50_000
+# /me/communities/ schaut sich nur die letzten so vielen gepufferten Joins eines Users an
+USER_PENDING_SLOTS = 100
+
+
+def _pending_key(community_id: int, user_id: int) -> str:
+    return f"join-pending:{community_id}:{user_id}"
+
+
+def _user_pending_key(user_id: int, slot=None) -> str:
+    # Zähler + ein Slot pro Join statt einer Liste: read-modify-write würde parallele Joins verlieren
+    return f"join-pending-user:{user_id}" if slot is None else f"join-pending-user:{user_id}:{slot}"
+
+
+def _left_key(community_id: int, user_id: int) -> str:
+    # Tombstone: Leave während der Join noch in irgendeinem Worker-Puffer liegen kann
+    return f"join-left:{community_id}:{user_id}"
+
+
+def _left(keys) -> set:
+    if not keys:
+        return set()
+    found = cache.get_many([_left_key(c, u) for c, u in keys])
+    return {(c, u) for c, u in keys if _left_key(c, u) in found}
+
+
+class JoinBuffer:
+    """
+    Sammelt Joins im Prozess und schreibt sie alle `interval` Sekunden (oder
+    sobald `max_batch` erreicht ist) als Multi-Row-INSERTs à WRITE_CHUNK Zeilen.
+
+    Nicht dauerhaft: stirbt der Prozess vor dem Flush, sind die Joins weg.
+
+    Der Puffer ist prozesslokal, ein Leave kann auf einem anderen Worker
+    landen. Der hinterlässt einen Tombstone im Cache; Joins mit Tombstone
+    werden nicht geschrieben bzw. nach dem INSERT wieder zurückgenommen.
+    """
+
+    def __init__(self, interval: float, max_batch: int = 1000):
+        self.interval = interval
+        self.max_batch = max_batch
+        self._pending: dict[tuple[int, int], None] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def add(self, community_id: int, user_id: int) -> None:
+        # Erneuter Join nach einem Leave: der alte Tombstone gilt nicht mehr
+        cache.delete(_left_key(community_id, user_id))
+        cache.set(_pending_key(community_id, user_id), True, PENDING_TTL)
+        user_key = _user_pending_key(user_id)
+        cache.add(user_key, 0, PENDING_TTL)
+        slot = cache.incr(user_key)
+        cache.touch(user_key, PENDING_TTL)
+        cache.set(_user_pending_key(user_id, slot), community_id, PENDING_TTL)
+        with self._lock:
+            self._pending[(community_id, user_id)] = None
+            size = len(self._pending)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="join-buffer", daemon=True)
+                self._thread.start()
+        if size >= self.max_batch:
+            self._wakeup.set()
+
+    def discard(self, community_id: int, user_id: int) -> bool:
+        """
+        Leave: verwirft einen gepufferten Join, auch wenn er im Puffer eines
+        anderen Workers liegt (Tombstone). True, wenn ein Join ausstand.
+        """
+        key = _pending_key(community_id, user_id)
+        pending = bool(cache.get(key))
+        cache.set(_left_key(community_id, user_id), True, PENDING_TTL)
+        cache.delete(key)
+        with self._lock:
+            local = self._pending.pop((community_id, user_id), False) is None
+        return pending or local
+
+    def flush(self) -> int:
+        with self._lock:
+            batch, self._pending = list(self._pending), {}
+        if not batch:
+            return 0
+
+        left = _left(batch)
+        todo = [key for key in batch if key not in left]
+        inserted, written = [], todo
+        for start in range(0, len(todo), WRITE_CHUNK):
+            try:
+                inserted += self._write(todo[start:start + WRITE_CHUNK])
+            except Exception:
+                # Nur der Rest geht zurück in den Puffer, geschriebene Chunks sind committet
+                logger.exception("join buffer: flush of %s joins failed, re-queueing", len(todo) - start)
+                self._requeue(todo[start:])
+                written = todo[:start]
+                break
+
+        # Leave auf einem anderen Worker, während der INSERT lief: dort war die Zeile noch nicht sichtbar
+        undone = _left(inserted)
+        if undone:
+            self._undo(undone)
+
+        cache.delete_many([_pending_key(c, u) for c, u in (*left, *written)])
+        return len(inserted) - len(undone)
+
+    def _requeue(self, keys) -> None:
+        with self._lock:
+            for key in keys:
+                self._pending.setdefault(key, None)
+            overflow = len(self._pending) - MAX_PENDING
+            if overflow > 0:
+                # Älteste zuerst weg; ihre Pending-Marker laufen nach PENDING_TTL von selbst ab
+                for key in list(self._pending)[:overflow]:
+                    del self._pending[key]
+        if overflow > 0:
+            logger.error("join buffer: dropped %s joins, more than %s pending", overflow, MAX_PENDING)
+
+    def _write(self, batch) -> list:
+        """
+        INSERT … ON CONFLICT DO NOTHING RETURNING: Events nur für
+        tatsächlich eingefügte Zeilen (Doppel-Joins über zwei Worker zählen einmal).
+        Joins für inzwischen gelöschte Communities/User fallen über den JOIN
+        heraus, statt mit einer FK-Verletzung den ganzen Batch zu kippen.
+        """
+        if not batch:
+            return []
+        q = connection.ops.quote_name
+        table = q(CommunityMembership._meta.db_table)
+        communities, users = q(Community._meta.db_table), q(get_user_model()._meta.db_table)
+        params = [MembershipRole.MEMBER, timezone.now(), *(value for key in batch for value in key)]
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                # FOR KEY SHARE wie der FK-Check selbst: ein paralleles Delete wartet bis nach dem Commit
+                cursor.execute(
+                    f"INSERT INTO {table} (community_id, user_id, role, joined_at) "
+                    f"SELECT v.community_id, v.user_id, %s, %s "
+                    f"FROM (VALUES {', '.join(['(%s::bigint, %s::bigint)'] * len(batch))}) v (community_id, user_id) "
+                    f"JOIN {communities} c ON c.id = v.community_id JOIN {users} u ON u.id = v.user_id "
+                    "FOR KEY SHARE OF c, u "
+                    "ON CONFLICT DO NOTHING RETURNING community_id, user_id",
+                    params,
+                )
+                inserted = [tuple(row) for row in cursor.fetchall()]
+            record_membership_events(inserted, MembershipEventKind.JOIN)
+        return inserted
+
+    def _undo(self, keys) -> None:
+        condition = Q()
+        for community_id, user_id in keys:
+            condition |= Q(community_id=community_id, user_id=user_id)
+        with transaction.atomic():
+            CommunityMembership.objects.filter(condition, role=MembershipRole.MEMBER).delete()
+            record_membership_events(keys, MembershipEventKind.LEAVE)
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            close_old_connections()
+            self.flush()
+
+
+def is_join_pending(community_id: int, user_id: int) -> bool:
+    return bool(cache.get(_pending_key(community_id, user_id)))
+
+
+def pending_join_ids(user_id: int) -> list[int]:
+    """Communities mit noch nicht geflushtem Join des Users (für /me/communities/)."""
+    last = cache.get(_user_pending_key(user_id)) or 0
+    slots = cache.get_many([_user_pending_key(user_id, n) for n in range(max(last - USER_PENDING_SLOTS, 0) + 1, last + 1)])
+    community_ids = list(slots.values())
+    pending = cache.get_many([_pending_key(c, user_id) for c in community_ids])
+    return [c for c in dict.fromkeys(community_ids) if _pending_key(c, user_id) in pending]
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_join_buffer():
+    """
+    None, wenn COMMUNITY_JOIN_BUFFER_MS = 0 (Default: synchrone Joins).
+    """
+    global _buffer
+    if not settings.COMMUNITY_JOIN_BUFFER_MS:
+        return None
+    with _buffer_lock:
+        if _buffer is None:
+            _buffer = JoinBuffer(settings.COMMUNITY_JOIN_BUFFER_MS / 1000)
+            atexit.register(_buffer.flush)
+    return _buffer
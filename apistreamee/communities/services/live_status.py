@@ -0,0 +1,67 @@
+import logging
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from integrations.providers import get_provider
+from integrations.providers.ratelimit import Priority
+
+from ..models import Community, CommunityLiveStream, CommunityPlatform
+
+logger = logging.getLogger(__name__)
+
+
+def _twitch_id_batches(batch_size: int):
+    last_pk = 0
+    while True:
+        batch = list(
+            Community.objects.filter(platform=CommunityPlatform.TWITCH, pk__gt=last_pk)
+            .order_by("pk")
+            .values_list("pk", "external_id")[:batch_size]
+        )
+        if not batch:
+            return
+        yield batch
+        last_pk = batch[-1][0]
+
+
+def poll_live_status(batch_size: int = None) -> int:
+    """
+    Ein Durchlauf: /streams für alle Twitch-Communities in 100er Batches.
+    Live -> CommunityLiveStream upserten, offline -> Zeile löschen.
+    Returns Anzahl Communities, die gerade live sind.
+    """
+    provider = get_provider(CommunityPlatform.TWITCH)
+    batch_size = min(batch_size or provider.batch_size, provider.batch_size)
+    live_total = 0
+    for batch in _twitch_id_batches(batch_size):
+        streams = provider.fetch_live_streams([external_id for _, external_id in batch], priority=Priority.BACKGROUND)
+
+        now = timezone.now()
+        rows = [
+            CommunityLiveStream(
+                community_id=pk,
+                viewer_count=streams[external_id].viewer_count,
+                started_at=parse_datetime(streams[external_id].started_at),
+                checked_at=now,
+            )
+            for pk, external_id in batch
+            if external_id in streams
+        ]
+        offline = [pk for pk, external_id in batch if external_id not in streams]
+
+        with transaction.atomic():
+            if rows:
+                CommunityLiveStream.objects.bulk_create(
+                    rows,
+                    update_conflicts=True,
+                    unique_fields=["community"],
+                    update_fields=["viewer_count", "started_at", "checked_at"],
+                )
+            CommunityLiveStream.objects.filter(community_id__in=offline).delete()
+
+        live_total += len(rows)
+
+    logger.info("live status poll: %s communities live", live_total)
+    return live_total
@@ -0,0 +1,120 @@
+from collections import defaultdict
+from itertools import groupby
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from ..models import CommunityDailyStats, CommunityMembership, MembershipEvent, MembershipEventKind
+from .trending import WRITE_CHUNK, record_activity
+
+
+def record_membership_event(community_id: int, user_id: int, kind: str) -> None:
+    MembershipEvent.objects.create(community_id=community_id, user_id=user_id, kind=kind)
+
+
+def record_membership_events(keys, kind: str) -> None:
+    """Multi-Row-INSERT für gebündelte Joins (JoinBuffer)."""
+    MembershipEvent.objects.bulk_create(
+        [MembershipEvent(community_id=community_id, user_id=user_id, kind=kind) for community_id, user_id in keys]
+    )
+
+
+def record_cascade_leaves(sender, instance, **kwargs) -> None:
+    """
+    pre_delete(User): seine Memberships verschwinden per CASCADE, ohne Leave
+    über die API. Ohne Events würde `members` in den Rollups driften.
+    user_id bleibt leer: SET_NULL greift nur für Events, die beim Sammeln des
+    Deletes schon existierten.
+    """
+    community_ids = CommunityMembership.objects.filter(user_id=instance.pk).values_list("community_id", flat=True)
+    MembershipEvent.objects.bulk_create(
+        [MembershipEvent(community_id=community_id, kind=MembershipEventKind.LEAVE) for community_id in community_ids]
+    )
+
+
+def rollup_pending(batch_size: int = 5000) -> int:
+    """
+    Rechnet bis zu `batch_size` offene Events in CommunityDailyStats und die
+    Trending-Buckets (CommunityActivityBucket) ein.
+    Ohne skip_locked: parallele Worker warten aufeinander, weil ein neuer
+    Tagesstand auf dem Stand des Vortags aufbaut.
+    """
+    with transaction.atomic():
+        batch = list(
+            MembershipEvent.objects.filter(rolled_up_at__isnull=True)
+            .select_for_update()
+            .order_by("id")
+            .values_list("id", "community_id", "kind", "created_at")[:batch_size]
+        )
+        if not batch:
+            return 0
+
+        deltas = defaultdict(lambda: [0, 0])
+        for _, community_id, kind, created_at in batch:
+            deltas[(community_id, timezone.localdate(created_at))][kind == MembershipEventKind.LEAVE] += 1
+
+        for (community_id, day), (joins, leaves) in sorted(deltas.items()):
+            _apply(community_id, day, joins, leaves)
+        # Stunden-Buckets fürs Trending aus demselben Batch, statt pro Join im Request
+        record_activity((community_id, kind, created_at) for _, community_id, kind, created_at in batch)
+
+        # --batch-size ist frei wählbar: pk__in in Stücken, sonst über Postgres' 65535 Parameter
+        rolled_up_at = timezone.now()
+        for start in range(0, len(batch), WRITE_CHUNK):
+            ids = [row[0] for row in batch[start:start + WRITE_CHUNK]]
+            MembershipEvent.objects.filter(pk__in=ids).update(rolled_up_at=rolled_up_at)
+
+    return len(batch)
+
+
+def _apply(community_id: int, day, joins: int, leaves: int) -> None:
+    net = joins - leaves
+    rows = CommunityDailyStats.objects.filter(community_id=community_id, day=day)
+    updated = rows.update(joins=F("joins") + joins, leaves=F("leaves") + leaves, members=F("members") + net)
+    if not updated:
+        previous = (
+            CommunityDailyStats.objects.filter(community_id=community_id, day__lt=day)
+            .order_by("-day")
+            .values_list("members", flat=True)
+            .first()
+        )
+        try:
+            with transaction.atomic():
+                CommunityDailyStats.objects.create(
+                    community_id=community_id, day=day, joins=joins, leaves=leaves, members=(previous or 0) + net
+                )
+        except IntegrityError:
+            rows.update(joins=F("joins") + joins, leaves=F("leaves") + leaves, members=F("members") + net)
+
+    # Nachzügler (Event von gestern, heute schon eine Zeile): spätere Tagesstände mitziehen
+    if net:
+        CommunityDailyStats.objects.filter(community_id=community_id, day__gt=day).update(members=F("members") + net)
+
+
+def rebuild_from_memberships() -> int:
+    """
+    Einmalig bei der Einführung: baut die Rollups aus CommunityMembership.joined_at
+    neu auf und markiert alle offenen Events als erledigt (sie stecken schon in
+    den Memberships). Leaves vor dem Event-Log sind nicht rekonstruierbar.
+    """
+    with transaction.atomic():
+        MembershipEvent.objects.filter(rolled_up_at__isnull=True).select_for_update().update(rolled_up_at=timezone.now())
+        CommunityDailyStats.objects.all().delete()
+
+        rows = (
+            CommunityMembership.objects.annotate(day=TruncDate("joined_at"))
+            .values("community_id", "day")
+            .annotate(joins=Count("id"))
+            .order_by("community_id", "day")
+            .values_list("community_id", "day", "joins")
+        )
+        stats = []
+        for community_id, days in groupby(rows.iterator(chunk_size=5000), key=lambda r: r[0]):
+            members = 0
+            for _, day, joins in days:
+                members += joins
+                stats.append(CommunityDailyStats(community_id=community_id, day=day, joins=joins, members=members))
+        CommunityDailyStats.objects.bulk_create(stats, batch_size=5000)
+    return len(stats)
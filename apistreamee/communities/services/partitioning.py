@@ -0,0 +1,390 @@
+"""
+Online-Umstellung von CommunityMembership auf Postgres Hash-Partitionierung
+(nach community_id). Ablauf, jeweils über `manage.py partition_memberships`:
+
+    prepare    Schattentabelle <table>_part (PARTITION BY HASH) + Trigger, der
+               alle Writes auf die alte Tabelle spiegelt
+    backfill   Bestandsdaten in id-Batches kopieren (fortsetzbar via SyncCursor)
+    reconcile  Batch-weise Abgleich, fängt Races zwischen Backfill und Trigger
+    swap       Indexe online pro Partition bauen, dann unter kurzem Lock die
+               Tabellen tauschen; die alte bleibt ohne Foreign Keys als
+               <table>_legacy liegen
+
+Tabellen-, Index- und Constraint-Namen sind nach dem Swap identisch zu vorher,
+Django-Model und spätere Migrationen merken also nichts davon. Der Primary Key
+wird (community_id, id), weil jeder Unique-Key den Partition-Key enthalten
+muss; `id` kommt weiterhin aus einer Sequenz und ist damit praktisch eindeutig.
+"""
+import re
+
+from django.db import connection, transaction
+
+from integrations.models import SyncCursor
+
+from ..models import CommunityMembership
+
+TABLE = CommunityMembership._meta.db_table
+SHADOW = f"{TABLE}_part"
+LEGACY = f"{TABLE}_legacy"
+SEQUENCE = f"{SHADOW}_id_seq"
+MIRROR = "communities_membership_mirror"
+PARTITION_KEY = "community_id"
+CURSOR_NAME = "membership_partition_backfill"
+
+COLUMNS = [f.column for f in CommunityMembership._meta.concrete_fields]
+
+
+class PartitioningError(RuntimeError):
+    pass
+
+
+def _name(base: str, suffix: str) -> str:
+    # Postgres kürzt Identifier auf 63 Zeichen
+    return base[: 63 - len(suffix)] + suffix
+
+
+def _q(identifier: str) -> str:
+    return connection.ops.quote_name(identifier)
+
+
+def _exists(cursor, relation: str) -> bool:
+    cursor.execute("SELECT to_regclass(%s) IS NOT NULL", [relation])
+    return cursor.fetchone()[0]
+
+
+def _require_postgres() -> None:
+    if connection.vendor != "postgresql":
+        raise PartitioningError("Hash partitioning requires PostgreSQL.")
+
+
+def _constraints(cursor, table: str, kinds: str):
+    cursor.execute(
+        """
+        SELECT conname, contype, pg_get_constraintdef(oid)
+        FROM pg_constraint
+        WHERE conrelid = %s::regclass AND contype = ANY(%s)
+        ORDER BY conname
+        """,
+        [table, list(kinds)],
+    )
+    return cursor.fetchall()
+
+
+def _plain_indexes(cursor, table: str):
+    """Indexe, die nicht zu einem Constraint (PK/UNIQUE) gehören."""
+    cursor.execute(
+        """
+        SELECT i.relname, pg_get_indexdef(i.oid)
+        FROM pg_index x
+        JOIN pg_class i ON i.oid = x.indexrelid
+        WHERE x.indrelid = %s::regclass
+          AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = x.indexrelid)
+        ORDER BY i.relname
+        """,
+        [table],
+    )
+    return cursor.fetchall()
+
+
+_REMAINDER_RE = re.compile(r"remainder (\d+)")
+
+
+def _partitions(cursor, table: str):
+    """[(Partition, Remainder)], nach Remainder sortiert (nicht nach Name: _p10 < _p2)."""
+    cursor.execute(
+        "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = %s::regclass",
+        [table],
+    )
+    partitions = [(name, int(_REMAINDER_RE.search(bound).group(1))) for name, bound in cursor.fetchall()]
+    return sorted(partitions, key=lambda p: p[1])
+
+
+def prepare(partitions: int = 16) -> bool:
+    """Legt Schattentabelle, Partitionen und Spiegel-Trigger an. False, wenn schon vorhanden."""
+    _require_postgres()
+    cols = ", ".join(_q(c) for c in COLUMNS)
+    new_cols = ", ".join(f"NEW.{_q(c)}" for c in COLUMNS)
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        if _exists(cursor, SHADOW):
+            return False
+        if not _exists(cursor, TABLE):
+            raise PartitioningError(f"{TABLE} does not exist.")
+
+        cursor.execute(f"CREATE SEQUENCE {_q(SEQUENCE)}")
+        cursor.execute(f"CREATE TABLE {_q(SHADOW)} (LIKE {_q(TABLE)}) PARTITION BY HASH ({_q(PARTITION_KEY)})")
+        cursor.execute(f"ALTER TABLE {_q(SHADOW)} ALTER COLUMN id SET DEFAULT nextval('{SEQUENCE}')")
+        cursor.execute(
+            f"ALTER TABLE {_q(SHADOW)} ADD CONSTRAINT {_q(_name(SHADOW, '_pkey'))} "
+            f"PRIMARY KEY ({_q(PARTITION_KEY)}, id)"
+        )
+
+        for conname, contype, definition in _constraints(cursor, TABLE, "uf"):
+            if contype == "u" and PARTITION_KEY not in definition:
+                raise PartitioningError(f"Unique constraint {conname} does not include {PARTITION_KEY}.")
+            cursor.execute(f"ALTER TABLE {_q(SHADOW)} ADD CONSTRAINT {_q(_name(conname, '_p'))} {definition}")
+
+        for i in range(partitions):
+            cursor.execute(
+                f"CREATE TABLE {_q(_name(SHADOW, f'_p{i}'))} PARTITION OF {_q(SHADOW)} "
+                f"FOR VALUES WITH (MODULUS {partitions}, REMAINDER {i})"
+            )
+
+        key_match = f"{_q(PARTITION_KEY)} = OLD.{_q(PARTITION_KEY)} AND id = OLD.id"
+        cursor.execute(
+            f"""
+            CREATE FUNCTION {MIRROR}() RETURNS trigger AS $$
+            BEGIN
+                IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                    DELETE FROM {_q(SHADOW)} WHERE {key_match};
+                END IF;
+                IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                    INSERT INTO {_q(SHADOW)} ({cols}) VALUES ({new_cols}) ON CONFLICT DO NOTHING;
+                END IF;
+                RETURN NULL;
+            END
+            $$ LANGUAGE plpgsql
+            """
+        )
+        cursor.execute(
+            f"CREATE TRIGGER {MIRROR} AFTER INSERT OR UPDATE OR DELETE ON {_q(TABLE)} "
+            f"FOR EACH ROW EXECUTE FUNCTION {MIRROR}()"
+        )
+    return True
+
+
+def _shadow_ready(cursor) -> None:
+    if not _exists(cursor, SHADOW):
+        raise PartitioningError("Run `prepare` first.")
+
+
+def backfill(batch_size: int = 50_000, max_batches=None, restart: bool = False, on_batch=None) -> int:
+    """Kopiert Bestandszeilen in id-Bereichen; der Trigger deckt alles Neuere ab."""
+    _require_postgres()
+    cols = ", ".join(_q(c) for c in COLUMNS)
+    cursor_row, _ = SyncCursor.objects.get_or_create(name=CURSOR_NAME)
+    if restart:
+        cursor_row.position = 0
+
+    copied = 0
+    batches = 0
+    with connection.cursor() as cursor:
+        _shadow_ready(cursor)
+        cursor.execute(f"SELECT COALESCE(MAX(id), 0) FROM {_q(TABLE)}")
+        max_id = cursor.fetchone()[0]
+
+        while cursor_row.position < max_id and (max_batches is None or batches < max_batches):
+            lo, hi = cursor_row.position, cursor_row.position + batch_size
+            with transaction.atomic():
+                cursor.execute(
+                    f"INSERT INTO {_q(SHADOW)} ({cols}) SELECT {cols} FROM {_q(TABLE)} "
+                    f"WHERE id > %s AND id <= %s ON CONFLICT DO NOTHING",
+                    [lo, hi],
+                )
+                copied += cursor.rowcount
+                cursor_row.position = hi
+                cursor_row.save(update_fields=["position", "updated_at"])
+            batches += 1
+            if on_batch:
+                on_batch(min(hi, max_id), max_id)
+    return copied
+
+
+def reconcile(batch_size: int = 50_000, on_batch=None) -> int:
+    """Entfernt/ergänzt abweichende Zeilen in der Schattentabelle, Bereich für Bereich."""
+    _require_postgres()
+    cols = ", ".join(_q(c) for c in COLUMNS)
+    same = " AND ".join(f"o.{_q(c)} = s.{_q(c)}" for c in COLUMNS)
+
+    fixed = 0
+    with connection.cursor() as cursor:
+        _shadow_ready(cursor)
+        cursor.execute(f"SELECT COALESCE(MAX(id), 0) FROM {_q(TABLE)}")
+        max_id = cursor.fetchone()[0]
+
+        for lo in range(0, max_id, batch_size):
+            hi = lo + batch_size
+            with transaction.atomic():
+                cursor.execute(
+                    f"DELETE FROM {_q(SHADOW)} s WHERE s.id > %s AND s.id <= %s "
+                    f"AND NOT EXISTS (SELECT 1 FROM {_q(TABLE)} o WHERE {same})",
+                    [lo, hi],
+                )
+                fixed += cursor.rowcount
+                cursor.execute(
+                    f"INSERT INTO {_q(SHADOW)} ({cols}) SELECT {', '.join(f'o.{_q(c)}' for c in COLUMNS)} "
+                    f"FROM {_q(TABLE)} o WHERE o.id > %s AND o.id <= %s "
+                    f"AND NOT EXISTS (SELECT 1 FROM {_q(SHADOW)} s WHERE {same}) ON CONFLICT DO NOTHING",
+                    [lo, hi],
+                )
+                fixed += cursor.rowcount
+            if on_batch:
+                on_batch(min(hi, max_id), max_id)
+    return fixed
+
+
+def _is_partitioned(cursor, table: str) -> bool:
+    cursor.execute("SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass(%s)", [table])
+    row = cursor.fetchone()
+    return bool(row and row[0])
+
+
+def create_index_online(cursor, table: str, index_name: str, definition: str, unique: bool = False) -> None:
+    """
+    CREATE INDEX ohne Schreibsperre. `definition`: alles nach "ON <table>",
+    z.B. "USING btree (user_id) INCLUDE (community_id)". Normale Tabelle:
+    CONCURRENTLY. Partitioniert (dort geht CONCURRENTLY nicht auf dem Parent):
+    Parent-Index ON ONLY, pro Partition CONCURRENTLY, dann ATTACH. Idempotent.
+    """
+    kind = "UNIQUE INDEX" if unique else "INDEX"
+    if not _is_partitioned(cursor, table):
+        cursor.execute(f"CREATE {kind} CONCURRENTLY IF NOT EXISTS {_q(index_name)} ON {_q(table)} {definition}")
+        return
+
+    cursor.execute(f"CREATE {kind} IF NOT EXISTS {_q(index_name)} ON ONLY {_q(table)} {definition}")
+    for partition, remainder in _partitions(cursor, table):
+        child = _name(index_name, f"_p{remainder}")
+        cursor.execute(f"CREATE {kind} CONCURRENTLY IF NOT EXISTS {_q(child)} ON {_q(partition)} {definition}")
+        cursor.execute("SELECT 1 FROM pg_inherits WHERE inhrelid = to_regclass(%s)", [child])
+        if cursor.fetchone() is None:
+            cursor.execute(f"ALTER INDEX {_q(index_name)} ATTACH PARTITION {_q(child)}")
+
+
+def replace_unique_online(cursor, table: str, constraint_name: str, definition: str) -> None:
+    """
+    Ersetzt einen UNIQUE-Constraint durch `UNIQUE <definition>` unter gleichem
+    Namen, ohne Writes für die Dauer des Index-Builds zu blockieren: neuer Index
+    CONCURRENTLY (pro Partition), dann nur noch ein kurzes ALTER TABLE, das den
+    fertigen Index übernimmt (USING INDEX bzw. Attach der Partition-Constraints).
+    """
+    if not _is_partitioned(cursor, table):
+        new_index = _name(constraint_name, "_new")
+        cursor.execute(f"CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS {_q(new_index)} ON {_q(table)} {definition}")
+        with transaction.atomic(using=cursor.db.alias):
+            cursor.execute(f"ALTER TABLE {_q(table)} DROP CONSTRAINT IF EXISTS {_q(constraint_name)}")
+            cursor.execute(f"ALTER TABLE {_q(table)} ADD CONSTRAINT {_q(constraint_name)} UNIQUE USING INDEX {_q(new_index)}")
+        return
+
+    for partition, remainder in _partitions(cursor, table):
+        child = _name(constraint_name, f"_p{remainder}")
+        cursor.execute(f"CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS {_q(child)} ON {_q(partition)} {definition}")
+        if child not in [name for name, _, _ in _constraints(cursor, partition, "u")]:
+            cursor.execute(f"ALTER TABLE {_q(partition)} ADD CONSTRAINT {_q(child)} UNIQUE USING INDEX {_q(child)}")
+    # Der neue Parent-Constraint übernimmt die passenden Partition-Constraints, statt neu zu bauen
+    with transaction.atomic(using=cursor.db.alias):
+        cursor.execute(f"ALTER TABLE {_q(table)} DROP CONSTRAINT IF EXISTS {_q(constraint_name)}")
+        cursor.execute(f"ALTER TABLE {_q(table)} ADD CONSTRAINT {_q(constraint_name)} UNIQUE {definition}")
+
+
+def build_indexes() -> list[str]:
+    """
+    Repliziert die Indexe der alten Tabelle auf die Schattentabelle, ohne
+    Writes zu blockieren (create_index_online). Idempotent.
+    """
+    _require_postgres()
+    built = []
+    with connection.cursor() as cursor:
+        _shadow_ready(cursor)
+        for index_name, definition in _plain_indexes(cursor, TABLE):
+            create_index_online(
+                cursor,
+                SHADOW,
+                _name(index_name, "_p"),
+                definition[definition.index(" USING ") + 1:],
+                unique=definition.startswith("CREATE UNIQUE INDEX"),
+            )
+            built.append(index_name)
+    return built
+
+
+def swap() -> None:
+    """
+    Tauscht alte und partitionierte Tabelle unter ACCESS EXCLUSIVE Lock
+    (nur Renames + setval, dauert Millisekunden). Die Legacy-Tabelle behält
+    ihre Daten, verliert aber ihre Foreign Keys.
+    """
+    _require_postgres()
+    build_indexes()
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        _shadow_ready(cursor)
+        cursor.execute(f"LOCK TABLE {_q(TABLE)} IN ACCESS EXCLUSIVE MODE")
+        cursor.execute(
+            f"SELECT setval(%s, GREATEST((SELECT COALESCE(MAX(id), 0) FROM {_q(TABLE)}), 1))",
+            [SEQUENCE],
+        )
+
+        old_constraints = [c for c in _constraints(cursor, TABLE, "puf")]
+        old_indexes = [name for name, _ in _plain_indexes(cursor, TABLE)]
+
+        cursor.execute(f"DROP TRIGGER {MIRROR} ON {_q(TABLE)}")
+        cursor.execute(f"DROP FUNCTION {MIRROR}()")
+        cursor.execute(f"ALTER TABLE {_q(TABLE)} RENAME TO {_q(LEGACY)}")
+
+        # Namen sind schemaweit eindeutig -> erst die alten wegbenennen. FKs fallen weg: die
+        # Legacy-Kopie würde sonst jedes Delete von Usern/Communities mit alten Mitgliedschaften blockieren
+        for conname, contype, _ in old_constraints:
+            if contype == "f":
+                cursor.execute(f"ALTER TABLE {_q(LEGACY)} DROP CONSTRAINT {_q(conname)}")
+            else:
+                cursor.execute(f"ALTER TABLE {_q(LEGACY)} RENAME CONSTRAINT {_q(conname)} TO {_q(_name(conname, '_legacy'))}")
+        for index_name in old_indexes:
+            cursor.execute(f"ALTER INDEX {_q(index_name)} RENAME TO {_q(_name(index_name, '_legacy'))}")
+
+        cursor.execute(f"ALTER TABLE {_q(SHADOW)} RENAME TO {_q(TABLE)}")
+        for partition, remainder in _partitions(cursor, TABLE):
+            renamed = _name(TABLE, f"_p{remainder}")
+            cursor.execute(f"ALTER TABLE {_q(partition)} RENAME TO {_q(renamed)}")
+            # Von Postgres benannte Child-Constraints (<partition>_pkey, ...) mitziehen
+            for conname, _, _ in _constraints(cursor, renamed, "pu"):
+                if conname.startswith(partition):
+                    cursor.execute(
+                        f"ALTER TABLE {_q(renamed)} RENAME CONSTRAINT {_q(conname)} "
+                        f"TO {_q(_name(renamed, conname[len(partition):]))}"
+                    )
+        for conname, contype, _ in old_constraints:
+            if contype == "p":
+                cursor.execute(f"ALTER TABLE {_q(TABLE)} RENAME CONSTRAINT {_q(_name(SHADOW, '_pkey'))} TO {_q(conname)}")
+            else:
+                cursor.execute(f"ALTER TABLE {_q(TABLE)} RENAME CONSTRAINT {_q(_name(conname, '_p'))} TO {_q(conname)}")
+        for index_name in old_indexes:
+            cursor.execute(f"ALTER INDEX {_q(_name(index_name, '_p'))} RENAME TO {_q(index_name)}")
+
+        cursor.execute(f"ALTER SEQUENCE {_q(SEQUENCE)} OWNED BY {_q(TABLE)}.id")
+
+    SyncCursor.objects.filter(name=CURSOR_NAME).delete()
+
+
+def _row_estimate(cursor, relation: str) -> int:
+    # reltuples statt COUNT(*): bei Hunderten Millionen Zeilen sonst minutenlang
+    cursor.execute(
+        "SELECT COALESCE(SUM(GREATEST(c.reltuples, 0)), 0)::bigint FROM pg_class c "
+        "WHERE c.oid = to_regclass(%s) OR c.oid IN (SELECT inhrelid FROM pg_inherits WHERE inhparent = to_regclass(%s))",
+        [relation, relation],
+    )
+    return cursor.fetchone()[0]
+
+
+def status(exact: bool = False) -> dict:
+    _require_postgres()
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", [TABLE])
+        row = cursor.fetchone()
+        info = {
+            "partitioned": bool(row and row[0] == "p"),
+            "shadow_exists": _exists(cursor, SHADOW),
+            "legacy_exists": _exists(cursor, LEGACY),
+            "backfill_position": SyncCursor.objects.filter(name=CURSOR_NAME).values_list("position", flat=True).first(),
+        }
+        if info["partitioned"]:
+            info["partitions"] = len(_partitions(cursor, TABLE))
+        for key, relation in (("rows", TABLE), ("shadow_rows", SHADOW)):
+            if not _exists(cursor, relation):
+                continue
+            if exact:
+                cursor.execute(f"SELECT COUNT(*) FROM {_q(relation)}")
+                info[key] = cursor.fetchone()[0]
+            else:
+                info[key] = _row_estimate(cursor, relation)
+    return info
@@ -0,0 +1,133 @@
+import logging
+from dataclasses import dataclass
+
+from django.db import transaction
+from django.utils import timezone
+
+from integrations.models import SyncCursor
+from integrations.providers import ProviderUnavailable, get_provider
+from integrations.providers.ratelimit import Priority
+
+from ..models import Community, CommunityPlatform
+
+logger = logging.getLogger(__name__)
+
+CURSOR_NAME = "twitch_profile_refresh"
+
+PROFILE_FIELDS = ("external_login", "external_display_name", "external_profile_image_url")
+
+
+@dataclass
+class RefreshStats:
+    scanned: int = 0
+    updated: int = 0
+    missing: int = 0
+    batches: int = 0
+    finished: bool = False
+
+
+def _apply(community: Community, twitch_user) -> bool:
+    fresh = {
+        "external_login": twitch_user.login,
+        "external_display_name": twitch_user.display_name,
+        "external_profile_image_url": twitch_user.profile_image_url,
+    }
+    changed = False
+    for field, value in fresh.items():
+        if getattr(community, field) != value:
+            setattr(community, field, value)
+            changed = True
+    return changed
+
+
+def refresh_twitch_profiles(batch_size: int = None, max_batches=None, restart: bool = False) -> RefreshStats:
+    """
+    Läuft in Keyset-Reihenfolge (pk > cursor) über alle Twitch-Communities und
+    gleicht die Profilfelder per Helix /users (100 ids pro Call) ab.
+
+    Geschrieben werden nur Zeilen, deren Daten sich tatsächlich geändert haben
+    (ein bulk_update pro Batch). Der Cursor wird nach jedem Batch gespeichert,
+    ein abgebrochener Lauf setzt also beim letzten fertigen Batch wieder an.
+    """
+    provider = get_provider(CommunityPlatform.TWITCH)
+    batch_size = min(batch_size or provider.batch_size, provider.batch_size)
+    cursor, _ = SyncCursor.objects.get_or_create(name=CURSOR_NAME)
+    if restart:
+        cursor.position = 0
+
+    stats = RefreshStats()
+    while max_batches is None or stats.batches < max_batches:
+        batch = list(
+            Community.objects.filter(platform=CommunityPlatform.TWITCH, pk__gt=cursor.position)
+            .order_by("pk")
+            .only("pk", "external_id", *PROFILE_FIELDS)[:batch_size]
+        )
+        if not batch:
+            # Durchlauf komplett -> nächster Lauf beginnt wieder vorne
+            cursor.position = 0
+            cursor.save(update_fields=["position", "updated_at"])
+            stats.finished = True
+            break
+
+        try:
+            users = provider.refresh([c.external_id for c in batch], priority=Priority.BACKGROUND)
+        except ProviderUnavailable as e:
+            # Cursor steht auf dem letzten fertigen Batch -> nächster Lauf macht weiter
+            logger.warning("twitch profile refresh paused at cursor=%s: %s", cursor.position, e)
+            break
+
+        now = timezone.now()
+        changed = []
+        for community in batch:
+            twitch_user = users.get(community.external_id)
+            if twitch_user is None:
+                stats.missing += 1
+            elif _apply(community, twitch_user):
+                community.updated_at = now
+                changed.append(community)
+
+        with transaction.atomic():
+            if changed:
+                Community.objects.bulk_update(changed, [*PROFILE_FIELDS, "updated_at"])
+            cursor.position = batch[-1].pk
+            cursor.save(update_fields=["position", "updated_at"])
+
+        stats.scanned += len(batch)
+        stats.updated += len(changed)
+        stats.batches += 1
+        logger.info("twitch profile refresh: cursor=%s updated=%s/%s", cursor.position, len(changed), len(batch))
+
+    return stats
+
+
+def apply_user_updates(events: list[dict]) -> int:
+    """
+    Wendet EventSub `user.update` Events an (spätere Events gewinnen).
+    user.update enthält kein Profilbild, das bleibt beim periodischen Refresh.
+    """
+    latest = {}
+    for event in events:
+        if event.get("user_id"):
+            latest[str(event["user_id"])] = event
+    if not latest:
+        return 0
+
+    communities = Community.objects.filter(
+        platform=CommunityPlatform.TWITCH, external_id__in=list(latest)
+    ).only("pk", "external_id", *PROFILE_FIELDS)
+
+    now = timezone.now()
+    changed = []
+    for community in communities:
+        event = latest[community.external_id]
+        login = event.get("user_login", community.external_login)
+        display_name = event.get("user_name", community.external_display_name)
+        if (community.external_login, community.external_display_name) != (login, display_name):
+            community.external_login = login
+            community.external_display_name = display_name
+            community.updated_at = now
+            changed.append(community)
+
+    if changed:
+        Community.objects.bulk_update(changed, ["external_login", "external_display_name", "updated_at"])
+    return len(changed)
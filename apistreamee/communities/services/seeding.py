@@ -0,0 +1,222 @@
+import bisect
+import io
+import itertools
+import logging
+import math
+import random
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.utils import timezone
+
+from ..models import Community, CommunityMembership, CommunityPlatform, CommunityStatus, MembershipRole
+
+logger = logging.getLogger(__name__)
+
+# Alle Seed-User teilen sich dieses Passwort (ein Hash), damit Benchmarks sich einloggen können
+SEED_PASSWORD = "SeedPassword123!"
+
+
+class SeedError(RuntimeError):
+    pass
+
+
+@dataclass
+class SeedStats:
+    users: int = 0
+    communities: int = 0
+    memberships: int = 0
+    method: str = ""
+
+
+def _next_id(model) -> int:
+    last = model.objects.order_by("-pk").values_list("pk", flat=True).first()
+    return (last or 0) + 1
+
+
+def _text_value(value) -> str:
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    text = value.isoformat() if hasattr(value, "isoformat") else str(value)
+    return text.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+
+def _copy_rows(model, columns: list[str], rows, chunk_size: int) -> int:
+    """
+    COPY ... FROM STDIN (Textformat) in Blöcken von chunk_size Zeilen,
+    ohne alle Zeilen im Speicher zu halten.
+    """
+    table = connection.ops.quote_name(model._meta.db_table)
+    cols = ", ".join(connection.ops.quote_name(c) for c in columns)
+    sql = f"COPY {table} ({cols}) FROM STDIN"
+
+    written = 0
+    with connection.cursor() as cursor:
+        raw = cursor.cursor
+        for chunk in iter(lambda: list(itertools.islice(rows, chunk_size)), []):
+            data = "".join("\t".join(_text_value(v) for v in row) + "\n" for row in chunk)
+            if hasattr(raw, "copy"):  # psycopg 3
+                with raw.copy(sql) as copy:
+                    copy.write(data)
+            else:  # psycopg2
+                raw.copy_expert(sql, io.StringIO(data))
+            written += len(chunk)
+            logger.info("seed: %s %s rows", model._meta.db_table, written)
+    return written
+
+
+def _bulk_rows(model, columns: list[str], rows, chunk_size: int) -> int:
+    attnames = {f.column: f.attname for f in model._meta.concrete_fields}
+    written = 0
+    for chunk in iter(lambda: list(itertools.islice(rows, chunk_size)), []):
+        model.objects.bulk_create([model(**{attnames[c]: v for c, v in zip(columns, row)}) for row in chunk])
+        written += len(chunk)
+        logger.info("seed: %s %s rows", model._meta.db_table, written)
+    return written
+
+
+def _reset_sequence(model) -> None:
+    if connection.vendor != "postgresql":
+        return
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT setval(pg_get_serial_sequence(%s, 'id'), (SELECT MAX(id) FROM {connection.ops.quote_name(table)}))",
+            [table],
+        )
+
+
+def _membership_counts(rng: random.Random, users: int, mean: float, sigma: float, max_per_user: int):
+    """Lognormal verteilt: wenige Power-User mit sehr vielen Memberships, Mittelwert ~ mean."""
+    mu = math.log(max(mean, 1e-9)) - sigma**2 / 2
+    for _ in range(users):
+        yield min(max_per_user, max(1, round(rng.lognormvariate(mu, sigma))))
+
+
+def seed_scale(
+    users: int,
+    communities: int,
+    memberships_per_user: float = 20.0,
+    alpha: float = 1.1,
+    seed: int = 1,
+    prefix: str = "seed",
+    days: int = 90,
+    chunk_size: int = 50_000,
+    use_copy: bool = True,
+) -> SeedStats:
+    """
+    Erzeugt `users` User, `communities` Communities und im Mittel
+    `memberships_per_user` Memberships pro User. Die Beliebtheit der
+    Communities folgt einem Zipf-Gesetz (Gewicht 1/rank^alpha), die Anzahl
+    Memberships pro User ist lognormal verteilt. Jeder Creator ist Admin
+    seiner Community.
+
+    Postgres: COPY FROM STDIN, sonst bulk_create. Gleicher `seed` (und
+    gleicher Start-Zustand der Tabellen) -> gleiche Daten.
+    """
+    User = get_user_model()
+    if User.objects.filter(username__startswith=f"{prefix}_").exists():
+        raise SeedError(f"Users with prefix '{prefix}_' already exist; use another --prefix.")
+    if communities < 1 or users < 1:
+        raise SeedError("Need at least one user and one community.")
+
+    rng = random.Random(seed)
+    now = timezone.now()
+    window = timedelta(days=days).total_seconds()
+    write = _copy_rows if use_copy and connection.vendor == "postgresql" else _bulk_rows
+    stats = SeedStats(method="copy" if write is _copy_rows else "bulk_create")
+
+    with transaction.atomic():
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                # Feste ID-Bereiche: parallele Inserts würden sonst mit den Sequences kollidieren
+                for model in (User, Community):
+                    cursor.execute(f"LOCK TABLE {connection.ops.quote_name(model._meta.db_table)} IN EXCLUSIVE MODE")
+
+        first_user = _next_id(User)
+        first_community = _next_id(Community)
+        user_ids = range(first_user, first_user + users)
+        password = make_password(SEED_PASSWORD)
+
+        def user_rows():
+            for i, uid in enumerate(user_ids):
+                joined = now - timedelta(seconds=rng.random() * window)
+                yield (uid, password, None, False, f"{prefix}_{i}", "", "", f"{prefix}_{i}@example.com", False, True, joined)
+
+        stats.users = write(
+            User,
+            ["id", "password", "last_login", "is_superuser", "username", "first_name", "last_name",
+             "email", "is_staff", "is_active", "date_joined"],
+            user_rows(),
+            chunk_size,
+        )
+
+        creators = [rng.choice(user_ids) for _ in range(communities)]
+
+        def community_rows():
+            for i, creator in enumerate(creators):
+                created = now - timedelta(seconds=rng.random() * window)
+                login = f"{prefix}_streamer_{i}"
+                yield (
+                    first_community + i, f"{prefix.capitalize()} Streamer {i}", f"{prefix}-streamer-{i}",
+                    CommunityPlatform.TWITCH, f"{prefix}-{seed}-{i}", login, login.capitalize(), "",
+                    CommunityStatus.UNCLAIMED, creator, None, "", created, created,
+                )
+
+        stats.communities = write(
+            Community,
+            ["id", "name", "slug", "platform", "external_id", "external_login", "external_display_name",
+             "external_profile_image_url", "status", "created_by_id", "owner_id", "description",
+             "created_at", "updated_at"],
+            community_rows(),
+            chunk_size,
+        )
+
+        created_by_user: dict[int, list[int]] = {}
+        for i, creator in enumerate(creators):
+            created_by_user.setdefault(creator, []).append(first_community + i)
+
+        # Zipf über eine zufällige Reihenfolge, damit nicht die ältesten IDs die größten sind
+        ranked = list(range(first_community, first_community + communities))
+        rng.shuffle(ranked)
+        cum_weights = list(itertools.accumulate(1 / (rank + 1) ** alpha for rank in range(communities)))
+        total = cum_weights[-1]
+
+        def membership_rows():
+            counts = _membership_counts(rng, users, memberships_per_user, 1.0, communities)
+            for uid, count in zip(user_ids, counts):
+                admin_of = created_by_user.get(uid, [])
+                picked = set(admin_of)
+                for cid in admin_of:
+                    yield (cid, uid, MembershipRole.ADMIN, now - timedelta(seconds=rng.random() * window))
+
+                target = min(communities, count + len(admin_of))
+                attempts = 0
+                while len(picked) < target and attempts < count * 4:
+                    attempts += 1
+                    cid = ranked[bisect.bisect(cum_weights, rng.random() * total)]
+                    if cid in picked:
+                        continue
+                    picked.add(cid)
+                    yield (cid, uid, MembershipRole.MEMBER, now - timedelta(seconds=rng.random() * window))
+
+        stats.memberships = write(
+            CommunityMembership,
+            ["community_id", "user_id", "role", "joined_at"],
+            membership_rows(),
+            chunk_size,
+        )
+
+        _reset_sequence(User)
+        _reset_sequence(Community)
+
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            for model in (User, Community, CommunityMembership):
+                cursor.execute(f"ANALYZE {connection.ops.quote_name(model._meta.db_table)}")
+    return stats
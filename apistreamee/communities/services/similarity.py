@@ -0,0 +1,128 @@
+import logging
+from itertools import chain
+
+from django.db import transaction
+from django.db.models import Max
+
+from ..models import Community, CommunityMembership, SimilarCommunity
+
+logger = logging.getLogger(__name__)
+
+METRICS = ("cosine", "jaccard")
+
+
+class SimilarityDependencyError(RuntimeError):
+    pass
+
+
+def _load_matrix(np, sparse, chunk_size: int, block_rows: int):
+    """
+    Baut die dünne Community×User-Matrix (CSR, Spalte = user_id) über
+    Community-ID-Bereiche zu je `block_rows` Communities auf: im Speicher sind
+    nur die Memberships des aktuellen Bereichs plus die fertigen CSR-Blöcke,
+    nie alle (community_id, user_id)-Paare als int64-Arrays auf einmal.
+    """
+    community_index = np.fromiter(
+        Community.objects.order_by("pk").values_list("pk", flat=True).iterator(chunk_size=chunk_size), dtype=np.int64
+    )
+    n_users = (CommunityMembership.objects.aggregate(max_user=Max("user_id"))["max_user"] or -1) + 1
+
+    blocks = []
+    for start in range(0, len(community_index), block_rows):
+        ids = community_index[start:start + block_rows]
+        rows = (
+            CommunityMembership.objects.filter(community_id__gte=int(ids[0]), community_id__lte=int(ids[-1]))
+            .order_by()
+            .values_list("community_id", "user_id")
+            .iterator(chunk_size=chunk_size)
+        )
+        pairs = np.fromiter(chain.from_iterable(rows), dtype=np.int64).reshape(-1, 2)
+        blocks.append(
+            sparse.csr_matrix(
+                (np.ones(len(pairs), dtype=np.float32), (np.searchsorted(ids, pairs[:, 0]), pairs[:, 1])),
+                shape=(len(ids), n_users),
+            )
+        )
+        del pairs
+
+    if not blocks:
+        return community_index, sparse.csr_matrix((0, n_users), dtype=np.float32)
+    return community_index, sparse.vstack(blocks, format="csr")
+
+
+def compute_similar_communities(top_k: int = 10, metric: str = "cosine", chunk_size: int = 50_000, block_rows: int = 512) -> int:
+    """
+    Baut eine dünne Community×User-Matrix aus allen Memberships und berechnet
+    pro Community die top-k ähnlichsten Communities (Cosine oder Jaccard über
+    die gemeinsamen Mitglieder).
+
+    Die Matrix wird pro Community-ID-Bereich geladen (_load_matrix), die
+    Co-Membership-Matrix X·Xᵀ ebenso blockweise (`block_rows` Communities
+    auf einmal) berechnet und geschrieben, damit der Speicher auch bei
+    Millionen Memberships begrenzt bleibt. Ergebnis ersetzt SimilarCommunity
+    in einer Transaktion.
+    """
+    if metric not in METRICS:
+        raise ValueError(f"metric must be one of {METRICS}")
+    try:
+        import numpy as np
+        from scipy import sparse
+    except ImportError as e:
+        raise SimilarityDependencyError("numpy and scipy are required: pip install numpy scipy") from e
+
+    community_index, x = _load_matrix(np, sparse, chunk_size, block_rows)
+    x.sum_duplicates()
+    x.data[:] = 1.0  # doppelte (community, user) Paare zählen einmal
+
+    sizes = np.asarray(x.sum(axis=1)).ravel()
+    xt = x.T.tocsc()
+
+    # Ein Block nach dem anderen schreiben; Leser sehen bis zum Commit die alte Tabelle
+    written = 0
+    with transaction.atomic():
+        SimilarCommunity.objects.all().delete()
+        for entries in _top_k_blocks(np, x, xt, sizes, community_index, top_k, metric, block_rows):
+            SimilarCommunity.objects.bulk_create(entries, batch_size=5000)
+            written += len(entries)
+    return written
+
+
+def _top_k_blocks(np, x, xt, sizes, community_index, top_k, metric, block_rows):
+    n_communities = x.shape[0]
+    for start in range(0, n_communities, block_rows):
+        entries = []
+        stop = min(start + block_rows, n_communities)
+        co = (x[start:stop] @ xt).tocsr()
+
+        for local_row in range(stop - start):
+            i = start + local_row
+            lo, hi = co.indptr[local_row], co.indptr[local_row + 1]
+            neighbours = co.indices[lo:hi]
+            overlap = co.data[lo:hi]
+
+            keep = neighbours != i
+            neighbours, overlap = neighbours[keep], overlap[keep]
+            if not len(neighbours):
+                continue
+
+            if metric == "cosine":
+                scores = overlap / np.sqrt(sizes[i] * sizes[neighbours])
+            else:
+                scores = overlap / (sizes[i] + sizes[neighbours] - overlap)
+
+            k = min(top_k, len(scores))
+            best = np.argpartition(-scores, k - 1)[:k]
+            best = best[np.argsort(-scores[best])]
+
+            for rank, j in enumerate(best, start=1):
+                entries.append(
+                    SimilarCommunity(
+                        community_id=int(community_index[i]),
+                        similar_id=int(community_index[neighbours[j]]),
+                        rank=rank,
+                        score=round(float(scores[j]), 6),
+                    )
+                )
+
+        logger.info("similar communities: %s/%s rows", stop, n_communities)
+        yield entries
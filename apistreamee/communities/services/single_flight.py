@@ -0,0 +1,33 @@
+import time
+import uuid
+from contextlib import contextmanager
+
+from django.core.cache import cache
+
+# Länger als ein interaktiver Helix-Call inkl. Token-Refresh; verfällt, falls der Halter abstürzt
+LOCK_TTL = 30
+WAIT_SECONDS = 10.0
+_POLL_INTERVAL = 0.05
+
+
+@contextmanager
+def single_flight(key: str, wait: float = WAIT_SECONDS):
+    """
+    Prozess- und worker-übergreifender Lock über den (shared) Cache: pro Key
+    arbeitet immer nur ein Aufrufer, alle anderen warten, bis er fertig ist,
+    und sollten danach das Ergebnis nachschlagen statt es neu zu berechnen.
+    Liefert False, wenn der Lock nach `wait` Sekunden nicht frei wurde.
+    """
+    lock_key = f"single-flight:{key}"
+    token = uuid.uuid4().hex
+    deadline = time.monotonic() + wait
+    while not (acquired := cache.add(lock_key, token, LOCK_TTL)):
+        if time.monotonic() >= deadline:
+            break
+        time.sleep(_POLL_INTERVAL)
+    try:
+        yield acquired
+    finally:
+        # Nach Ablauf der TTL kann ein anderer den Lock halten: nur den eigenen löschen
+        if acquired and cache.get(lock_key) == token:
+            cache.delete(lock_key)
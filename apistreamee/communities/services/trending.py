@@ -0,0 +1,149 @@
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+from ..models import CommunityActivityBucket, CommunityLiveStream, CommunityMembership, MembershipEventKind
+from ..selectors.communities import communities_with_counts, live_fresh_after
+
+CACHE_KEY = "communities:trending:v1"
+CACHE_TTL = 30 * 60
+
+WINDOW = timedelta(hours=48)
+HALF_LIFE_HOURS = 6.0
+LIVE_BOOST = 1.5
+TOP_N = 50
+# Buckets pro INSERT: 4 Parameter pro Zeile, Postgres erlaubt max. 65535 pro Statement
+WRITE_CHUNK = 5000
+
+# Prozesslokale Kopie: der Endpoint liefert ohne Cache-Roundtrip aus
+_LOCAL_TTL = 30.0
+_local = {"expires": 0.0, "data": None}
+
+
+def _bucket_start(ts):
+    return ts.replace(minute=0, second=0, microsecond=0)
+
+
+def record_activity(events) -> int:
+    """
+    Rechnet Join/Leave-Events (community_id, kind, created_at) in die
+    Stunden-Buckets ein, INSERT … ON CONFLICT DO UPDATE à WRITE_CHUNK Buckets.
+    Läuft im Rollup-Worker (rollup_pending) statt pro Join im Request.
+    """
+    since = timezone.now() - WINDOW
+    counts = defaultdict(lambda: [0, 0])
+    for community_id, kind, created_at in events:
+        if created_at >= since:
+            counts[(community_id, _bucket_start(created_at))][kind == MembershipEventKind.LEAVE] += 1
+    if not counts:
+        return 0
+
+    table = connection.ops.quote_name(CommunityActivityBucket._meta.db_table)
+    rows = sorted(counts.items())
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), WRITE_CHUNK):
+            chunk = rows[start:start + WRITE_CHUNK]
+            cursor.execute(
+                f"INSERT INTO {table} (community_id, bucket_start, joins, leaves) "
+                f"VALUES {', '.join(['(%s, %s, %s, %s)'] * len(chunk))} "
+                "ON CONFLICT (community_id, bucket_start) DO UPDATE "
+                f"SET joins = {table}.joins + EXCLUDED.joins, leaves = {table}.leaves + EXCLUDED.leaves",
+                [value for (community_id, bucket_start), (joins, leaves) in chunk for value in (community_id, bucket_start, joins, leaves)],
+            )
+    return len(rows)
+
+
+def compute_scores(now=None) -> dict[int, float]:
+    """
+    Netto-Wachstum pro Stunden-Bucket, exponentiell abgeklungen
+    (Halbwertszeit HALF_LIFE_HOURS), bei Live-Communities mit LIVE_BOOST
+    (nur frischer Live-Status, wie in der Liste).
+    """
+    now = now or timezone.now()
+    scores = {}
+    buckets = CommunityActivityBucket.objects.filter(bucket_start__gte=now - WINDOW).values_list(
+        "community_id", "bucket_start", "joins", "leaves"
+    )
+    for community_id, bucket_start, joins, leaves in buckets.iterator(chunk_size=5000):
+        age_hours = (now - bucket_start).total_seconds() / 3600
+        weight = 0.5 ** (age_hours / HALF_LIFE_HOURS)
+        scores[community_id] = scores.get(community_id, 0.0) + (joins - leaves) * weight
+
+    live = set(
+        CommunityLiveStream.objects.filter(community_id__in=list(scores), checked_at__gte=live_fresh_after(now))
+        .values_list("community_id", flat=True)
+    )
+    for community_id in live:
+        scores[community_id] *= LIVE_BOOST
+    return scores
+
+
+def materialize_trending(top_n: int = TOP_N) -> list[dict]:
+    """
+    Berechnet die Top-N, serialisiert sie einmal und legt das fertige
+    Payload in den Cache. Alte Buckets außerhalb des Fensters werden entfernt.
+    """
+    from ..serializers import CommunityListSerializer
+
+    now = timezone.now()
+    scores = compute_scores(now)
+    top = sorted((s for s in scores.items() if s[1] > 0), key=lambda s: s[1], reverse=True)[:top_n]
+
+    by_id = {c.pk: c for c in communities_with_counts().filter(pk__in=[pk for pk, _ in top])}
+    data = []
+    for pk, score in top:
+        if pk in by_id:
+            data.append({**CommunityListSerializer(by_id[pk]).data, "trending_score": round(score, 3)})
+
+    cache.set(CACHE_KEY, data, CACHE_TTL)
+    _local.update(expires=time.monotonic() + _LOCAL_TTL, data=data)
+
+    CommunityActivityBucket.objects.filter(bucket_start__lt=now - WINDOW).delete()
+    return data
+
+
+def get_trending() -> list[dict]:
+    if _local["data"] is not None and time.monotonic() < _local["expires"]:
+        return _local["data"]
+
+    data = cache.get(CACHE_KEY)
+    if data is None:
+        # Kein Neuberechnen im Request (inkl. DELETE alter Buckets), das macht der Cron
+        # (materialize_trending): bis dahin der letzte bekannte Stand oder leer
+        return _local["data"] or []
+
+    _local.update(expires=time.monotonic() + _LOCAL_TTL, data=data)
+    return data
+
+
+def backfill_from_memberships(hours: int) -> int:
+    """
+    Baut die Join-Buckets der letzten `hours` Stunden aus CommunityMembership.joined_at.
+    Leaves sind historisch nicht erfasst (hard delete) und bleiben 0.
+    """
+    since = _bucket_start(timezone.now() - timedelta(hours=hours))
+    rows = (
+        CommunityMembership.objects.filter(joined_at__gte=since)
+        .annotate(bucket=TruncHour("joined_at"))
+        .values("community_id", "bucket")
+        .annotate(joins=Count("id"))
+        .order_by()
+    )
+    buckets = [
+        CommunityActivityBucket(community_id=r["community_id"], bucket_start=r["bucket"], joins=r["joins"])
+        for r in rows.iterator(chunk_size=5000)
+    ]
+    CommunityActivityBucket.objects.bulk_create(
+        buckets,
+        batch_size=5000,
+        update_conflicts=True,
+        unique_fields=["community", "bucket_start"],
+        update_fields=["joins"],
+    )
+    return len(buckets)
@@ -1,3 +1,795 @@
-from django.test import TestCase
+import csv
+import io
+import json
+from contextlib import contextmanager
+from datetime import timedelta
+from importlib.util import find_spec
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.db.models import QuerySet, Sum
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from integrations.models import SyncCursor
+from integrations.providers import ProviderUnavailable, ProviderUser, get_provider
+from integrations.providers.twitch import TwitchStream
+
+from .exports import iter_export
+from .models import (
+    Community,
+    CommunityActivityBucket,
+    CommunityLiveStream,
+    CommunityMembership,
+    MembershipEvent,
+    MembershipEventKind,
+    SimilarCommunity,
+)
+from .selectors.communities import COMMUNITY_EXPORT_FIELDS, MEMBERSHIP_EXPORT_FIELDS, communities_with_counts
+from .selectors.stats import community_daily_stats
+from .services import partitioning, trending
+from .services.join_buffer import JoinBuffer
+from .services.live_status import poll_live_status
+from .services.membership_stats import rebuild_from_memberships, rollup_pending
+from .services.profile_refresh import CURSOR_NAME as PROFILE_CURSOR, refresh_twitch_profiles
+from .services.seeding import SEED_PASSWORD, SeedError, seed_scale
+from .services.similarity import compute_similar_communities
+from .services.single_flight import single_flight
+
+User = get_user_model()
+
+# Query-Counts und Latenzen pro Datensatzgröße: benchmarks.py (opt-in)
+
+
+def client_for(user=None) -> APIClient:
+    client = APIClient()
+    if user is not None:
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(user).access_token}")
+    return client
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user("exporter", "exporter@example.com", SEED_PASSWORD, is_staff=True)
+        self.communities = [
+            Community.objects.create(name=f"Export {i}", external_id=f"export-{i}", created_by=self.staff) for i in range(5)
+        ]
+        CommunityMembership.objects.bulk_create(CommunityMembership(community=c, user=self.staff) for c in self.communities)
+
+    def download(self, path: str, user=None, expected_status: int = 200) -> str:
+        response = client_for(user or self.staff).get(path)
+        self.assertEqual(response.status_code, expected_status)
+        return b"".join(response.streaming_content).decode() if response.streaming else ""
+
+    def test_staff_only(self):
+        self.assertEqual(client_for().get("/export/communities.ndjson").status_code, 401)
+        member = User.objects.create_user("nostaff", "nostaff@example.com", SEED_PASSWORD)
+        self.download("/export/communities.ndjson", member, 403)
+        self.download("/export/groups.ndjson", expected_status=404)
+        self.download("/export/communities.xml", expected_status=404)
+        self.download("/export/communities.ndjson?chunk_size=many", expected_status=400)
+
+    def test_ndjson_and_csv(self):
+        rows = [json.loads(line) for line in self.download("/export/communities.ndjson").splitlines()]
+        self.assertEqual([r["id"] for r in rows], [c.pk for c in self.communities])
+        self.assertEqual(list(rows[0]), list(COMMUNITY_EXPORT_FIELDS))
+        self.assertEqual(rows[0]["name"], "Export 0")
+
+        header, *lines = csv.reader(io.StringIO(self.download("/export/memberships.csv")))
+        self.assertEqual(header, list(MEMBERSHIP_EXPORT_FIELDS))
+        self.assertEqual(sorted(int(line[1]) for line in lines), [c.pk for c in self.communities])
+
+    def test_rows_are_grouped_per_chunk(self):
+        chunks = list(iter_export("communities", "ndjson", chunk_size=2))
+        self.assertEqual([chunk.count("\n") for chunk in chunks], [2, 2, 1])
+
+
+class SparseFieldsTests(TestCase):
+    def setUp(self):
+        owner = User.objects.create_user("sparse", "sparse@example.com", SEED_PASSWORD)
+        self.community = Community.objects.create(
+            name="Sparse", external_id="sparse", description="lang und teuer", created_by=owner
+        )
+        CommunityMembership.objects.create(community=self.community, user=owner)
+
+    def get(self, path: str):
+        with CaptureQueriesContext(connection) as ctx:
+            response = client_for().get(path)
+        return response, "\n".join(q["sql"] for q in ctx.captured_queries)
+
+    def test_fields_narrow_payload_and_select(self):
+        response, sql = self.get("/communities/?fields=id,name")
+        self.assertEqual(response.data, [{"id": self.community.pk, "name": "Sparse"}])
+        # Nicht angefragt -> weder Spalte noch COUNT/JOIN im SQL
+        self.assertNotIn("description", sql)
+        self.assertNotIn("COUNT(", sql)
+
+        response, sql = self.get("/communities/")
+        self.assertEqual(response.data[0]["member_count"], 1)
+        self.assertIn("COUNT(", sql)
+
+        response, sql = self.get(f"/communities/slug/{self.community.slug}/?fields=slug,member_count")
+        self.assertEqual(response.data, {"slug": self.community.slug, "member_count": 1})
+        self.assertNotIn("description", sql)
+
+    def test_invalid_fields(self):
+        for query in ("fields=id,password", "fields=", "fields=,"):
+            response = client_for().get(f"/communities/?{query}")
+            self.assertEqual(response.status_code, 400, query)
+            self.assertIn("fields", response.data)
+        self.assertIn("password", str(client_for().get("/communities/?fields=id,password").data["fields"]))
+
+
+class CommunityBatchTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("batch", "batch@example.com", SEED_PASSWORD)
+        self.communities = [
+            Community.objects.create(name=f"Batch {i}", external_id=f"batch{i}", created_by=self.user) for i in range(3)
+        ]
+        CommunityMembership.objects.create(community=self.communities[1], user=self.user, role="admin")
+
+    def test_ids_in_request_order_with_missing(self):
+        a, b, c = (community.pk for community in self.communities)
+        response = client_for(self.user).get(f"/communities/batch/?ids={c},999999,{a},{c}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([r["id"] for r in response.data["results"]], [c, a])
+        self.assertEqual(response.data["missing"], [999999])
+
+        response = client_for(self.user).get(f"/communities/batch/?ids={b}")
+        self.assertEqual((response.data["results"][0]["is_member"], response.data["results"][0]["my_role"]), (True, "admin"))
+
+    def test_slugs_with_sparse_fields(self):
+        slugs = [community.slug for community in self.communities]
+        with self.assertNumQueries(1):
+            response = client_for().get(f"/communities/batch/?slugs={slugs[2]},nope,{slugs[0]}&fields=id,name")
+        self.assertEqual(response.data["results"], [
+            {"id": self.communities[2].pk, "name": "Batch 2"},
+            {"id": self.communities[0].pk, "name": "Batch 0"},
+        ])
+        self.assertEqual(response.data["missing"], ["nope"])
+
+    def test_invalid_requests(self):
+        too_many = ",".join(str(i) for i in range(1, 400))
+        for query in ("", "ids=1&slugs=a", "ids=", "ids=1,x", f"ids={too_many}"):
+            self.assertEqual(client_for().get(f"/communities/batch/?{query}").status_code, 400, query)
+
+
+class MembersListTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user("members-admin", "members-admin@example.com", SEED_PASSWORD)
+        self.community = Community.objects.create(name="Members", external_id="members", created_by=self.admin)
+        CommunityMembership.objects.create(community=self.community, user=self.admin, role="admin")
+        self.members = User.objects.bulk_create(User(username=f"member{i}") for i in range(5))
+        CommunityMembership.objects.bulk_create(CommunityMembership(community=self.community, user=user) for user in self.members)
+        # Gleiche joined_at für mehrere Mitglieder (auto_now_add, daher per update): der Cursor muss über id weiterblättern
+        CommunityMembership.objects.filter(user__in=self.members).update(joined_at=timezone.now() - timedelta(days=1))
+        self.url = f"/communities/{self.community.pk}/members/"
+
+    def test_only_admins_and_staff(self):
+        self.assertEqual(client_for().get(self.url).status_code, 401)
+        self.assertEqual(client_for(self.members[0]).get(self.url).status_code, 403)
+        staff = User.objects.create_user("members-staff", "members-staff@example.com", SEED_PASSWORD, is_staff=True)
+        self.assertEqual(client_for(staff).get(self.url).status_code, 200)
+
+    def test_cursor_pages_cover_all_members_once(self):
+        client, seen, cursor = client_for(self.admin), [], ""
+        while True:
+            response = client.get(self.url, {"limit": 2, "cursor": cursor} if cursor else {"limit": 2})
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(len(response.data["results"]), 2)
+            seen += [row["username"] for row in response.data["results"]]
+            cursor = response.data["next_cursor"]
+            if not cursor:
+                break
+        # Neueste zuerst, bei Gleichstand höhere id zuerst
+        self.assertEqual(seen, ["members-admin", *[u.username for u in reversed(self.members)]])
+
+    def test_role_filter_and_invalid_params(self):
+        client = client_for(self.admin)
+        response = client.get(self.url, {"role": "admin"})
+        self.assertEqual([row["user_id"] for row in response.data["results"]], [self.admin.pk])
+        self.assertIsNone(response.data["next_cursor"])
+        for params in ({"role": "owner"}, {"limit": "x"}, {"cursor": "not-a-cursor"}):
+            self.assertEqual(client.get(self.url, params).status_code, 400, params)
+
+
+class ProfileRefreshTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        owner = User.objects.create_user("profiles", "profiles@example.com", SEED_PASSWORD)
+        self.communities = [
+            Community.objects.create(
+                name=f"Profile {i}", external_id=f"p{i}", external_login=f"login{i}", external_display_name=f"Login{i}",
+                created_by=owner,
+            )
+            for i in range(5)
+        ]
+        self.renamed = {"p2"}
+        self.requested = []
+        patcher = mock.patch.object(type(get_provider("twitch")), "_fetch_by_ids", side_effect=self.helix)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def helix(self, ids, priority):
+        self.requested.append(list(ids))
+        # p4 gibt es bei Twitch nicht mehr, p2 hat sich umbenannt
+        users = {}
+        for external_id in ids:
+            if external_id != "p4":
+                login = f"renamed{external_id[1:]}" if external_id in self.renamed else f"login{external_id[1:]}"
+                users[external_id] = ProviderUser(
+                    id=external_id, login=login, display_name=f"Login{external_id[1:]}", profile_image_url=""
+                )
+        return users
+
+    def position(self) -> int:
+        return SyncCursor.objects.get(name=PROFILE_CURSOR).position
+
+    def test_resumes_from_stored_cursor(self):
+        stats = refresh_twitch_profiles(batch_size=2, max_batches=1)
+        self.assertEqual((stats.batches, stats.scanned, stats.finished), (1, 2, False))
+        self.assertEqual(self.position(), self.communities[1].pk)
+
+        # Neuer Lauf (z.B. nach Abbruch): ab dem gespeicherten Cursor, nicht von vorne
+        stats = refresh_twitch_profiles(batch_size=2)
+        self.assertEqual(self.requested, [["p0", "p1"], ["p2", "p3"], ["p4"]])
+        self.assertEqual((stats.scanned, stats.finished), (3, True))
+        self.assertEqual(self.position(), 0)
+
+    def test_writes_only_changed_rows(self):
+        before = dict(Community.objects.values_list("external_id", "updated_at"))
+        with CaptureQueriesContext(connection) as ctx:
+            stats = refresh_twitch_profiles(batch_size=5)
+        self.assertEqual((stats.updated, stats.missing), (1, 1))
+        after = dict(Community.objects.values_list("external_id", "updated_at"))
+        self.assertEqual({pk for pk in after if after[pk] != before[pk]}, {"p2"})
+        self.assertEqual(Community.objects.get(external_id="p2").external_login, "renamed2")
+        updates = [q["sql"] for q in ctx.captured_queries if q["sql"].startswith('UPDATE "communities_community"')]
+        self.assertEqual(len(updates), 1)
+
+        # Zweiter Lauf: nichts mehr anders, kein UPDATE
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(refresh_twitch_profiles(batch_size=5).updated, 0)
+        self.assertFalse([q for q in ctx.captured_queries if q["sql"].startswith('UPDATE "communities_community"')])
+
+    def test_provider_unavailable_pauses_without_advancing(self):
+        def flaky(ids, priority):
+            if len(self.requested) == 1:
+                self.requested.append(list(ids))
+                raise ProviderUnavailable("helix 503")
+            return self.helix(ids, priority)
+
+        with mock.patch.object(type(get_provider("twitch")), "_fetch_by_ids", side_effect=flaky), \
+                self.assertLogs("communities.services.profile_refresh", "WARNING"):
+            stats = refresh_twitch_profiles(batch_size=2)
+        self.assertEqual((stats.batches, stats.finished), (1, False))
+        self.assertEqual(self.position(), self.communities[1].pk)
+
+        # Wieder erreichbar: derselbe Batch noch einmal, dann weiter
+        stats = refresh_twitch_profiles(batch_size=2)
+        self.assertEqual(self.requested, [["p0", "p1"], ["p2", "p3"], ["p2", "p3"], ["p4"]])
+        self.assertTrue(stats.finished)
+        self.assertEqual(Community.objects.get(external_id="p2").external_login, "renamed2")
+
+
+class LiveStatusTests(TestCase):
+    def setUp(self):
+        owner = User.objects.create_user("live", "live@example.com", SEED_PASSWORD)
+        self.fresh, self.stale = (
+            Community.objects.create(name=f"Live {i}", external_id=f"live-{i}", created_by=owner) for i in range(2)
+        )
+
+    def test_live_status_expires(self):
+        fresh, stale = self.fresh, self.stale
+        now = timezone.now()
+        CommunityLiveStream.objects.create(community=fresh, viewer_count=5, started_at=now, checked_at=now)
+        # Poller steht seit mehr als 2 Intervallen: nicht mehr live
+        CommunityLiveStream.objects.create(
+            community=stale, viewer_count=50, started_at=now, checked_at=now - timedelta(seconds=121)
+        )
+        with self.settings(LIVE_STATUS_POLL_SECONDS=60):
+            live = {c.pk: (c.is_live, c.viewer_count) for c in communities_with_counts().filter(pk__in=[fresh.pk, stale.pk])}
+            self.assertEqual(live, {fresh.pk: (True, 5), stale.pk: (False, None)})
+            self.assertEqual(list(communities_with_counts(live_only=True).values_list("pk", flat=True)), [fresh.pk])
+
+    def test_poll_upserts_live_and_deletes_offline(self):
+        started_at = (timezone.now() - timedelta(hours=1)).replace(microsecond=0)
+        # stale war live und ist jetzt offline, fresh ist neu live
+        CommunityLiveStream.objects.create(
+            community=self.stale, viewer_count=50, started_at=started_at, checked_at=timezone.now() - timedelta(minutes=1)
+        )
+        live = {"live-0": TwitchStream(user_id="live-0", viewer_count=7, started_at=started_at.isoformat())}
+
+        def helix_streams(ids, priority):
+            return {i: live[i] for i in ids if i in live}
+
+        with mock.patch.object(type(get_provider("twitch")), "fetch_live_streams", side_effect=helix_streams) as fetch:
+            self.assertEqual(poll_live_status(batch_size=1), 1)
+            self.assertEqual([c.args[0] for c in fetch.call_args_list], [["live-0"], ["live-1"]])
+            stream = CommunityLiveStream.objects.get()
+            self.assertEqual((stream.community_id, stream.viewer_count, stream.started_at), (self.fresh.pk, 7, started_at))
+
+            # Zweiter Lauf: bestehende Zeile wird aktualisiert, nicht doppelt angelegt
+            live["live-0"] = TwitchStream(user_id="live-0", viewer_count=9, started_at=started_at.isoformat())
+            self.assertEqual(poll_live_status(), 1)
+        updated = CommunityLiveStream.objects.get()
+        self.assertEqual(updated.viewer_count, 9)
+        self.assertGreater(updated.checked_at, stream.checked_at)
+
+
+@skipUnless(find_spec("numpy") and find_spec("scipy"), "numpy/scipy not installed")
+class SimilarCommunityTests(TestCase):
+    def test_compute_similar_in_blocks(self):
+        seed_scale(users=200, communities=100, memberships_per_user=5, prefix="similar", seed=1)
+        result = lambda: sorted(SimilarCommunity.objects.values_list("community_id", "similar_id", "rank", "score"))
+        # Ein Block für alles vs. Laden/Rechnen in Bereichen zu 7 Communities: gleiches Ergebnis
+        written = compute_similar_communities(top_k=5, block_rows=10**6)
+        whole = result()
+        self.assertEqual(compute_similar_communities(top_k=5, block_rows=7, chunk_size=50), written)
+        self.assertEqual(result(), whole)
+        self.assertTrue(whole)
+
+
+class SeedScaleTests(TestCase):
+    def memberships(self, prefix: str) -> list[tuple]:
+        """Memberships relativ zu den ersten IDs des Laufs, damit zwei Läufe vergleichbar sind."""
+        users = User.objects.filter(username__startswith=f"{prefix}_")
+        communities = Community.objects.filter(slug__startswith=f"{prefix}-")
+        first_user, first_community = min(users.values_list("pk", flat=True)), min(communities.values_list("pk", flat=True))
+        rows = CommunityMembership.objects.filter(user__in=users).values_list("user_id", "community_id", "role")
+        return sorted((u - first_user, c - first_community, role) for u, c, role in rows)
+
+    def test_copy_and_bulk_create_seed_the_same_data(self):
+        stats = seed_scale(users=30, communities=8, memberships_per_user=3, prefix="copy", seed=7)
+        self.assertEqual(stats.method, "copy")
+        self.assertEqual((stats.users, stats.communities), (30, 8))
+        self.assertEqual(CommunityMembership.objects.filter(user__username__startswith="copy_").count(), stats.memberships)
+
+        out = io.StringIO()
+        call_command(
+            "seed_scale", users=30, communities=8, memberships_per_user=3, prefix="bulk", seed=7, no_copy=True, stdout=out
+        )
+        self.assertIn("bulk_create: users=30 communities=8", out.getvalue())
+        self.assertEqual(self.memberships("copy"), self.memberships("bulk"))
+
+    def test_creators_are_admins_and_sequences_continue(self):
+        seed_scale(users=20, communities=5, memberships_per_user=2, prefix="admins", seed=1)
+        for community in Community.objects.filter(slug__startswith="admins-"):
+            role = CommunityMembership.objects.get(community=community, user_id=community.created_by_id).role
+            self.assertEqual(role, "admin")
+
+        # IDs wurden explizit vergeben: die Sequences müssen dahinter weiterzählen
+        user = User.objects.create_user("after-seed", "after-seed@example.com", SEED_PASSWORD)
+        self.assertGreater(user.pk, User.objects.filter(username__startswith="admins_").order_by("-pk")[0].pk)
+        self.assertTrue(self.client.login(username="admins_0", password=SEED_PASSWORD))
+
+        with self.assertRaises(SeedError):
+            seed_scale(users=1, communities=1, prefix="admins")
+
+
+class CommunityCreateTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_create_conflicts(self):
+        client = client_for(User.objects.create_user("creator", "creator@example.com", SEED_PASSWORD))
+        owner = User.objects.create_user("owner", "owner@example.com", SEED_PASSWORD)
+        Community.objects.create(name="Taken", platform="twitch", external_id="taken", external_login="taken", created_by=owner)
+        create = lambda login: client.post("/communities/", {"twitch": login}, format="json")
+
+        # Slug-Race: der Check in save() sieht "taken" noch nicht, der INSERT scheitert am Slug
+        real_exists = QuerySet.exists
+        raced = []
+
+        def racing_exists(qs):
+            if not raced:
+                raced.append(qs)
+                return False
+            return real_exists(qs)
+
+        twitch_user = ProviderUser(id="new-id", login="takenagain", display_name="Taken", profile_image_url="")
+        with mock.patch("integrations.providers.twitch.TwitchProvider.resolve", return_value=twitch_user), \
+                mock.patch.object(QuerySet, "exists", racing_exists):
+            response = create("takenagain")
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data["slug"], "taken-2")
+
+        # Umbenannter Streamer: (platform, external_id) gibt es schon -> bestehende Community
+        renamed = ProviderUser(id="taken", login="takenrenamed", display_name="Taken", profile_image_url="")
+        with mock.patch("integrations.providers.twitch.TwitchProvider.resolve", return_value=renamed):
+            response = create("takenrenamed")
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data["slug"], "taken")
+
+        # Lock nicht bekommen und noch keine Community: 409 statt paralleler Create
+        @contextmanager
+        def busy(key):
+            yield False
+
+        with mock.patch("communities.serializers.single_flight", busy), \
+                mock.patch("integrations.providers.twitch.TwitchProvider.resolve") as resolve:
+            self.assertEqual(create("somebodyelse").status_code, 409)
+        resolve.assert_not_called()
+
+    def test_slug_from_name_or_login(self):
+        owner = User.objects.create_user("slugs", "slugs@example.com", SEED_PASSWORD)
+        create = lambda **kwargs: Community.objects.create(created_by=owner, **kwargs)
+        self.assertEqual(create(name="Big Stream", external_id="s1").slug, "big-stream")
+        self.assertEqual(create(name="Big  Stream!", external_id="s2").slug, "big-stream-2")
+        self.assertEqual(create(name="Big Stream", external_id="s3").slug, "big-stream-3")
+        self.assertEqual(create(name="", external_login="loginonly", external_id="s4").slug, "loginonly")
+        self.assertEqual(create(name="!!!", external_id="s5").slug, "community")
+
+        # Umbenennen ändert den Slug nicht
+        community = Community.objects.get(external_id="s1")
+        community.name = "Renamed"
+        community.save()
+        self.assertEqual(community.slug, "big-stream")
+
+    def test_single_flight_releases_only_own_lock(self):
+        with single_flight("k") as acquired:
+            self.assertTrue(acquired)
+            with single_flight("k", wait=0) as second:
+                self.assertFalse(second)
+            self.assertIsNotNone(cache.get("single-flight:k"))
+            # TTL abgelaufen, ein anderer Worker hält den Lock jetzt
+            cache.set("single-flight:k", "other")
+        self.assertEqual(cache.get("single-flight:k"), "other")
+
+
+class JoinBufferTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("buffered", "buffered@example.com", SEED_PASSWORD)
+        self.communities = [
+            Community.objects.create(name=f"Buffered {i}", external_id=f"buffered-{i}", created_by=self.user)
+            for i in range(4)
+        ]
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(self.user).access_token}")
+        # Intervall so lang, dass nur die expliziten flush()-Aufrufe schreiben
+        self.buffer = JoinBuffer(interval=3600)
+        patcher = mock.patch("communities.views.get_join_buffer", return_value=self.buffer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def joined(self):
+        return set(CommunityMembership.objects.filter(user=self.user).values_list("community_id", flat=True))
+
+    def events(self, kind):
+        return sorted(MembershipEvent.objects.filter(user=self.user, kind=kind).values_list("community_id", flat=True))
+
+    def test_flush_and_leave_while_pending(self):
+        c0, c1, c2, c3 = (c.pk for c in self.communities)
+        for pk in (c0, c1, c2):
+            self.assertEqual(self.client.post(f"/communities/{pk}/join/").status_code, 202)
+        self.assertEqual(self.joined(), set())
+        # Noch nicht geflusht, aber schon in /me/communities/
+        self.assertEqual({c["id"] for c in self.client.get("/me/communities/").data}, {c0, c1, c2})
+
+        # Leave auf diesem Worker verwirft den gepufferten Join, auf einem anderen hinterlässt er einen Tombstone
+        response = self.client.post(f"/communities/{c1}/leave/")
+        self.assertEqual(response.data["detail"], "Left.")
+        self.assertTrue(JoinBuffer(interval=3600).discard(c2, self.user.pk))
+
+        self.assertEqual(self.buffer.flush(), 1)
+        self.assertEqual(self.joined(), {c0})
+        self.assertEqual(self.events(MembershipEventKind.JOIN), [c0])
+        self.assertEqual({c["id"] for c in self.client.get("/me/communities/").data}, {c0})
+
+        # Leave auf einem anderen Worker, während der INSERT lief: Zeile wird wieder entfernt
+        self.client.post(f"/communities/{c3}/join/")
+        write = self.buffer._write
+
+        def write_then_leave(batch):
+            inserted = write(batch)
+            JoinBuffer(interval=3600).discard(c3, self.user.pk)
+            return inserted
+
+        with mock.patch.object(self.buffer, "_write", write_then_leave):
+            self.assertEqual(self.buffer.flush(), 0)
+        self.assertEqual(self.joined(), {c0})
+        self.assertEqual(self.events(MembershipEventKind.LEAVE), [c3])
+
+        # Doppelter Join (zweiter Worker) zählt nur einmal
+        self.buffer.add(c0, self.user.pk)
+        self.assertEqual(self.buffer.flush(), 0)
+        self.assertEqual(self.events(MembershipEventKind.JOIN), [c0, c3])
+
+
+    def test_flush_skips_deleted_rows_in_chunks(self):
+        c0, c1, c2, c3 = (c.pk for c in self.communities)
+        gone = User.objects.create_user("gone", "gone@example.com", SEED_PASSWORD)
+        for pk in (c0, c1, c2):
+            self.buffer.add(pk, self.user.pk)
+        self.buffer.add(c3, gone.pk)
+        # Zwischen add() und flush() gelöscht: darf die anderen Joins nicht mitreißen
+        self.communities[1].delete()
+        gone.delete()
+
+        with mock.patch("communities.services.join_buffer.WRITE_CHUNK", 2), CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.buffer.flush(), 2)
+        # Zwei Chunks, je ein INSERT für Mitgliedschaften und eins für Events
+        self.assertEqual(len([q for q in ctx.captured_queries if q["sql"].startswith("INSERT INTO")]), 4)
+        self.assertEqual(self.joined(), {c0, c2})
+        self.assertEqual(self.buffer._pending, {})
+        self.assertEqual(self.buffer.flush(), 0)
+
+    def test_failed_chunk_requeues_only_the_rest(self):
+        pks = [c.pk for c in self.communities]
+        for pk in pks:
+            self.buffer.add(pk, self.user.pk)
+        write = self.buffer._write
+        calls = []
+
+        def fail_second(batch):
+            calls.append(batch)
+            if len(calls) == 2:
+                raise RuntimeError("db gone")
+            return write(batch)
+
+        with mock.patch("communities.services.join_buffer.WRITE_CHUNK", 2), \
+                mock.patch.object(self.buffer, "_write", fail_second), self.assertLogs("communities.services.join_buffer"):
+            self.assertEqual(self.buffer.flush(), 2)
+        self.assertEqual(list(self.buffer._pending), [(pk, self.user.pk) for pk in pks[2:]])
+        self.assertEqual({c["id"] for c in self.client.get("/me/communities/").data}, set(pks))
+
+        # Überlauf: älteste fliegen raus statt unbegrenzt zu wachsen
+        with mock.patch("communities.services.join_buffer.MAX_PENDING", 1), \
+                mock.patch.object(self.buffer, "_write", side_effect=RuntimeError("db gone")), self.assertLogs("communities.services.join_buffer"):
+            self.assertEqual(self.buffer.flush(), 0)
+        self.assertEqual(list(self.buffer._pending), [(pks[3], self.user.pk)])
+        self.assertEqual(self.buffer.flush(), 1)
+        self.assertEqual(self.joined(), {pks[0], pks[1], pks[3]})
+
+
+class TrendingTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("trender", "trender@example.com", SEED_PASSWORD)
+        self.communities = [
+            Community.objects.create(name=f"Trend {i}", external_id=f"trend-{i}", created_by=self.user) for i in range(3)
+        ]
+
+    def test_live_boost_only_for_fresh_status(self):
+        now = timezone.now()
+        fresh, stale, offline = self.communities
+        for community in self.communities:
+            CommunityActivityBucket.objects.create(community=community, bucket_start=trending._bucket_start(now), joins=4)
+        CommunityLiveStream.objects.create(community=fresh, started_at=now, checked_at=now - timedelta(seconds=30))
+        # Poller steht seit 10 Minuten: kein Boost mehr, sonst klebt die Community oben
+        CommunityLiveStream.objects.create(community=stale, started_at=now, checked_at=now - timedelta(minutes=10))
+
+        with self.settings(LIVE_STATUS_POLL_SECONDS=60):
+            scores = trending.compute_scores(now)
+        self.assertAlmostEqual(scores[fresh.pk], scores[offline.pk] * trending.LIVE_BOOST)
+        self.assertEqual(scores[stale.pk], scores[offline.pk])
+
+    def test_record_activity_in_chunks(self):
+        now = timezone.now()
+        events = [
+            (community.pk, kind, now - timedelta(hours=hours))
+            for community in self.communities
+            for hours in (0, 1)
+            for kind in (MembershipEventKind.JOIN, MembershipEventKind.JOIN, MembershipEventKind.LEAVE)
+        ]
+        with mock.patch.object(trending, "WRITE_CHUNK", 4), CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(trending.record_activity(events), 6)
+            trending.record_activity(events)
+        # 6 Buckets à 4 pro Statement, zweimal
+        self.assertEqual(len(ctx.captured_queries), 4)
+        totals = CommunityActivityBucket.objects.aggregate(Sum("joins"), Sum("leaves"))
+        self.assertEqual((totals["joins__sum"], totals["leaves__sum"]), (24, 12))
+        self.assertEqual(set(CommunityActivityBucket.objects.values_list("joins", "leaves")), {(4, 2)})
+
+
+class MembershipStatsTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user("stats-admin", "stats-admin@example.com", SEED_PASSWORD)
+        self.community = Community.objects.create(name="Stats", external_id="stats", created_by=self.admin)
+        CommunityMembership.objects.create(community=self.community, user=self.admin, role="admin")
+        self.today = timezone.localdate()
+
+    def event(self, kind: str, days_ago: int = 0) -> None:
+        event = MembershipEvent.objects.create(community=self.community, kind=kind)
+        # created_at ist auto_now_add
+        MembershipEvent.objects.filter(pk=event.pk).update(created_at=timezone.now() - timedelta(days=days_ago))
+
+    def test_rollup_in_batches_and_late_events(self):
+        for kind, days_ago in (("join", 2), ("join", 2), ("join", 0), ("leave", 0)):
+            self.event(kind, days_ago)
+        self.assertEqual(rollup_pending(batch_size=3), 3)
+        self.assertEqual(rollup_pending(batch_size=3), 1)
+        self.assertEqual(rollup_pending(), 0)
+        self.assertFalse(MembershipEvent.objects.filter(rolled_up_at__isnull=True).exists())
+
+        # Join von gestern, nachdem heute schon gerollt wurde: heute zieht mit
+        self.event("join", 1)
+        rollup_pending()
+        days = community_daily_stats(self.community.pk, self.today - timedelta(days=3), self.today)
+        self.assertEqual(
+            [(d["joins"], d["leaves"], d["members"]) for d in days],
+            [(0, 0, 0), (2, 0, 2), (1, 0, 3), (1, 1, 3)],
+        )
+
+    def test_stats_endpoint(self):
+        self.event("join", 3)
+        rollup_pending()
+        url = f"/communities/{self.community.pk}/stats/"
+        start = (self.today - timedelta(days=3)).isoformat()
+
+        response = client_for(self.admin).get(url, {"from": start, "to": self.today.isoformat()})
+        self.assertEqual(response.status_code, 200)
+        # Tage ohne Events übernehmen den Stand des Vortags
+        self.assertEqual([d["members"] for d in response.data], [1, 1, 1, 1])
+        self.assertEqual(len(client_for(self.admin).get(url).data), 30)
+
+        outsider = User.objects.create_user("stats-outsider", "stats-outsider@example.com", SEED_PASSWORD)
+        self.assertEqual(client_for(outsider).get(url).status_code, 403)
+        for params in ({"from": "gestern"}, {"from": self.today.isoformat(), "to": start}, {"from": "2000-01-01"}):
+            self.assertEqual(client_for(self.admin).get(url, params).status_code, 400, params)
+
+    def test_user_delete_keeps_members_in_sync(self):
+        seed_scale(users=20, communities=10, memberships_per_user=5, prefix="stats", seed=1)
+        user = User.objects.filter(username__startswith="stats_", community_memberships__isnull=False).first()
+        rebuild_from_memberships()
+        community_ids = list(user.community_memberships.values_list("community_id", flat=True))
+        self.assertTrue(community_ids)
+        user.delete()
+        rollup_pending()
+
+        today = timezone.localdate()
+        for pk in community_ids:
+            # Memberships per CASCADE weg, Leave-Events trotzdem im Rollup
+            self.assertEqual(
+                community_daily_stats(pk, today, today)[-1]["members"],
+                CommunityMembership.objects.filter(community_id=pk).count(),
+            )
+
+
+class MembershipPartitioningTests(TransactionTestCase):
+    """
+    prepare -> backfill -> reconcile -> swap auf der Test-DB (CONCURRENTLY braucht
+    Autocommit, daher TransactionTestCase). tearDown tauscht zurück auf die Legacy-Tabelle.
+    """
+
+    PARTITIONS = 12
+
+    def setUp(self):
+        self.users = [User.objects.create_user(f"part{i}", f"part{i}@example.com", SEED_PASSWORD) for i in range(3)]
+        self.communities = [
+            Community.objects.create(name=f"Part {i}", external_id=f"part-{i}", created_by=self.users[0])
+            for i in range(self.PARTITIONS)
+        ]
+        CommunityMembership.objects.bulk_create(
+            CommunityMembership(community=c, user=u) for c in self.communities for u in self.users[:2]
+        )
+        with connection.cursor() as cursor:
+            self.constraints = partitioning._constraints(cursor, partitioning.TABLE, "puf")
+            self.index_names = [name for name, _ in partitioning._plain_indexes(cursor, partitioning.TABLE)]
+
+    def tearDown(self):
+        q = partitioning._q
+        with connection.cursor() as cursor:
+            if partitioning._exists(cursor, partitioning.LEGACY):
+                cursor.execute(f"DROP TABLE {q(partitioning.TABLE)} CASCADE")
+                cursor.execute(f"ALTER TABLE {q(partitioning.LEGACY)} RENAME TO {q(partitioning.TABLE)}")
+                # swap() hat die FKs gedroppt; Zeilen gelöschter User stören beim Wiederanlegen, der Flush leert ohnehin
+                cursor.execute(f"TRUNCATE {q(partitioning.TABLE)}")
+                for name, contype, definition in self.constraints:
+                    if contype == "f":
+                        cursor.execute(f"ALTER TABLE {q(partitioning.TABLE)} ADD CONSTRAINT {q(name)} {definition}")
+                    else:
+                        legacy = q(partitioning._name(name, "_legacy"))
+                        cursor.execute(f"ALTER TABLE {q(partitioning.TABLE)} RENAME CONSTRAINT {legacy} TO {q(name)}")
+                for name in self.index_names:
+                    cursor.execute(f"ALTER INDEX {q(partitioning._name(name, '_legacy'))} RENAME TO {q(name)}")
+
+    def rows(self):
+        return set(CommunityMembership.objects.values_list("id", "community_id", "user_id", "role"))
+
+    def test_prepare_backfill_reconcile_swap(self):
+        self.assertTrue(partitioning.prepare(self.PARTITIONS))
+        self.assertFalse(partitioning.prepare(self.PARTITIONS))
+        self.assertEqual(partitioning.backfill(batch_size=5), 2 * self.PARTITIONS)
+
+        # Writes nach dem Backfill laufen über den Trigger, eine Lücke holt reconcile nach
+        CommunityMembership.objects.create(community=self.communities[0], user=self.users[2])
+        CommunityMembership.objects.filter(user=self.users[1]).update(role="admin")
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {partitioning._q(partitioning.SHADOW)} WHERE user_id = %s", [self.users[0].pk])
+        self.assertEqual(partitioning.reconcile(batch_size=5), self.PARTITIONS)
+
+        before = self.rows()
+        partitioning.swap()
+        self.assertEqual(self.rows(), before)
+
+        info = partitioning.status(exact=True)
+        self.assertTrue(info["partitioned"])
+        self.assertEqual(info["partitions"], self.PARTITIONS)
+        with connection.cursor() as cursor:
+            partitions = partitioning._partitions(cursor, partitioning.TABLE)
+            # Name passt zum Remainder, auch zweistellig (_p10 ist nicht _p2)
+            self.assertEqual(partitions, [(f"{partitioning.TABLE}_p{r}", r) for r in range(self.PARTITIONS)])
+            for name, _ in partitions:
+                self.assertEqual([c for c, _, _ in partitioning._constraints(cursor, name, "p")], [f"{name}_pkey"])
+
+        # Neue Zeilen bekommen ids aus der übernommenen Sequenz
+        self.assertGreater(
+            CommunityMembership.objects.create(community=self.communities[1], user=self.users[2]).pk, max(r[0] for r in before)
+        )
+
+    def test_deletes_after_swap(self):
+        partitioning.prepare(self.PARTITIONS)
+        partitioning.backfill()
+        partitioning.swap()
+
+        with connection.cursor() as cursor:
+            self.assertEqual(partitioning._constraints(cursor, partitioning.LEGACY, "f"), [])
+        # Beide hatten schon vor dem Swap Mitgliedschaften, die auch noch in der Legacy-Tabelle liegen
+        user_id, community_id = self.users[1].pk, self.communities[0].pk
+        self.users[1].delete()
+        self.communities[0].delete()
+        self.assertFalse(CommunityMembership.objects.filter(user_id=user_id).exists())
+        self.assertFalse(CommunityMembership.objects.filter(community_id=community_id).exists())
+        self.assertEqual(CommunityMembership.objects.count(), self.PARTITIONS - 1)
+
+    def test_index_migrations_run_on_partitions(self):
+        partitioning.prepare(self.PARTITIONS)
+        partitioning.backfill()
+        partitioning.swap()
+        before = self.rows()
+
+        # 0006/0007 rückwärts und wieder vorwärts: Parent-Index ON ONLY, Partitionen CONCURRENTLY und attached
+        call_command("migrate", "communities", "0005", verbosity=0)
+        call_command("migrate", "communities", verbosity=0)
+        self.assertEqual(self.rows(), before)
+        with connection.cursor() as cursor:
+            for index in ("membership_joined_idx", "membership_role_joined_idx", "membership_user_cover_idx"):
+                cursor.execute("SELECT COUNT(*) FROM pg_inherits WHERE inhparent = to_regclass(%s)", [index])
+                self.assertEqual(cursor.fetchone()[0], self.PARTITIONS, index)
+
+    def test_leave_deletes_from_one_partition(self):
+        partitioning.prepare(self.PARTITIONS)
+        partitioning.backfill()
+        partitioning.swap()
+
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(self.users[1]).access_token}")
+        community = self.communities[3]
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.post(f"/communities/{community.pk}/leave/")
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertFalse(CommunityMembership.objects.filter(community=community, user=self.users[1]).exists())
+
+        delete = next(q["sql"] for q in ctx.captured_queries if q["sql"].startswith("DELETE"))
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN {delete}")
+            plan = "\n".join(row[0] for row in cursor.fetchall())
+        self.assertEqual(plan.count(f"Delete on {partitioning.TABLE}_p"), 1, plan)
+
+    def test_replace_unique_online_attaches_partition_constraints(self):
+        partitioning.prepare(self.PARTITIONS)
+        partitioning.backfill()
+        partitioning.swap()
+
+        with connection.cursor() as cursor:
+            partitioning.replace_unique_online(
+                cursor, partitioning.TABLE, "uniq_membership_community_user", "(community_id, user_id)"
+            )
+            cursor.execute(
+                "SELECT conrelid::regclass::text, pg_get_constraintdef(oid), conparentid <> 0 FROM pg_constraint "
+                "WHERE conname LIKE 'uniq_membership_community_user%%' AND conrelid::regclass::text NOT LIKE %s",
+                [f"%{partitioning.LEGACY}"],
+            )
+            rows = cursor.fetchall()
+        # Parent-Constraint neu, Partition-Constraints übernommen statt neu gebaut
+        self.assertIn((partitioning.TABLE, "UNIQUE (community_id, user_id)", False), rows)
+        self.assertEqual(len([r for r in rows if r[2]]), self.PARTITIONS, rows)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            CommunityMembership.objects.create(community=self.communities[0], user=self.users[0])
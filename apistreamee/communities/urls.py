@@ -4,8 +4,13 @@ from . import views
 urlpatterns = [
     # Communities
     path("communities/", views.community_list_create, name="community-list-create"),
+    path("communities/trending/", views.community_trending, name="community-trending"),
+    path("communities/batch/", views.community_batch, name="community-batch"),
     path("communities/slug/<slug:slug>/", views.community_detail_by_slug, name="community-detail-by-slug"),
     path("communities/<int:pk>/", views.community_patch_by_id, name="community-patch-by-id"),
+    path("communities/<int:pk>/similar/", views.community_similar, name="community-similar"),
+    path("communities/<int:pk>/members/", views.community_members_list, name="community-members"),
+    path("communities/<int:pk>/stats/", views.community_stats, name="community-stats"),
 
     # Membership actions
     path("communities/<int:pk>/join/", views.community_join, name="community-join"),
@@ -13,4 +18,7 @@ urlpatterns = [
 
     # Me
     path("me/communities/", views.me_communities, name="me-communities"),
+
+    # Export (admin only)
+    path("export/<str:kind>.<str:fmt>", views.export_stream, name="export-stream"),
 ]
@@ -1,27 +1,73 @@
-from django.db.models import Count
+from datetime import date, timedelta
+
+from django.db import transaction
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
 
-from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.decorators import api_view, permission_classes, renderer_classes
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from rest_framework import status
 
-from .models import Community, CommunityMembership
+from apistreamee.db_router import pin_user_to_primary, read_alias
+from apistreamee.idempotency import idempotent
+from .exports import (
+    DEFAULT_CHUNK_SIZE,
+    EXPORT_FORMATS,
+    EXPORT_KINDS,
+    CSVRenderer,
+    NDJSONRenderer,
+    iter_export,
+)
+from .models import Community, CommunityMembership, MembershipEventKind, MembershipRole
 from .permissions import IsCommunityAdmin
 from .serializers import (
     CommunityListSerializer,
     CommunityDetailSerializer,
     CommunityCreateSerializer,
     CommunityPatchSerializer,
+    CommunityMemberSerializer,
+    SimilarCommunitySerializer,
+    parse_sparse_fields,
 )
-from .selectors.communities import communities_with_counts, community_detail_with_user_flags
+from .selectors.communities import (
+    communities_detail_batch,
+    communities_of_user,
+    communities_with_counts,
+    community_detail_with_user_flags,
+    similar_communities,
+)
+from .selectors.members import InvalidCursor, community_members, decode_member_cursor, encode_member_cursor
+from .selectors.stats import community_daily_stats
+from .services.join_buffer import get_join_buffer, is_join_pending, pending_join_ids
+from .services.membership_stats import record_membership_event
+from .services.trending import get_trending
+
+# Obergrenze für /communities/batch/ (ids bzw. slugs pro Request)
+BATCH_MAX_KEYS = 300
+
+# Seitengröße für /communities/<id>/members/ (?limit=)
+MEMBERS_DEFAULT_LIMIT = 50
+MEMBERS_MAX_LIMIT = 200
+
+# /communities/<id>/stats/: Default-Zeitraum und maximale Spanne in Tagen
+STATS_DEFAULT_DAYS = 30
+STATS_MAX_DAYS = 366
 
 
 @api_view(["GET", "POST"])
+@idempotent("community-create")
 def community_list_create(request):
     if request.method == "GET":
-        qs = communities_with_counts().order_by("-created_at")
-        return Response(CommunityListSerializer(qs, many=True).data, status=status.HTTP_200_OK)
+        fields = parse_sparse_fields(request.query_params.get("fields"), CommunityListSerializer)
+        live_only = request.query_params.get("live") in ("1", "true")
+        live_first = request.query_params.get("sort") == "live"
+        qs = communities_with_counts(fields, live_only=live_only, live_first=live_first)
+        if not live_first:
+            qs = qs.order_by("-created_at")
+        return Response(CommunityListSerializer(qs, many=True, fields=fields).data, status=status.HTTP_200_OK)
 
     # POST
     if not request.user.is_authenticated:
@@ -30,18 +76,89 @@ def community_list_create(request):
     serializer = CommunityCreateSerializer(data=request.data, context={"request": request})
     serializer.is_valid(raise_exception=True)
     community = serializer.save()
+    pin_user_to_primary(request.user)
 
-    # Detail response inkl. Count + Flags
+    # Detail response inkl. Count + Flags; gab es die Community schon (paralleler Create), 200 statt 201
     obj = community_detail_with_user_flags(community.slug, request.user).get(pk=community.pk)
-    return Response(CommunityDetailSerializer(obj).data, status=status.HTTP_201_CREATED)
+    status_code = status.HTTP_201_CREATED if serializer.created else status.HTTP_200_OK
+    return Response(CommunityDetailSerializer(obj).data, status=status_code)
+
+
+@api_view(["GET"])
+@permission_classes([AllowAny])
+def community_trending(request):
+    # Vorberechnet (materialize_trending), hier nur aus dem Speicher ausliefern
+    return Response(get_trending(), status=status.HTTP_200_OK)
 
 
 @api_view(["GET"])
 @permission_classes([AllowAny])
 def community_detail_by_slug(request, slug: str):
-    qs = community_detail_with_user_flags(slug, request.user)
+    fields = parse_sparse_fields(request.query_params.get("fields"), CommunityDetailSerializer)
+    qs = community_detail_with_user_flags(slug, request.user, fields)
     community = get_object_or_404(qs, slug=slug)
-    return Response(CommunityDetailSerializer(community).data, status=status.HTTP_200_OK)
+    _apply_pending_join(community, request.user)
+    return Response(CommunityDetailSerializer(community, fields=fields).data, status=status.HTTP_200_OK)
+
+
+@api_view(["GET"])
+@permission_classes([AllowAny])
+def community_batch(request):
+    """
+    Multi-Get für Community-Karten: ?ids=1,2,3 oder ?slugs=a,b,c.
+    Ergebnisse in Eingabe-Reihenfolge, nicht gefundene Keys unter "missing".
+    """
+    raw_ids, raw_slugs = request.query_params.get("ids"), request.query_params.get("slugs")
+    if (raw_ids is None) == (raw_slugs is None):
+        return Response({"detail": "Pass either ids or slugs."}, status=status.HTTP_400_BAD_REQUEST)
+
+    raw = raw_ids if raw_ids is not None else raw_slugs
+    keys = list(dict.fromkeys(k.strip() for k in raw.split(",") if k.strip()))
+    if not keys:
+        return Response({"detail": "At least one key is required."}, status=status.HTTP_400_BAD_REQUEST)
+    if len(keys) > BATCH_MAX_KEYS:
+        return Response({"detail": f"At most {BATCH_MAX_KEYS} keys per request."}, status=status.HTTP_400_BAD_REQUEST)
+
+    fields = parse_sparse_fields(request.query_params.get("fields"), CommunityDetailSerializer)
+    if raw_ids is not None:
+        try:
+            keys = list(dict.fromkeys(int(k) for k in keys))
+        except ValueError:
+            return Response({"detail": "ids must be integers."}, status=status.HTTP_400_BAD_REQUEST)
+        qs = communities_detail_batch(ids=keys, user=request.user, fields=fields)
+        key_attr = "pk"
+    else:
+        # slug wird fürs Zuordnen gebraucht, auch wenn ?fields= ihn nicht enthält
+        query_fields = fields if fields is None or "slug" in fields else [*fields, "slug"]
+        qs = communities_detail_batch(slugs=keys, user=request.user, fields=query_fields)
+        key_attr = "slug"
+
+    by_key = {getattr(c, key_attr): c for c in qs}
+    found = [by_key[k] for k in keys if k in by_key]
+    for community in found:
+        _apply_pending_join(community, request.user)
+    return Response(
+        {
+            "results": CommunityDetailSerializer(found, many=True, fields=fields).data,
+            "missing": [k for k in keys if k not in by_key],
+        },
+        status=status.HTTP_200_OK,
+    )
+
+
+def _apply_pending_join(community, user) -> None:
+    """
+    Read-your-writes im gepufferten Join-Modus: noch nicht geflushter Join
+    des Users zählt bereits als Mitgliedschaft.
+    """
+    if get_join_buffer() is None or not user.is_authenticated:
+        return
+    if getattr(community, "is_member", True) or not is_join_pending(community.pk, user.pk):
+        return
+    community.is_member = True
+    community.my_role = "member"
+    if hasattr(community, "member_count"):
+        community.member_count += 1
 
 
 @api_view(["PATCH"])
@@ -57,35 +174,135 @@ def community_patch_by_id(request, pk: int):
     serializer = CommunityPatchSerializer(community, data=request.data, partial=True)
     serializer.is_valid(raise_exception=True)
     serializer.save()
+    pin_user_to_primary(request.user)
 
     obj = community_detail_with_user_flags(community.slug, request.user).get(pk=community.pk)
     return Response(CommunityDetailSerializer(obj).data, status=status.HTTP_200_OK)
 
 
+@api_view(["GET"])
+@permission_classes([AllowAny])
+def community_similar(request, pk: int):
+    # Offline berechnet (compute_similar_communities); leer, solange noch nicht gelaufen
+    qs = similar_communities(pk)
+    return Response(SimilarCommunitySerializer(qs, many=True).data, status=status.HTTP_200_OK)
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def community_members_list(request, pk: int):
+    """
+    Mitgliederliste für Admin-Tools (Community-Admins und Staff), neueste zuerst.
+    Blättern über ?cursor= aus "next_cursor"; optional ?role=admin|member.
+    """
+    community = get_object_or_404(Community.objects.only("id"), pk=pk)
+    if not _is_admin_or_staff(request, community):
+        return Response({"detail": "Forbidden."}, status=status.HTTP_403_FORBIDDEN)
+
+    role = request.query_params.get("role")
+    if role is not None and role not in MembershipRole.values:
+        return Response({"detail": f"role must be one of: {', '.join(MembershipRole.values)}."}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        limit = int(request.query_params.get("limit", MEMBERS_DEFAULT_LIMIT))
+    except ValueError:
+        return Response({"detail": "limit must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+    limit = max(1, min(limit, MEMBERS_MAX_LIMIT))
+
+    after = None
+    if request.query_params.get("cursor"):
+        try:
+            after = decode_member_cursor(request.query_params["cursor"])
+        except InvalidCursor:
+            return Response({"detail": "Invalid cursor."}, status=status.HTTP_400_BAD_REQUEST)
+
+    # limit + 1: eine Zeile mehr lesen, um zu wissen, ob es eine nächste Seite gibt
+    page = list(community_members(community.pk, role=role, after=after)[: limit + 1])
+    has_next = len(page) > limit
+    page = page[:limit]
+    return Response(
+        {
+            "results": CommunityMemberSerializer(page, many=True).data,
+            "next_cursor": encode_member_cursor(page[-1]) if has_next else None,
+        },
+        status=status.HTTP_200_OK,
+    )
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def community_stats(request, pk: int):
+    """
+    Wachstum pro Tag (joins, leaves, members am Tagesende) aus den Rollups,
+    ?from=YYYY-MM-DD&to=YYYY-MM-DD, Default die letzten STATS_DEFAULT_DAYS Tage.
+    """
+    community = get_object_or_404(Community.objects.only("id"), pk=pk)
+    if not _is_admin_or_staff(request, community):
+        return Response({"detail": "Forbidden."}, status=status.HTTP_403_FORBIDDEN)
+
+    try:
+        end = date.fromisoformat(request.query_params["to"]) if "to" in request.query_params else timezone.localdate()
+        start = (
+            date.fromisoformat(request.query_params["from"])
+            if "from" in request.query_params
+            else end - timedelta(days=STATS_DEFAULT_DAYS - 1)
+        )
+    except ValueError:
+        return Response({"detail": "from/to must be dates (YYYY-MM-DD)."}, status=status.HTTP_400_BAD_REQUEST)
+    if start > end or (end - start).days >= STATS_MAX_DAYS:
+        return Response(
+            {"detail": f"from must be before to, at most {STATS_MAX_DAYS} days."}, status=status.HTTP_400_BAD_REQUEST
+        )
+
+    return Response(community_daily_stats(community.pk, start, end), status=status.HTTP_200_OK)
+
+
+def _is_admin_or_staff(request, community) -> bool:
+    return request.user.is_staff or IsCommunityAdmin().has_object_permission(request, None, community)
+
+
 @api_view(["POST"])
 @permission_classes([IsAuthenticated])
+@idempotent("community-join")
 def community_join(request, pk: int):
     community = get_object_or_404(Community, pk=pk)
 
-    membership, created = CommunityMembership.objects.get_or_create(
-        community=community,
-        user=request.user,
-        defaults={"role": "member"},
-    )
+    join_buffer = get_join_buffer()
+    if join_buffer is not None:
+        # Join-Storm-Modus: sofort bestätigen, Insert kommt gebündelt im nächsten Flush
+        join_buffer.add(community.pk, request.user.pk)
+        pin_user_to_primary(request.user)
+        return Response({"detail": "Join accepted."}, status=status.HTTP_202_ACCEPTED)
+
+    with transaction.atomic(savepoint=False):
+        membership, created = CommunityMembership.objects.get_or_create(
+            community=community,
+            user=request.user,
+            defaults={"role": "member"},
+        )
+        if created:
+            record_membership_event(community.pk, request.user.pk, MembershipEventKind.JOIN)
     if not created:
         return Response({"detail": "Already a member."}, status=status.HTTP_200_OK)
 
+    pin_user_to_primary(request.user)
     return Response({"detail": "Joined."}, status=status.HTTP_201_CREATED)
 
 
 @api_view(["POST"])
 @permission_classes([IsAuthenticated])
+@idempotent("community-leave")
 def community_leave(request, pk: int):
     community = get_object_or_404(Community, pk=pk)
 
     # Optional: wenn admin, darf leave nur wenn noch ein anderer admin existiert (MVP-Guard)
+    join_buffer = get_join_buffer()
+    discarded = join_buffer is not None and join_buffer.discard(community.pk, request.user.pk)
+
     my_membership = CommunityMembership.objects.filter(community=community, user=request.user).first()
     if not my_membership:
+        if discarded:
+            return Response({"detail": "Left."}, status=status.HTTP_200_OK)
         return Response({"detail": "Not a member."}, status=status.HTTP_200_OK)
 
     if my_membership.role == "admin":
@@ -98,16 +315,41 @@ def community_leave(request, pk: int):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-    my_membership.delete()
+    with transaction.atomic(savepoint=False):
+        # Über (community_id, user_id) statt pk: partitioniert ist der PK (community_id, id), so trifft es nur eine Partition
+        CommunityMembership.objects.filter(community_id=community.pk, user_id=request.user.pk).delete()
+        record_membership_event(community.pk, request.user.pk, MembershipEventKind.LEAVE)
+    pin_user_to_primary(request.user)
     return Response({"detail": "Left."}, status=status.HTTP_200_OK)
 
 
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
 def me_communities(request):
-    qs = (
-        Community.objects.filter(memberships__user=request.user)
-        .annotate(member_count=Count("memberships"))
-        .order_by("-created_at")
-    )
+    pending_ids = pending_join_ids(request.user.pk) if get_join_buffer() is not None else ()
+    qs = communities_of_user(request.user, pending_ids=pending_ids).order_by("-created_at")
     return Response(CommunityListSerializer(qs, many=True).data, status=status.HTTP_200_OK)
+
+
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+@renderer_classes([JSONRenderer, NDJSONRenderer, CSVRenderer])
+def export_stream(request, kind: str, fmt: str):
+    """
+    Admin-only Export: streamt alle Communities/Memberships als NDJSON oder CSV.
+    """
+    if kind not in EXPORT_KINDS or fmt not in EXPORT_FORMATS:
+        return Response({"detail": "Unknown export."}, status=status.HTTP_404_NOT_FOUND)
+
+    try:
+        chunk_size = int(request.query_params.get("chunk_size", DEFAULT_CHUNK_SIZE))
+    except ValueError:
+        return Response({"detail": "chunk_size must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+    chunk_size = max(100, min(chunk_size, 20000))
+
+    # Der Iterator läuft erst nach der Middleware: Replica des Requests hier festhalten
+    response = StreamingHttpResponse(
+        iter_export(kind, fmt, chunk_size, using=read_alias()), content_type=EXPORT_FORMATS[fmt]
+    )
+    response["Content-Disposition"] = f'attachment; filename="{kind}.{fmt}"'
+    return response
@@ -0,0 +1,101 @@
+"""
+Query-Counts und Latenzen für Webhook, Queue, Rate-Limit und Provider-Cache.
+Opt-in: `python manage.py test integrations.benchmarks` (siehe communities.benchmarks).
+"""
+import uuid
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from apistreamee.benchmarking import BENCH_SIZES, BenchmarkMixin
+from communities.models import Community
+
+from . import eventsub
+from .models import EventSubMessage
+from .providers import ProviderUser, get_provider
+from .providers.ratelimit import Priority, SharedRateLimit
+from .tests import EventSubClientMixin, _notification
+
+
+class EventSubBenchmarks(EventSubClientMixin, BenchmarkMixin, TestCase):
+    suite = "integrations"
+
+    def test_webhook(self):
+        payload = _notification("1", "bench")
+        # Savepoint, INSERT, Release
+        response = self.assertQueries("webhook_notification", 3, lambda: self.post_notification(payload, "dup"))
+        self.assertEqual(response.status_code, 204)
+        # Redelivery: Savepoint, INSERT (Konflikt), Rollback to + Release Savepoint
+        response = self.assertQueries("webhook_duplicate", 4, lambda: self.post_notification(payload, "dup"))
+        self.assertEqual(response.status_code, 204)
+        self.bench("webhook_notification", lambda: self.post_notification(payload))
+
+    def test_process_pending(self):
+        for size in BENCH_SIZES:
+            Community.objects.bulk_create(
+                Community(name=f"c{i}", slug=f"bench-eventsub-{size}-{i}", external_id=f"{size}-{i}") for i in range(size)
+            )
+
+            def enqueue():
+                EventSubMessage.objects.bulk_create(
+                    EventSubMessage(
+                        message_id=uuid.uuid4().hex,
+                        subscription_type="user.update",
+                        payload=_notification(f"{size}-{i}", f"renamed{uuid.uuid4().hex[:6]}"),
+                    )
+                    for i in range(size)
+                )
+
+            enqueue()
+            # SELECT ... FOR UPDATE SKIP LOCKED, Communities, bulk_update, processed_at UPDATE (+ Savepoint/Release)
+            processed = self.assertQueries(
+                f"process_pending@{size}", 6, lambda: eventsub.process_pending(batch_size=size)
+            )
+            self.assertEqual(processed, size)
+
+            def run():
+                enqueue()
+                eventsub.process_pending(batch_size=size)
+
+            self.bench(f"process_pending@{size}", run, rounds=5)
+
+
+class RateLimitBenchmarks(BenchmarkMixin, TestCase):
+    suite = "integrations"
+
+    def setUp(self):
+        cache.clear()
+
+    def test_acquire_update(self):
+        limit = SharedRateLimit("bench")
+        headers = {"Ratelimit-Limit": "800", "Ratelimit-Remaining": "799", "Ratelimit-Reset": str(timezone.now().timestamp() + 60)}
+        limit.update(headers)
+        self.assertQueries("ratelimit_acquire", 0, lambda: limit.acquire(Priority.INTERACTIVE, max_wait=0))
+        self.bench("ratelimit_acquire", lambda: (limit.acquire(Priority.BACKGROUND, max_wait=0), limit.update(headers)))
+
+
+# LocMemCache hält per Default nur 300 Einträge (Prod: Redis)
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "OPTIONS": {"MAX_ENTRIES": 10_000}}}
+)
+class ProviderBenchmarks(BenchmarkMixin, TestCase):
+    suite = "integrations"
+
+    def setUp(self):
+        cache.clear()
+
+    def test_resolve_batch_cached(self):
+        provider = get_provider("twitch")
+        fetch = lambda ids, priority: {i: ProviderUser(id=i, login=f"l{i}", display_name=i, profile_image_url="") for i in ids}
+        for size in BENCH_SIZES:
+            ids = [f"{size}-{i}" for i in range(size)]
+            with mock.patch.object(type(provider), "_fetch_by_ids", side_effect=fetch) as upstream:
+                self.assertEqual(len(provider.resolve_batch(ids)), size)
+                # Upstream nur in batch_size-Häppchen, danach alles aus dem Cache
+                self.assertEqual(upstream.call_count, -(-size // provider.batch_size))
+                self.assertQueries(f"provider_resolve_batch_cached@{size}", 0, lambda: provider.resolve_batch(ids))
+                self.assertEqual(upstream.call_count, -(-size // provider.batch_size))
+                self.assertEqual(provider.resolve(f"l{ids[0]}").id, ids[0])
+            self.bench(f"provider_resolve_batch_cached@{size}", lambda: provider.resolve_batch(ids))
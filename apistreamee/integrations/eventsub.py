@@ -0,0 +1,120 @@
+import hashlib
+import hmac
+import logging
+import os
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import EventSubMessage
+
+logger = logging.getLogger(__name__)
+
+TWITCH_EVENTSUB_SECRET = os.getenv("TWITCH_EVENTSUB_SECRET", "")
+
+# Twitch: Nachrichten älter als 10 Minuten verwerfen (Replay-Schutz)
+MAX_MESSAGE_AGE = timedelta(minutes=10)
+
+# Verarbeitete Nachrichten so lange behalten (Dedupe gegen Redeliveries)
+RETENTION = timedelta(days=1)
+
+HEADER_ID = "Twitch-Eventsub-Message-Id"
+HEADER_TIMESTAMP = "Twitch-Eventsub-Message-Timestamp"
+HEADER_SIGNATURE = "Twitch-Eventsub-Message-Signature"
+HEADER_TYPE = "Twitch-Eventsub-Message-Type"
+
+
+class EventSubSignatureError(RuntimeError):
+    pass
+
+
+def sign(secret: str, message_id: str, timestamp: str, body: bytes) -> str:
+    digest = hmac.new(secret.encode(), message_id.encode() + timestamp.encode() + body, hashlib.sha256)
+    return f"sha256={digest.hexdigest()}"
+
+
+def verify(headers, body: bytes, secret: str = None) -> None:
+    """
+    HMAC-SHA256 über message_id + timestamp + raw body (Twitch-Spezifikation).
+    """
+    secret = secret if secret is not None else TWITCH_EVENTSUB_SECRET
+    if not secret:
+        raise EventSubSignatureError("TWITCH_EVENTSUB_SECRET is not configured.")
+
+    message_id = headers.get(HEADER_ID, "")
+    timestamp = headers.get(HEADER_TIMESTAMP, "")
+    signature = headers.get(HEADER_SIGNATURE, "")
+    if not (message_id and timestamp and signature):
+        raise EventSubSignatureError("Missing EventSub headers.")
+
+    if not hmac.compare_digest(sign(secret, message_id, timestamp, body), signature):
+        raise EventSubSignatureError("Invalid signature.")
+
+    sent_at = parse_datetime(timestamp)
+    if sent_at is None or timezone.now() - sent_at > MAX_MESSAGE_AGE:
+        raise EventSubSignatureError("Message too old.")
+
+
+def enqueue(message_id: str, payload: dict) -> bool:
+    """
+    Legt die Notification in die Queue. False bei Duplikat (Redelivery).
+    """
+    try:
+        with transaction.atomic():
+            EventSubMessage.objects.create(
+                message_id=message_id,
+                subscription_type=payload.get("subscription", {}).get("type", ""),
+                payload=payload,
+            )
+    except IntegrityError:
+        return False
+    return True
+
+
+def _apply_user_update(messages) -> None:
+    from communities.services.profile_refresh import apply_user_updates
+
+    apply_user_updates([m.payload.get("event", {}) for m in messages])
+
+
+HANDLERS = {
+    "user.update": _apply_user_update,
+}
+
+
+def process_pending(batch_size: int = 100) -> int:
+    """
+    Arbeitet bis zu `batch_size` offene Nachrichten ab (FIFO).
+    skip_locked -> mehrere Worker können parallel laufen.
+    """
+    with transaction.atomic():
+        batch = list(
+            EventSubMessage.objects.filter(processed_at__isnull=True)
+            .select_for_update(skip_locked=True)
+            .order_by("id")[:batch_size]
+        )
+        if not batch:
+            return 0
+
+        by_type = {}
+        for message in batch:
+            by_type.setdefault(message.subscription_type, []).append(message)
+
+        for subscription_type, messages in by_type.items():
+            handler = HANDLERS.get(subscription_type)
+            if handler is None:
+                logger.warning("eventsub: no handler for %s (%d messages)", subscription_type, len(messages))
+                continue
+            handler(messages)
+
+        EventSubMessage.objects.filter(pk__in=[m.pk for m in batch]).update(processed_at=timezone.now())
+
+    return len(batch)
+
+
+def prune_processed() -> int:
+    cutoff = timezone.now() - RETENTION
+    deleted, _ = EventSubMessage.objects.filter(processed_at__lt=cutoff).delete()
+    return deleted
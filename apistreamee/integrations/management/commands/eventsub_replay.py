@@ -0,0 +1,69 @@
+import json
+import uuid
+
+import requests
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from integrations import eventsub
+
+
+def _user_update_payload(user_id: str, login: str, name: str) -> dict:
+    return {
+        "subscription": {
+            "id": str(uuid.uuid4()),
+            "type": "user.update",
+            "version": "1",
+            "status": "enabled",
+            "condition": {"user_id": user_id},
+            "transport": {"method": "webhook", "callback": "local-replay"},
+            "created_at": timezone.now().isoformat(),
+        },
+        "event": {
+            "user_id": user_id,
+            "user_login": login,
+            "user_name": name,
+            "description": "",
+        },
+    }
+
+
+class Command(BaseCommand):
+    help = "Schickt signierte EventSub-Nachrichten an einen lokal laufenden Server (zum Testen)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", default="http://127.0.0.1:8000/integrations/eventsub/")
+        parser.add_argument("--file", help="JSON-Datei mit einer Notification (oder einer Liste davon).")
+        parser.add_argument("--user-id")
+        parser.add_argument("--login")
+        parser.add_argument("--name")
+        parser.add_argument("--message-id", help="Feste Message-Id (zum Testen der Dedupe).")
+        parser.add_argument("--type", default="notification", choices=["notification", "webhook_callback_verification", "revocation"])
+
+    def handle(self, *args, **options):
+        if not eventsub.TWITCH_EVENTSUB_SECRET:
+            raise CommandError("TWITCH_EVENTSUB_SECRET is not set.")
+
+        if options["file"]:
+            with open(options["file"], encoding="utf-8") as fh:
+                loaded = json.load(fh)
+            payloads = loaded if isinstance(loaded, list) else [loaded]
+        elif options["user_id"]:
+            login = options["login"] or f"user{options['user_id']}"
+            payloads = [_user_update_payload(options["user_id"], login, options["name"] or login)]
+        else:
+            raise CommandError("Pass --file or --user-id.")
+
+        for payload in payloads:
+            body = json.dumps(payload).encode()
+            message_id = options["message_id"] or str(uuid.uuid4())
+            timestamp = timezone.now().isoformat().replace("+00:00", "Z")
+            headers = {
+                "Content-Type": "application/json",
+                eventsub.HEADER_ID: message_id,
+                eventsub.HEADER_TIMESTAMP: timestamp,
+                eventsub.HEADER_TYPE: options["type"],
+                eventsub.HEADER_SIGNATURE: eventsub.sign(eventsub.TWITCH_EVENTSUB_SECRET, message_id, timestamp, body),
+            }
+            r = requests.post(options["url"], data=body, headers=headers, timeout=10)
+            self.stdout.write(f"{message_id} -> {r.status_code}")
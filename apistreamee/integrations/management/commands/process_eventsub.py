@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from integrations.eventsub import process_pending, prune_processed
+
+
+class Command(BaseCommand):
+    help = "Worker: wendet eingegangene EventSub-Notifications auf Communities an."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=100)
+        parser.add_argument("--idle-sleep", type=float, default=1.0, help="Pause in Sekunden, wenn die Queue leer ist.")
+        parser.add_argument("--once", action="store_true", help="Queue einmal leeren und beenden.")
+
+    def handle(self, *args, **options):
+        total = 0
+        last_prune = 0.0
+        while True:
+            processed = process_pending(options["batch_size"])
+            total += processed
+
+            if time.monotonic() - last_prune > 3600:
+                prune_processed()
+                last_prune = time.monotonic()
+
+            if processed:
+                continue
+            if options["once"]:
+                break
+            time.sleep(options["idle_sleep"])
+
+        self.stdout.write(f"processed={total}")
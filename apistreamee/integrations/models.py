@@ -1,3 +1,36 @@
 from django.db import models
 
-# Create your models here.
+
+class SyncCursor(models.Model):
+    """
+    Fortschritt von Hintergrund-Jobs (z.B. Keyset-Position des Profil-Refresh),
+    damit ein abgebrochener Lauf dort weitermacht, wo er aufgehört hat.
+    """
+
+    name = models.CharField(max_length=64, unique=True)
+    position = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name}@{self.position}"
+
+
+class EventSubMessage(models.Model):
+    """
+    Eingehende Twitch-EventSub-Notification. Dient gleichzeitig als
+    Dedupe (unique message_id) und als Queue (processed_at IS NULL).
+    """
+
+    message_id = models.CharField(max_length=100, unique=True)
+    subscription_type = models.CharField(max_length=64)
+    payload = models.JSONField()
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["id"], condition=models.Q(processed_at__isnull=True), name="eventsub_pending_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.subscription_type}:{self.message_id}"
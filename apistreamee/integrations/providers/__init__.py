@@ -0,0 +1,58 @@
+"""
+Provider-Registry: ein Provider pro Plattform (CommunityPlatform-Wert), gemeinsame
+Schnittstelle in base.Provider. Provider-Module (und damit requests) werden erst
+beim ersten get_provider() der jeweiligen Plattform importiert.
+"""
+
+import threading
+from dataclasses import dataclass
+
+from django.utils.module_loading import import_string
+
+PROVIDERS = {
+    "twitch": "integrations.providers.twitch.TwitchProvider",
+}
+
+_instances = {}
+_lock = threading.Lock()
+
+
+@dataclass
+class ProviderUser:
+    id: str
+    login: str
+    display_name: str
+    profile_image_url: str
+
+
+class ProviderError(RuntimeError):
+    pass
+
+
+class ProviderConfigError(ProviderError):
+    """Zugangsdaten o.ä. fehlen auf dem Server."""
+
+
+class ProviderNotFoundError(ProviderError):
+    pass
+
+
+class ProviderUnavailable(ProviderError):
+    """Rate-Limit erschöpft, Timeout oder 5xx: Plattform gerade nicht nutzbar."""
+
+
+class UnknownPlatform(ProviderError):
+    pass
+
+
+def get_provider(platform: str):
+    """Provider-Instanz der Plattform (eine pro Prozess, lazy importiert)."""
+    provider = _instances.get(platform)
+    if provider is not None:
+        return provider
+    if platform not in PROVIDERS:
+        raise UnknownPlatform(f"No provider registered for platform={platform}")
+    with _lock:
+        if platform not in _instances:
+            _instances[platform] = import_string(PROVIDERS[platform])()
+        return _instances[platform]
@@ -0,0 +1,178 @@
+import logging
+import threading
+import time
+from dataclasses import asdict
+from typing import Optional
+
+import requests
+from django.core.cache import cache
+from requests.adapters import HTTPAdapter
+
+from . import ProviderConfigError, ProviderNotFoundError, ProviderUnavailable, ProviderUser
+from .ratelimit import Priority, RateLimitExhausted, SharedRateLimit
+
+logger = logging.getLogger(__name__)
+
+
+class ProviderMetrics:
+    """Prozesslokale Zähler pro Provider (Calls, Fehler, Cache-Treffer, Upstream-Zeit)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {"requests": 0, "errors": 0, "cache_hits": 0, "cache_misses": 0, "request_ms": 0.0}
+
+    def incr(self, name: str, value=1) -> None:
+        with self._lock:
+            self._counts[name] += value
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return dict(self._counts)
+
+
+class Provider:
+    """
+    Gemeinsame Schnittstelle aller Plattformen: resolve (ein Login),
+    resolve_batch (viele ids) und refresh (ids ohne Cache neu laden).
+
+    Querschnitt steckt hier und gilt für jeden Provider: eine gepoolte
+    requests.Session, das SharedRateLimit-Budget mit Prioritäten, der
+    Profil-Cache und Metriken. Unterklassen implementieren nur
+    _fetch_by_login / _fetch_by_ids und ggf. _auth_headers / _on_unauthorized.
+    """
+
+    platform = ""
+    # Name des SharedRateLimit-Budgets (Default: platform)
+    rate_limit_name = ""
+    # Max. ids pro Upstream-Call
+    batch_size = 100
+    # Gefundene Profile im (shared) Cache; kurz, der Profil-Refresh gleicht ohnehin ab
+    cache_ttl = 5 * 60
+
+    # Interaktive Calls warten kaum auf Budget, Hintergrund-Jobs bis zum Bucket-Reset
+    max_wait = {Priority.INTERACTIVE: 1.0, Priority.BACKGROUND: 65.0}
+    timeout = {Priority.INTERACTIVE: 5, Priority.BACKGROUND: 20}
+
+    config_error = ProviderConfigError
+    not_found_error = ProviderNotFoundError
+    unavailable_error = ProviderUnavailable
+
+    def __init__(self):
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=32))
+        self.session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=32))
+        self.budget = SharedRateLimit(self.rate_limit_name or self.platform)
+        self.metrics = ProviderMetrics()
+
+    # --- Schnittstelle ---
+
+    def resolve(self, login: str, priority: Priority = Priority.INTERACTIVE) -> ProviderUser:
+        key = self._cache_key("login", login.lower())
+        cached = cache.get(key)
+        if cached is not None:
+            self.metrics.incr("cache_hits")
+            return ProviderUser(**cached)
+
+        self.metrics.incr("cache_misses")
+        user = self._fetch_by_login(login, priority)
+        if user is None:
+            raise self.not_found_error(f"{self.platform} user not found for login={login}")
+        self._cache_users([user])
+        return user
+
+    def resolve_batch(self, ids: list[str], priority: Priority = Priority.INTERACTIVE) -> dict[str, ProviderUser]:
+        """
+        {id: ProviderUser}; unbekannte/gesperrte ids fehlen im Ergebnis.
+        Beliebig viele ids, upstream in batch_size-Häppchen.
+        """
+        cached = cache.get_many([self._cache_key("id", i) for i in ids])
+        users = {}
+        for i in ids:
+            hit = cached.get(self._cache_key("id", i))
+            if hit is not None:
+                users[i] = ProviderUser(**hit)
+        self.metrics.incr("cache_hits", len(users))
+        self.metrics.incr("cache_misses", len(ids) - len(users))
+
+        users.update(self.refresh([i for i in ids if i not in users], priority))
+        return users
+
+    def refresh(self, ids: list[str], priority: Priority = Priority.BACKGROUND) -> dict[str, ProviderUser]:
+        """Wie resolve_batch, aber immer vom Upstream; aktualisiert den Cache."""
+        users = {}
+        for start in range(0, len(ids), self.batch_size):
+            users.update(self._fetch_by_ids(ids[start : start + self.batch_size], priority))
+        self._cache_users(users.values())
+        return users
+
+    # --- von Unterklassen zu implementieren ---
+
+    def _fetch_by_login(self, login: str, priority: Priority) -> Optional[ProviderUser]:
+        raise NotImplementedError
+
+    def _fetch_by_ids(self, ids: list[str], priority: Priority) -> dict[str, ProviderUser]:
+        raise NotImplementedError
+
+    def _auth_headers(self) -> dict:
+        return {}
+
+    def _on_unauthorized(self) -> None:
+        """401: z.B. gecachten App-Token verwerfen. Danach wird einmal wiederholt."""
+
+    # --- gemeinsamer HTTP-Pfad ---
+
+    def get_json(self, url: str, params, priority: Priority, retry_auth: bool = True) -> dict:
+        """
+        GET über das gemeinsame Rate-Limit-Budget und die gepoolte Session.
+        Kein Budget / 429 / 5xx / Timeout -> unavailable_error, 401/403 ->
+        config_error, übrige 4xx -> not_found_error; nie ein HTTPError.
+        """
+        headers = self._auth_headers()
+        try:
+            self.budget.acquire(priority, max_wait=self.max_wait[priority])
+        except RateLimitExhausted as e:
+            raise self.unavailable_error(str(e)) from e
+
+        started = time.perf_counter()
+        self.metrics.incr("requests")
+        try:
+            r = self.session.get(url, params=params, headers=headers, timeout=self.timeout[priority])
+        except requests.RequestException as e:
+            self.metrics.incr("errors")
+            raise self.unavailable_error(f"{self.platform} request failed: {e}") from e
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self.metrics.incr("request_ms", elapsed_ms)
+            logger.debug("%s GET %s %.1fms", self.platform, url, elapsed_ms)
+
+        if r.status_code == 429:
+            self.metrics.incr("errors")
+            self.budget.exhaust(r.headers)
+            raise self.unavailable_error(f"{self.platform} rate limit hit (429).")
+        self.budget.update(r.headers)
+        if r.status_code == 401 and retry_auth:
+            self._on_unauthorized()
+            return self.get_json(url, params, priority, retry_auth=False)
+        if r.status_code >= 500:
+            self.metrics.incr("errors")
+            raise self.unavailable_error(f"{self.platform} returned {r.status_code}")
+        if r.status_code in (401, 403):
+            # Auch nach neuem Token abgelehnt: Zugangsdaten/Berechtigung auf unserer Seite
+            self.metrics.incr("errors")
+            raise self.config_error(f"{self.platform} rejected credentials ({r.status_code}).")
+        if r.status_code >= 400:
+            # z.B. Helix 400 für einen Login mit ungültigen Zeichen: gibt es nicht, kein 500
+            self.metrics.incr("errors")
+            raise self.not_found_error(f"{self.platform} returned {r.status_code}: {r.text[:200]}")
+        return r.json()
+
+    def _cache_key(self, kind: str, value: str) -> str:
+        return f"provider:{self.platform}:{kind}:{value}"
+
+    def _cache_users(self, users) -> None:
+        entries = {}
+        for user in users:
+            entries[self._cache_key("id", user.id)] = asdict(user)
+            entries[self._cache_key("login", user.login.lower())] = asdict(user)
+        if entries:
+            cache.set_many(entries, self.cache_ttl)
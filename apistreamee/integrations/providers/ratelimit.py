@@ -0,0 +1,87 @@
+import math
+import time
+from enum import IntEnum
+
+from django.core.cache import cache
+
+
+class Priority(IntEnum):
+    INTERACTIVE = 0  # User wartet auf die Antwort (z.B. Community anlegen)
+    BACKGROUND = 1  # Cron/Poller, darf warten oder später weitermachen
+
+
+class RateLimitExhausted(RuntimeError):
+    def __init__(self, retry_after: float):
+        super().__init__(f"Rate limit exhausted, retry in {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+class SharedRateLimit:
+    """
+    Client-seitiges Budget auf Basis der Ratelimit-Limit/-Remaining/-Reset
+    Header eines Upstreams. Der Zustand liegt im Django-Cache (Redis in Prod),
+    damit alle Worker-Prozesse dasselbe Budget sehen.
+
+    Hintergrund-Calls lassen `background_reserve` des Limits für interaktive
+    Calls übrig; ist das Budget aufgebraucht, wird bis zum Reset gewartet,
+    sofern das innerhalb von `max_wait` passiert, sonst RateLimitExhausted.
+    """
+
+    def __init__(self, name: str, background_reserve: float = 0.2):
+        self.remaining_key = f"ratelimit:{name}:remaining"
+        self.reset_key = f"ratelimit:{name}:reset"
+        self.limit_key = f"ratelimit:{name}:limit"
+        self.background_reserve = background_reserve
+
+    def acquire(self, priority: Priority, max_wait: float) -> None:
+        deadline = time.monotonic() + max_wait
+        while True:
+            state = cache.get_many([self.remaining_key, self.reset_key, self.limit_key])
+            remaining = state.get(self.remaining_key)
+            reset_at = state.get(self.reset_key, 0.0)
+            now = time.time()
+
+            # Noch nie Header gesehen oder Bucket inzwischen aufgefüllt
+            if remaining is None or now >= reset_at:
+                return
+
+            floor = 0
+            if priority == Priority.BACKGROUND:
+                floor = math.ceil(state.get(self.limit_key, 0) * self.background_reserve)
+
+            if remaining > floor:
+                try:
+                    # Optimistisch reservieren, bevor die Antwort das Budget korrigiert
+                    cache.decr(self.remaining_key)
+                except ValueError:
+                    pass
+                return
+
+            wait = reset_at - now
+            if time.monotonic() + wait > deadline:
+                raise RateLimitExhausted(wait)
+            time.sleep(min(wait, 1.0))
+
+    def update(self, headers) -> None:
+        try:
+            limit = int(headers["Ratelimit-Limit"])
+            remaining = int(headers["Ratelimit-Remaining"])
+            reset_at = float(headers["Ratelimit-Reset"])
+        except (KeyError, ValueError):
+            return
+
+        ttl = max(1, math.ceil(reset_at - time.time())) + 5
+        cache.set_many(
+            {self.limit_key: limit, self.remaining_key: remaining, self.reset_key: reset_at},
+            timeout=ttl,
+        )
+
+    def exhaust(self, headers) -> None:
+        """429 bekommen: Budget bis zum Reset auf 0 setzen."""
+        self.update(headers)
+        now = time.time()
+        reset_at = cache.get(self.reset_key) or 0.0
+        if reset_at <= now:
+            reset_at = now + 1
+        ttl = math.ceil(reset_at - now) + 5
+        cache.set_many({self.remaining_key: 0, self.reset_key: reset_at}, timeout=ttl)
@@ -1,93 +1,142 @@
 import os
+import threading
 import time
 from dataclasses import dataclass
 from typing import Optional
 
 import requests
 
+from . import ProviderConfigError, ProviderNotFoundError, ProviderUnavailable, ProviderUser
+from .base import Provider
+from .ratelimit import Priority
+
 
 TWITCH_CLIENT_ID = os.getenv("TWITCH_CLIENT_ID")
 TWITCH_CLIENT_SECRET = os.getenv("TWITCH_CLIENT_SECRET")
 
+# Für Offline-Tests/Benchmarks auf scripts/fake_helix.py umbiegbar
+TWITCH_AUTH_BASE_URL = os.getenv("TWITCH_AUTH_BASE_URL", "https://id.twitch.tv").rstrip("/")
+TWITCH_HELIX_BASE_URL = os.getenv("TWITCH_HELIX_BASE_URL", "https://api.twitch.tv/helix").rstrip("/")
 
-@dataclass
-class TwitchUser:
-    id: str
-    login: str
-    display_name: str
-    profile_image_url: str
-
+# Helix erlaubt max. 100 id/login-Parameter pro /users bzw. /streams Call
+HELIX_BATCH_SIZE = 100
 
-# Simple in-memory cache (process lifetime)
-_APP_TOKEN: Optional[str] = None
-_APP_TOKEN_EXPIRES_AT: float = 0.0
+TwitchUser = ProviderUser
 
 
-class TwitchConfigError(RuntimeError):
-    pass
+@dataclass
+class TwitchStream:
+    user_id: str
+    viewer_count: int
+    started_at: str
 
 
-class TwitchNotFoundError(RuntimeError):
+class TwitchConfigError(ProviderConfigError):
     pass
 
 
-def _require_creds() -> None:
-    if not TWITCH_CLIENT_ID or not TWITCH_CLIENT_SECRET:
-        raise TwitchConfigError("Missing TWITCH_CLIENT_ID / TWITCH_CLIENT_SECRET env vars.")
-
+class TwitchNotFoundError(ProviderNotFoundError):
+    pass
 
-def _get_app_access_token() -> str:
-    """
-    Client Credentials flow token (App Access Token).
-    Cached in-memory with expiry buffer.
-    """
-    global _APP_TOKEN, _APP_TOKEN_EXPIRES_AT
-    _require_creds()
 
-    now = time.time()
-    if _APP_TOKEN and now < (_APP_TOKEN_EXPIRES_AT - 30):
-        return _APP_TOKEN
+class TwitchUnavailable(ProviderUnavailable):
+    """Rate-Limit erschöpft, Timeout oder 5xx: Twitch gerade nicht nutzbar."""
+    pass
 
-    r = requests.post(
-        "https://id.twitch.tv/oauth2/token",
-        params={
-            "client_id": TWITCH_CLIENT_ID,
-            "client_secret": TWITCH_CLIENT_SECRET,
-            "grant_type": "client_credentials",
-        },
-        timeout=20,
-    )
-    r.raise_for_status()
-    payload = r.json()
-    _APP_TOKEN = payload["access_token"]
-    # expires_in is seconds
-    _APP_TOKEN_EXPIRES_AT = now + int(payload.get("expires_in", 0))
-    return _APP_TOKEN
-
-
-def resolve_user_by_login(login: str) -> TwitchUser:
-    """
-    Helix: GET /users?login=<login>
-    Returns TwitchUser or raises TwitchNotFoundError.
-    """
-    token = _get_app_access_token()
-
-    r = requests.get(
-        "https://api.twitch.tv/helix/users",
-        params={"login": login},
-        headers={
-            "Authorization": f"Bearer {token}",
-            "Client-Id": TWITCH_CLIENT_ID,
-        },
-        timeout=20,
-    )
-    r.raise_for_status()
-    data = r.json().get("data", [])
-    if not data:
-        raise TwitchNotFoundError(f"Twitch user not found for login={login}")
 
-    u = data[0]
-    return TwitchUser(
+class TwitchProvider(Provider):
+    platform = "twitch"
+    rate_limit_name = "twitch-helix"
+    batch_size = HELIX_BATCH_SIZE
+
+    config_error = TwitchConfigError
+    not_found_error = TwitchNotFoundError
+    unavailable_error = TwitchUnavailable
+
+    def __init__(self):
+        super().__init__()
+        # App Access Token (Client Credentials), prozesslokal mit Ablaufzeit
+        self._app_token: Optional[str] = None
+        self._app_token_expires_at = 0.0
+        self._token_lock = threading.Lock()
+
+    def _auth_headers(self) -> dict:
+        return {"Authorization": f"Bearer {self._get_app_access_token()}", "Client-Id": TWITCH_CLIENT_ID}
+
+    def _on_unauthorized(self) -> None:
+        # Token widerrufen/abgelaufen -> beim Retry neu holen
+        self._app_token = None
+
+    def _get_app_access_token(self) -> str:
+        """
+        Client Credentials flow token (App Access Token).
+        Cached in-memory with expiry buffer.
+        """
+        if not TWITCH_CLIENT_ID or not TWITCH_CLIENT_SECRET:
+            raise TwitchConfigError("Missing TWITCH_CLIENT_ID / TWITCH_CLIENT_SECRET env vars.")
+
+        with self._token_lock:
+            now = time.time()
+            if self._app_token and now < (self._app_token_expires_at - 30):
+                return self._app_token
+
+            try:
+                r = self.session.post(
+                    f"{TWITCH_AUTH_BASE_URL}/oauth2/token",
+                    params={
+                        "client_id": TWITCH_CLIENT_ID,
+                        "client_secret": TWITCH_CLIENT_SECRET,
+                        "grant_type": "client_credentials",
+                    },
+                    timeout=20,
+                )
+            except requests.RequestException as e:
+                raise TwitchUnavailable(f"Twitch token request failed: {e}") from e
+            if r.status_code >= 500:
+                raise TwitchUnavailable(f"Twitch token endpoint returned {r.status_code}")
+            if r.status_code >= 400:
+                # Falsche Client-ID/Secret o.ä.: Konfiguration, kein 500
+                raise TwitchConfigError(f"Twitch token endpoint returned {r.status_code}: {r.text[:200]}")
+            payload = r.json()
+            self._app_token = payload["access_token"]
+            # expires_in is seconds
+            self._app_token_expires_at = now + int(payload.get("expires_in", 0))
+            return self._app_token
+
+    def _fetch_by_login(self, login: str, priority: Priority) -> Optional[ProviderUser]:
+        """Helix: GET /users?login=<login>"""
+        data = self.get_json(f"{TWITCH_HELIX_BASE_URL}/users", {"login": login}, priority).get("data", [])
+        return _user_from_payload(data[0]) if data else None
+
+    def _fetch_by_ids(self, ids: list[str], priority: Priority) -> dict[str, ProviderUser]:
+        """Helix: GET /users?id=<id>&id=<id>... (max. HELIX_BATCH_SIZE ids)"""
+        if not ids:
+            return {}
+        payload = self.get_json(f"{TWITCH_HELIX_BASE_URL}/users", [("id", i) for i in ids], priority)
+        users = (_user_from_payload(u) for u in payload.get("data", []))
+        return {u.id: u for u in users}
+
+    def fetch_live_streams(self, user_ids: list[str], priority: Priority = Priority.BACKGROUND) -> dict[str, TwitchStream]:
+        """
+        Helix: GET /streams?user_id=<id>&user_id=<id>...&type=live (max. HELIX_BATCH_SIZE ids)
+        Returns {user_id: TwitchStream} nur für User, die gerade live sind.
+        """
+        if len(user_ids) > HELIX_BATCH_SIZE:
+            raise ValueError(f"At most {HELIX_BATCH_SIZE} ids per Helix call.")
+        if not user_ids:
+            return {}
+
+        params = [("user_id", i) for i in user_ids] + [("type", "live"), ("first", HELIX_BATCH_SIZE)]
+        payload = self.get_json(f"{TWITCH_HELIX_BASE_URL}/streams", params, priority)
+        streams = (
+            TwitchStream(user_id=str(s["user_id"]), viewer_count=int(s.get("viewer_count", 0)), started_at=s["started_at"])
+            for s in payload.get("data", [])
+        )
+        return {s.user_id: s for s in streams}
+
+
+def _user_from_payload(u: dict) -> ProviderUser:
+    return ProviderUser(
         id=str(u["id"]),
         login=u["login"],
         display_name=u["display_name"],
@@ -1,3 +1,214 @@
-from django.test import TestCase
+import json
+import time
+import uuid
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+import requests
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from communities.models import Community
+
+from . import eventsub
+from .models import EventSubMessage
+from .providers import ProviderConfigError, ProviderNotFoundError, ProviderUnavailable, get_provider
+from .providers import twitch
+from .providers.ratelimit import Priority, RateLimitExhausted, SharedRateLimit
+
+SECRET = "test-secret"
+
+# Query-Counts und Latenzen: benchmarks.py (opt-in)
+
+
+def _notification(user_id: str, login: str) -> dict:
+    return {
+        "subscription": {"type": "user.update"},
+        "event": {"user_id": user_id, "user_login": login, "user_name": login.capitalize()},
+    }
+
+
+class EventSubClientMixin:
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.object(eventsub, "TWITCH_EVENTSUB_SECRET", SECRET)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def post_notification(self, payload: dict, message_id: str = None, sent_at=None, secret: str = SECRET):
+        body = json.dumps(payload).encode()
+        message_id = message_id or uuid.uuid4().hex
+        timestamp = (sent_at or timezone.now()).isoformat()
+        return self.client.post(
+            "/integrations/eventsub/",
+            data=body,
+            content_type="application/json",
+            headers={
+                eventsub.HEADER_ID: message_id,
+                eventsub.HEADER_TIMESTAMP: timestamp,
+                eventsub.HEADER_SIGNATURE: eventsub.sign(secret, message_id, timestamp, body),
+                eventsub.HEADER_TYPE: "notification",
+            },
+        )
+
+
+class EventSubWebhookTests(EventSubClientMixin, TestCase):
+    def test_webhook_rejects_bad_signature_and_stale_messages(self):
+        payload = _notification("1", "bench")
+        with self.assertLogs("integrations", "WARNING"):
+            self.assertEqual(self.post_notification(payload, secret="wrong-secret").status_code, 403)
+            stale = timezone.now() - eventsub.MAX_MESSAGE_AGE - timedelta(minutes=1)
+            self.assertEqual(self.post_notification(payload, sent_at=stale).status_code, 403)
+        self.assertFalse(EventSubMessage.objects.exists())
+
+
+class EventSubQueueTests(EventSubClientMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        owner = get_user_model().objects.create_user("eventsub", "eventsub@example.com", "pw-eventsub-1")
+        self.community = Community.objects.create(
+            name="Queue", external_id="42", external_login="old", external_display_name="Old", created_by=owner
+        )
+
+    def test_redelivery_is_queued_once_and_applied(self):
+        message_id = uuid.uuid4().hex
+        for _ in range(2):
+            self.assertEqual(self.post_notification(_notification("42", "new"), message_id=message_id).status_code, 204)
+        self.assertEqual(EventSubMessage.objects.count(), 1)
+
+        # Webhook wendet nichts an, erst der Worker
+        self.community.refresh_from_db()
+        self.assertEqual(self.community.external_login, "old")
+
+        self.assertEqual(eventsub.process_pending(), 1)
+        self.community.refresh_from_db()
+        self.assertEqual((self.community.external_login, self.community.external_display_name), ("new", "New"))
+        self.assertEqual(eventsub.process_pending(), 0)
+
+    def test_later_event_wins_and_unknown_types_are_marked(self):
+        self.post_notification(_notification("42", "first"))
+        self.post_notification(_notification("42", "second"))
+        self.post_notification({"subscription": {"type": "channel.follow"}, "event": {}})
+
+        with self.assertLogs("integrations", "WARNING"):
+            self.assertEqual(eventsub.process_pending(), 3)
+        self.community.refresh_from_db()
+        self.assertEqual(self.community.external_login, "second")
+        self.assertFalse(EventSubMessage.objects.filter(processed_at__isnull=True).exists())
+
+    def test_prune_keeps_unprocessed_and_recent(self):
+        self.post_notification(_notification("42", "new"))
+        eventsub.process_pending()
+        old = EventSubMessage.objects.create(message_id="old", payload={}, processed_at=timezone.now() - eventsub.RETENTION * 2)
+        EventSubMessage.objects.create(message_id="open", payload={})
+
+        self.assertEqual(eventsub.prune_processed(), 1)
+        self.assertFalse(EventSubMessage.objects.filter(pk=old.pk).exists())
+        self.assertEqual(EventSubMessage.objects.count(), 2)
+
+
+class SharedRateLimitTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.limit = SharedRateLimit("test")
+
+    def headers(self, remaining: int, reset_in: float, limit: int = 10) -> dict:
+        return {"Ratelimit-Limit": str(limit), "Ratelimit-Remaining": str(remaining), "Ratelimit-Reset": str(time.time() + reset_in)}
+
+    def test_no_budget_known_yet(self):
+        self.limit.acquire(Priority.BACKGROUND, max_wait=0)
+        # Kaputte Header ändern nichts
+        self.limit.update({"Ratelimit-Limit": "x"})
+        self.limit.acquire(Priority.BACKGROUND, max_wait=0)
+
+    def test_background_leaves_reserve_for_interactive(self):
+        self.limit.update(self.headers(remaining=3, reset_in=60))
+        self.limit.acquire(Priority.BACKGROUND, max_wait=0)
+        # 2 übrig = 20 % von 10: nur noch für interaktive Calls
+        with self.assertRaises(RateLimitExhausted) as ctx:
+            self.limit.acquire(Priority.BACKGROUND, max_wait=0)
+        self.assertAlmostEqual(ctx.exception.retry_after, 60, delta=1)
+        self.limit.acquire(Priority.INTERACTIVE, max_wait=0)
+        self.limit.acquire(Priority.INTERACTIVE, max_wait=0)
+        with self.assertRaises(RateLimitExhausted):
+            self.limit.acquire(Priority.INTERACTIVE, max_wait=0)
+
+    def test_waits_for_reset_within_max_wait(self):
+        self.limit.exhaust(self.headers(remaining=0, reset_in=0.3))
+        with self.assertRaises(RateLimitExhausted):
+            self.limit.acquire(Priority.INTERACTIVE, max_wait=0)
+        started = time.monotonic()
+        self.limit.acquire(Priority.BACKGROUND, max_wait=2)
+        self.assertGreater(time.monotonic() - started, 0.1)
+
+    def test_exhaust_without_reset_header_blocks_briefly(self):
+        self.limit.exhaust({})
+        with self.assertRaises(RateLimitExhausted) as ctx:
+            self.limit.acquire(Priority.INTERACTIVE, max_wait=0)
+        self.assertLessEqual(ctx.exception.retry_after, 1)
+
+
+class ProviderErrorTests(TestCase):
+    def test_client_errors_map_to_provider_errors(self):
+        provider = get_provider("twitch")
+        auth = mock.patch.object(type(provider), "_auth_headers", return_value={})
+        auth.start()
+        self.addCleanup(auth.stop)
+
+        def respond(status_code):
+            response = requests.Response()
+            response.status_code, response._content = status_code, b'{"message": "bad request"}'
+            return mock.patch.object(provider.session, "get", return_value=response)
+
+        # Helix 400 für einen Login mit ungültigen Zeichen -> nicht gefunden statt HTTPError/500
+        for status_code in (400, 404, 422):
+            with respond(status_code), self.assertRaises(ProviderNotFoundError):
+                provider.resolve(f"bad-login-{status_code}")
+        for status_code in (401, 403):
+            with respond(status_code), self.assertRaises(ProviderConfigError):
+                provider.resolve(f"bad-login-{status_code}")
+        with respond(503), self.assertRaises(ProviderUnavailable):
+            provider.resolve("bad-login-503")
+
+
+class TwitchTokenTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.provider = get_provider("twitch")
+        for name, value in (("TWITCH_CLIENT_ID", "client"), ("TWITCH_CLIENT_SECRET", "secret")):
+            patcher = mock.patch.object(twitch, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.provider._app_token = None
+        self.addCleanup(setattr, self.provider, "_app_token", None)
+
+    def response(self, status_code: int, payload: dict) -> requests.Response:
+        response = requests.Response()
+        response.status_code, response._content = status_code, json.dumps(payload).encode()
+        return response
+
+    def test_revoked_token_is_refetched_once(self):
+        tokens = [self.response(200, {"access_token": t, "expires_in": 3600}) for t in ("revoked", "fresh")]
+        user = {"id": "7", "login": "seven", "display_name": "Seven"}
+        helix = [self.response(401, {}), self.response(200, {"data": [user]})]
+        with mock.patch.object(self.provider.session, "post", side_effect=tokens) as post, \
+                mock.patch.object(self.provider.session, "get", side_effect=helix) as get:
+            self.assertEqual(self.provider.resolve("seven").id, "7")
+        self.assertEqual(post.call_count, 2)
+        self.assertEqual(get.call_args.kwargs["headers"]["Authorization"], "Bearer fresh")
+
+    def test_second_401_is_a_config_error(self):
+        tokens = [self.response(200, {"access_token": t, "expires_in": 3600}) for t in ("a", "b")]
+        with mock.patch.object(self.provider.session, "post", side_effect=tokens), \
+                mock.patch.object(self.provider.session, "get", return_value=self.response(401, {})) as get, \
+                self.assertRaises(ProviderConfigError):
+            self.provider.resolve("seven")
+        self.assertEqual(get.call_count, 2)
+
+    def test_rejected_client_credentials_are_a_config_error(self):
+        with mock.patch.object(self.provider.session, "post", return_value=self.response(400, {})):
+            with self.assertRaises(ProviderConfigError):
+                self.provider.resolve("seven")
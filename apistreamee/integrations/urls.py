@@ -0,0 +1,6 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path("eventsub/", views.eventsub_webhook, name="eventsub-webhook"),
+]
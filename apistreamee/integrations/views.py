@@ -1,3 +1,45 @@
-from django.shortcuts import render
+import json
+import logging
 
-# Create your views here.
+from django.http import HttpResponse, HttpResponseBadRequest, HttpResponseForbidden
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+
+from . import eventsub
+
+logger = logging.getLogger(__name__)
+
+
+@csrf_exempt
+@require_POST
+def eventsub_webhook(request):
+    """
+    Twitch EventSub Webhook. Prüft nur Signatur + Dedupe und legt die
+    Notification in die Queue; angewendet wird sie vom process_eventsub
+    Worker, damit wir sicher innerhalb von Twitchs Deadline antworten.
+    """
+    body = request.body
+    try:
+        eventsub.verify(request.headers, body)
+    except eventsub.EventSubSignatureError as e:
+        logger.warning("eventsub: rejected message: %s", e)
+        return HttpResponseForbidden()
+
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        return HttpResponseBadRequest()
+
+    message_type = request.headers.get(eventsub.HEADER_TYPE, "")
+    if message_type == "webhook_callback_verification":
+        return HttpResponse(payload.get("challenge", ""), content_type="text/plain")
+
+    if message_type == "revocation":
+        logger.warning("eventsub: subscription revoked: %s", payload.get("subscription"))
+        return HttpResponse(status=204)
+
+    if message_type == "notification":
+        if not eventsub.enqueue(request.headers[eventsub.HEADER_ID], payload):
+            logger.info("eventsub: duplicate message %s", request.headers[eventsub.HEADER_ID])
+
+    return HttpResponse(status=204)
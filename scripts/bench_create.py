@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Latency benchmark for POST /communities/ (Twitch login -> community).
+
+Intended to run offline against scripts/fake_helix.py, which can add
+latency, 5xx errors and rate limiting to the Helix side:
+
+    python scripts/fake_helix.py --latency-ms 80 --jitter-ms 30 &
+    (API started with TWITCH_AUTH_BASE_URL/TWITCH_HELIX_BASE_URL pointing at it)
+    python scripts/bench_create.py
+
+Every create uses a fresh random login, so nothing collides with existing
+communities. If FAKE_HELIX_URL is reachable, the upstream call counters
+are reset before and printed after the run (Helix calls per create).
+
+Env:
+    BASE_URL        default http://127.0.0.1:8000
+    FAKE_HELIX_URL  default http://127.0.0.1:8787
+    BENCH_CREATES   number of creates (default 100)
+    BENCH_OUT / BENCH_COMPARE   as in bench_memberships.py
+"""
+
+import json
+import os
+import sys
+import time
+import uuid
+from typing import Dict, List
+
+import requests
+
+from bench_memberships import BASE_URL, make_user, print_report, summarize
+
+FAKE_HELIX_URL = os.environ.get("FAKE_HELIX_URL", "http://127.0.0.1:8787").rstrip("/")
+CREATES = int(os.environ.get("BENCH_CREATES", "100"))
+
+
+def fake_stats(reset: bool = False):
+    try:
+        if reset:
+            requests.post(f"{FAKE_HELIX_URL}/_stats/reset", timeout=2)
+            return None
+        return requests.get(f"{FAKE_HELIX_URL}/_stats", timeout=2).json()
+    except requests.RequestException:
+        return None
+
+
+def main() -> int:
+    headers = {"Authorization": f"Bearer {make_user()}"}
+    fake_stats(reset=True)
+
+    samples: Dict[str, List[float]] = {}
+    statuses: Dict[int, int] = {}
+    for _ in range(CREATES):
+        login = f"bench{uuid.uuid4().hex[:12]}"
+        started = time.perf_counter()
+        r = requests.post(f"{BASE_URL}/communities/", json={"twitch": login}, headers=headers, timeout=30)
+        elapsed = (time.perf_counter() - started) * 1000
+        statuses[r.status_code] = statuses.get(r.status_code, 0) + 1
+        samples.setdefault("create" if r.status_code == 201 else f"create_{r.status_code}", []).append(elapsed)
+
+    report = summarize(samples)
+    baseline = {}
+    if os.environ.get("BENCH_COMPARE"):
+        with open(os.environ["BENCH_COMPARE"], encoding="utf-8") as fh:
+            baseline = json.load(fh)
+    print_report(report, baseline)
+    print(f"status codes: {statuses}")
+
+    stats = fake_stats()
+    if stats is not None:
+        calls = stats.get("users", 0) + stats.get("streams", 0) + stats.get("token", 0)
+        print(f"fake helix: {stats} ({calls / max(CREATES, 1):.2f} upstream calls per create)")
+
+    if os.environ.get("BENCH_OUT"):
+        with open(os.environ["BENCH_OUT"], "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    except AssertionError as e:
+        print(str(e))
+        sys.exit(1)
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+How long does swapping the membership unique constraint block writers?
+
+Builds a scratch copy of the membership layout (plain or hash-partitioned),
+starts a writer thread doing single-row inserts on its own connection and
+replaces UNIQUE (community_id, user_id) with the INCLUDE (role) variant twice:
+
+    blocking  ALTER TABLE ... DROP CONSTRAINT, ADD CONSTRAINT (what 0006 did)
+    online    partitioning.replace_unique_online (CONCURRENTLY, then USING INDEX / attach)
+
+Reports insert latency while each DDL runs plus the DDL wall time. The scratch
+table is dropped afterwards.
+
+    cd apistreamee
+    python ../scripts/bench_index_swap.py
+    BENCH_PARTITIONS=8 python ../scripts/bench_index_swap.py
+
+Env:
+    BENCH_ROWS          rows in the scratch table (default 2000000)
+    BENCH_PARTITIONS    hash partitions, 0 = plain table (default 0)
+"""
+
+import itertools
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "apistreamee"))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "apistreamee.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.db import connection, connections  # noqa: E402
+
+from bench_memberships import print_report, summarize  # noqa: E402
+from communities.services.partitioning import replace_unique_online  # noqa: E402
+
+ROWS = int(os.environ.get("BENCH_ROWS", "2000000"))
+PARTITIONS = int(os.environ.get("BENCH_PARTITIONS", "0"))
+TABLE = "bench_index_swap"
+CONSTRAINT = "bench_index_swap_uniq"
+INCLUDE = "(community_id, user_id) INCLUDE (role)"
+# Writer ids sit above the seeded rows and stay unique across both runs
+WRITER_IDS = itertools.count(10_000_000)
+
+
+def seed() -> None:
+    with connection.cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+        partitioned = " PARTITION BY HASH (community_id)" if PARTITIONS else ""
+        cursor.execute(
+            f"CREATE TABLE {TABLE} (id bigint GENERATED BY DEFAULT AS IDENTITY, community_id bigint NOT NULL, "
+            f"user_id bigint NOT NULL, role varchar(16) NOT NULL DEFAULT 'member'){partitioned}"
+        )
+        for i in range(PARTITIONS):
+            cursor.execute(
+                f"CREATE TABLE {TABLE}_p{i} PARTITION OF {TABLE} FOR VALUES WITH (MODULUS {PARTITIONS}, REMAINDER {i})"
+            )
+        cursor.execute(
+            f"INSERT INTO {TABLE} (community_id, user_id) "
+            f"SELECT g %% 5000, g / 5000 FROM generate_series(1, %s) g",
+            [ROWS],
+        )
+        cursor.execute(f"ALTER TABLE {TABLE} ADD CONSTRAINT {CONSTRAINT} UNIQUE (community_id, user_id)")
+        cursor.execute(f"ANALYZE {TABLE}")
+
+
+def reset() -> None:
+    with connection.cursor() as cursor:
+        cursor.execute(f"ALTER TABLE {TABLE} DROP CONSTRAINT {CONSTRAINT}")
+        cursor.execute(f"ALTER TABLE {TABLE} ADD CONSTRAINT {CONSTRAINT} UNIQUE (community_id, user_id)")
+
+
+def blocking() -> None:
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"ALTER TABLE {TABLE} DROP CONSTRAINT {CONSTRAINT}, ADD CONSTRAINT {CONSTRAINT} UNIQUE {INCLUDE}"
+        )
+
+
+def online() -> None:
+    with connection.cursor() as cursor:
+        replace_unique_online(cursor, TABLE, CONSTRAINT, INCLUDE)
+
+
+def run(name: str, ddl, samples: Dict[str, List[float]], ddl_ms: Dict[str, float]) -> None:
+    stop = threading.Event()
+    latencies: List[float] = []
+
+    def writer() -> None:
+        with connections["default"].cursor() as cursor:
+            while not stop.is_set():
+                user_id = next(WRITER_IDS)
+                started = time.perf_counter()
+                cursor.execute(f"INSERT INTO {TABLE} (community_id, user_id) VALUES (%s, %s)", [user_id % 5000, user_id])
+                latencies.append((time.perf_counter() - started) * 1000)
+        connections["default"].close()
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    time.sleep(0.5)
+    started = time.perf_counter()
+    ddl()
+    ddl_ms[name] = (time.perf_counter() - started) * 1000
+    time.sleep(0.5)
+    stop.set()
+    thread.join()
+    samples[f"insert_{name}"] = latencies
+
+
+def main() -> int:
+    print(f"rows={ROWS} partitions={PARTITIONS or 'none'}")
+    seed()
+    samples: Dict[str, List[float]] = {}
+    ddl_ms: Dict[str, float] = {}
+    try:
+        run("blocking", blocking, samples, ddl_ms)
+        reset()
+        run("online", online, samples, ddl_ms)
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+
+    print_report(summarize(samples), {})
+    for name, ms in ddl_ms.items():
+        worst = max(samples[f"insert_{name}"])
+        print(f"{name:<10} ddl {ms:>9.1f}ms   slowest insert {worst:>9.1f}ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
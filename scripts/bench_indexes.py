@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Database-level benchmark for the membership/community indexes.
+
+Seeds a synthetic data set inside a transaction, times single-row membership
+inserts and the hot lookups (membership role, admin checks, a user's
+communities, community by slug / platform+external_id), then rolls everything
+back. Nothing is left behind in the database.
+
+Compare two schema states by migrating in between:
+
+    cd apistreamee
+    python manage.py migrate communities 0005
+    BENCH_OUT=before.json python ../scripts/bench_indexes.py
+    python manage.py migrate communities
+    BENCH_OUT=after.json BENCH_COMPARE=before.json python ../scripts/bench_indexes.py
+
+Env:
+    BENCH_COMMUNITIES   synthetic communities (default 2000)
+    BENCH_USERS         synthetic users (default 5000)
+    BENCH_MEMBERSHIPS   memberships per user (default 20)
+    BENCH_LOOKUPS       timed lookups per query (default 2000)
+    BENCH_INSERTS       timed single-row inserts (default 2000)
+"""
+
+import json
+import os
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "apistreamee"))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "apistreamee.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.contrib.auth.models import User  # noqa: E402
+from django.db import connection, transaction  # noqa: E402
+
+from bench_memberships import print_report, summarize  # noqa: E402
+from communities.models import Community, CommunityMembership  # noqa: E402
+
+COMMUNITIES = int(os.environ.get("BENCH_COMMUNITIES", "2000"))
+USERS = int(os.environ.get("BENCH_USERS", "5000"))
+PER_USER = int(os.environ.get("BENCH_MEMBERSHIPS", "20"))
+LOOKUPS = int(os.environ.get("BENCH_LOOKUPS", "2000"))
+INSERTS = int(os.environ.get("BENCH_INSERTS", "2000"))
+
+QUERIES = {
+    "role_lookup": (
+        "SELECT role FROM communities_communitymembership WHERE community_id = %s AND user_id = %s",
+        "pair",
+    ),
+    "admin_check": (
+        "SELECT 1 FROM communities_communitymembership WHERE community_id = %s AND user_id = %s AND role = 'admin'",
+        "pair",
+    ),
+    "other_admin": (
+        "SELECT 1 FROM communities_communitymembership WHERE community_id = %s AND role = 'admin' AND user_id <> %s LIMIT 1",
+        "pair",
+    ),
+    "user_comms": (
+        "SELECT community_id FROM communities_communitymembership WHERE user_id = %s",
+        "user",
+    ),
+    "by_slug": ("SELECT id FROM communities_community WHERE slug = %s", "slug"),
+    "by_external": (
+        "SELECT id FROM communities_community WHERE platform = 'twitch' AND external_id = %s",
+        "external",
+    ),
+}
+
+
+class _Rollback(Exception):
+    pass
+
+
+def seed(rng: random.Random):
+    users = User.objects.bulk_create(
+        [User(username=f"bench_idx_{i}", email=f"bench_idx_{i}@example.com") for i in range(USERS + INSERTS)],
+        batch_size=5000,
+    )
+    communities = Community.objects.bulk_create(
+        [
+            Community(name=f"bench idx {i}", slug=f"bench-idx-{i}", external_id=f"bench-idx-{i}", created_by=users[0])
+            for i in range(COMMUNITIES)
+        ],
+        batch_size=5000,
+    )
+    community_ids = [c.pk for c in communities]
+    pairs = []
+    for user in users[:USERS]:
+        for community_id in rng.sample(community_ids, min(PER_USER, len(community_ids))):
+            pairs.append((community_id, user.pk))
+    CommunityMembership.objects.bulk_create(
+        [
+            CommunityMembership(community_id=c, user_id=u, role="admin" if rng.random() < 0.01 else "member")
+            for c, u in pairs
+        ],
+        batch_size=10000,
+    )
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE communities_communitymembership")
+        cursor.execute("ANALYZE communities_community")
+    return users, communities, pairs
+
+
+def run(rng: random.Random) -> Dict[str, List[float]]:
+    users, communities, pairs = seed(rng)
+    samples: Dict[str, List[float]] = {}
+    args = {
+        "pair": lambda: rng.choice(pairs),
+        "user": lambda: (rng.choice(users[:USERS]).pk,),
+        "slug": lambda: (rng.choice(communities).slug,),
+        "external": lambda: (rng.choice(communities).external_id,),
+    }
+
+    with connection.cursor() as cursor:
+        for op, (sql, kind) in QUERIES.items():
+            for _ in range(LOOKUPS):
+                params = args[kind]()
+                started = time.perf_counter()
+                cursor.execute(sql, params)
+                cursor.fetchall()
+                samples.setdefault(op, []).append((time.perf_counter() - started) * 1000)
+
+        # Single-row INSERTs like a synchronous join: every index adds cost here
+        for user in users[USERS:]:
+            started = time.perf_counter()
+            cursor.execute(
+                "INSERT INTO communities_communitymembership (community_id, user_id, role, joined_at)"
+                " VALUES (%s, %s, 'member', now())",
+                (rng.choice(communities).pk, user.pk),
+            )
+            samples.setdefault("insert", []).append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def main() -> int:
+    rng = random.Random(42)
+    print(f"communities={COMMUNITIES} users={USERS} memberships/user={PER_USER} lookups={LOOKUPS} inserts={INSERTS}")
+
+    samples: Dict[str, List[float]] = {}
+    try:
+        with transaction.atomic():
+            samples = run(rng)
+            raise _Rollback()
+    except _Rollback:
+        pass
+
+    report = summarize(samples)
+    baseline = {}
+    if os.environ.get("BENCH_COMPARE"):
+        with open(os.environ["BENCH_COMPARE"], encoding="utf-8") as fh:
+            baseline = json.load(fh)
+    print_report(report, baseline)
+
+    if os.environ.get("BENCH_OUT"):
+        with open(os.environ["BENCH_OUT"], "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Latency benchmark for membership-heavy endpoints (join, leave, detail, me/communities).
+
+Run it against the same server/database before and after a schema change
+(e.g. `partition_memberships swap`) and compare:
+
+    BENCH_OUT=before.json python scripts/bench_memberships.py
+    ... change ...
+    BENCH_OUT=after.json BENCH_COMPARE=before.json python scripts/bench_memberships.py
+
+Env:
+    BASE_URL        default http://127.0.0.1:8000
+    BENCH_USERS     number of fresh users that join/leave (default 20)
+    BENCH_ROUNDS    join/leave rounds per user (default 5)
+    COMMUNITY_ID    target community (default: first from GET /communities/)
+"""
+
+import json
+import os
+import statistics
+import sys
+import time
+import uuid
+from typing import Dict, List
+
+import requests
+
+BASE_URL = os.environ.get("BASE_URL", "http://127.0.0.1:8000").rstrip("/")
+USERS = int(os.environ.get("BENCH_USERS", "20"))
+ROUNDS = int(os.environ.get("BENCH_ROUNDS", "5"))
+PASSWORD = "StrongPassword123!"
+
+
+def percentile(samples: List[float], p: float) -> float:
+    ordered = sorted(samples)
+    k = min(len(ordered) - 1, max(0, int(round(p / 100 * (len(ordered) - 1)))))
+    return ordered[k]
+
+
+def summarize(samples: Dict[str, List[float]]) -> Dict[str, Dict[str, float]]:
+    return {
+        op: {
+            "n": len(values),
+            "p50_ms": round(statistics.median(values), 2),
+            "p95_ms": round(percentile(values, 95), 2),
+            "p99_ms": round(percentile(values, 99), 2),
+            "mean_ms": round(statistics.fmean(values), 2),
+        }
+        for op, values in samples.items()
+        if values
+    }
+
+
+def timed(samples: Dict[str, List[float]], op: str, method: str, url: str, **kwargs):
+    # One connection per request: keep-alive against runserver adds ~40ms (delayed ACK) and skews results
+    started = time.perf_counter()
+    r = requests.request(method, url, timeout=20, **kwargs)
+    samples.setdefault(op, []).append((time.perf_counter() - started) * 1000)
+    assert r.status_code < 400, f"{op} failed: {r.status_code} {r.text[:200]}"
+    return r
+
+
+def make_user() -> str:
+    username = f"bench_{uuid.uuid4().hex[:10]}"
+    email = f"{username}@example.com"
+    r = requests.post(
+        f"{BASE_URL}/auth/register/",
+        json={"username": username, "email": email, "password": PASSWORD},
+        timeout=20,
+    )
+    assert r.status_code == 201, f"Register failed: {r.status_code} {r.text}"
+    r = requests.post(f"{BASE_URL}/auth/login/", json={"email": email, "password": PASSWORD}, timeout=20)
+    assert r.status_code == 200, f"Login failed: {r.status_code} {r.text}"
+    return r.json()["access"]
+
+
+def target_community() -> Dict:
+    r = requests.get(f"{BASE_URL}/communities/", params={"fields": "id,slug"}, timeout=20)
+    assert r.status_code == 200, f"List failed: {r.status_code} {r.text}"
+    items = r.json()
+    wanted = os.environ.get("COMMUNITY_ID")
+    for item in items:
+        if wanted is None or str(item["id"]) == wanted:
+            return item
+    raise AssertionError("No community available to benchmark against.")
+
+
+def print_report(report: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]]) -> None:
+    width = max([16] + [len(op) + 2 for op in report])
+    print(f"{'op':<{width}}{'n':>6}{'p50':>10}{'p95':>10}{'p99':>10}{'Δp50':>10}")
+    for op, row in report.items():
+        delta = ""
+        if op in baseline:
+            before = baseline[op]["p50_ms"]
+            delta = f"{(row['p50_ms'] - before) / before * 100:+.1f}%" if before else ""
+        print(f"{op:<{width}}{row['n']:>6}{row['p50_ms']:>10}{row['p95_ms']:>10}{row['p99_ms']:>10}{delta:>10}")
+
+
+def main() -> int:
+    community = target_community()
+    cid, slug = community["id"], community["slug"]
+    print(f"BASE_URL={BASE_URL} community id={cid} slug={slug} users={USERS} rounds={ROUNDS}")
+
+    samples: Dict[str, List[float]] = {}
+    for _ in range(USERS):
+        headers = {"Authorization": f"Bearer {make_user()}"}
+        for _ in range(ROUNDS):
+            timed(samples, "join", "POST", f"{BASE_URL}/communities/{cid}/join/", headers=headers)
+            timed(samples, "detail", "GET", f"{BASE_URL}/communities/slug/{slug}/", headers=headers)
+            timed(samples, "me_communities", "GET", f"{BASE_URL}/me/communities/", headers=headers)
+            timed(samples, "leave", "POST", f"{BASE_URL}/communities/{cid}/leave/", headers=headers)
+
+    report = summarize(samples)
+
+    baseline = {}
+    if os.environ.get("BENCH_COMPARE"):
+        with open(os.environ["BENCH_COMPARE"], encoding="utf-8") as fh:
+            baseline = json.load(fh)
+    print_report(report, baseline)
+
+    if os.environ.get("BENCH_OUT"):
+        with open(os.environ["BENCH_OUT"], "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    except AssertionError as e:
+        print(str(e))
+        sys.exit(1)
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+In-process benchmark of the middleware chain for API requests.
+
+Runs the same requests through Django's test client twice: once with the
+classic full middleware list (sessions, CSRF, auth, messages, clickjacking
+for every path) and once with the configured settings, where API paths
+skip that stack (apistreamee.middleware.PathScopedMiddleware). No HTTP
+server is involved, so the difference is the per-request middleware cost.
+
+    python scripts/bench_middleware.py
+
+Env:
+    BENCH_REQUESTS   requests per path and mode (default 2000)
+    BENCH_PATHS      comma separated paths (default /communities/trending/,/communities/?fields=id)
+    BENCH_COOKIE     send a sessionid/csrftoken cookie like a browser that is logged into admin (default 1)
+"""
+
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "apistreamee"))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "apistreamee.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.test import Client, override_settings  # noqa: E402
+
+from bench_memberships import print_report, summarize  # noqa: E402
+
+REQUESTS = int(os.environ.get("BENCH_REQUESTS", "2000"))
+PATHS = os.environ.get("BENCH_PATHS", "/communities/trending/,/communities/?fields=id").split(",")
+COOKIE = os.environ.get("BENCH_COOKIE", "1") == "1"
+
+FULL_MIDDLEWARE = [
+    m for m in settings.MIDDLEWARE if m != "apistreamee.middleware.PathScopedMiddleware"
+] + list(settings.FULL_STACK_MIDDLEWARE)
+
+
+def run(mode: str) -> Dict[str, List[float]]:
+    client = Client()
+    if COOKIE:
+        client.cookies["sessionid"] = "bench-does-not-exist"
+        client.cookies["csrftoken"] = "x" * 32
+
+    samples: Dict[str, List[float]] = {}
+    for path in PATHS:
+        client.get(path)  # warm-up (caches, connection)
+        for _ in range(REQUESTS):
+            started = time.perf_counter()
+            r = client.get(path)
+            samples.setdefault(f"{mode} {path}", []).append((time.perf_counter() - started) * 1000)
+            assert r.status_code < 400, f"{path} failed: {r.status_code}"
+    return samples
+
+
+def main() -> int:
+    print(f"requests={REQUESTS} paths={PATHS} cookie={COOKIE}")
+    with override_settings(MIDDLEWARE=FULL_MIDDLEWARE, ALLOWED_HOSTS=["testserver"]):
+        full = summarize(run("full"))
+    with override_settings(ALLOWED_HOSTS=["testserver"]):
+        lean = summarize(run("lean"))
+
+    # Baseline per path is the full chain, so print_report shows the lean delta
+    baseline = {key.replace("full ", "lean ", 1): row for key, row in full.items()}
+    print_report({**full, **lean}, baseline)
+    return 0
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    except AssertionError as e:
+        print(str(e))
+        sys.exit(1)
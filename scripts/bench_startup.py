@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Cold-start benchmark: how long a fresh worker needs until it has answered
+its first request, and which imports that time goes into.
+
+Every run spawns a new interpreter that imports apistreamee.wsgi (settings,
+app registry, middleware) and pushes one request through the WSGI callable,
+like a gunicorn worker the autoscaler just started. No server or socket is
+involved. With --imports one extra run uses `python -X importtime` and prints
+the slowest packages (self time) and top-level imports (cumulative time).
+
+    BENCH_OUT=before.json python scripts/bench_startup.py --imports
+    ... change ...
+    BENCH_OUT=after.json BENCH_COMPARE=before.json python scripts/bench_startup.py
+
+Env:
+    BENCH_RUNS      fresh processes to spawn (default 15)
+    BENCH_PATH      first request (default /auth/me/, answers 401 without touching the database)
+    BENCH_TOP       rows in the import breakdown (default 20)
+    DJANGO_SETTINGS_MODULE  passed through (default apistreamee.settings)
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List
+
+from bench_memberships import print_report, summarize
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent / "apistreamee"
+RUNS = int(os.environ.get("BENCH_RUNS", "15"))
+PATH = os.environ.get("BENCH_PATH", "/auth/me/")
+TOP = int(os.environ.get("BENCH_TOP", "20"))
+
+# Modules whose presence after setup / after the first request is reported
+WATCHED = [
+    "rest_framework.views",
+    "communities.views",
+    "django.contrib.auth.admin",
+    "requests",
+    "integrations.providers.twitch",
+    "dotenv",
+]
+
+CHILD = r"""
+import io, json, os, sys, time
+started = time.perf_counter()
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "apistreamee.settings")
+from apistreamee.wsgi import application
+ready = time.perf_counter()
+after_setup = set(sys.modules)
+status = []
+environ = {
+    "REQUEST_METHOD": "GET", "PATH_INFO": sys.argv[1], "QUERY_STRING": "",
+    "SERVER_NAME": "127.0.0.1", "SERVER_PORT": "80", "HTTP_HOST": "127.0.0.1",
+    "wsgi.input": io.BytesIO(), "wsgi.url_scheme": "http", "wsgi.errors": sys.stderr,
+}
+b"".join(application(environ, lambda s, h: status.append(s)))
+first = time.perf_counter()
+b"".join(application(dict(environ, **{"wsgi.input": io.BytesIO()}), lambda s, h: None))
+second = time.perf_counter()
+watched = sys.argv[2].split(",")
+cpu = os.times()
+print(json.dumps({
+    "wall_end": time.time(),
+    "cpu_ms": (cpu.user + cpu.system) * 1000,
+    "setup_ms": (ready - started) * 1000,
+    "first_request_ms": (first - ready) * 1000,
+    "warm_request_ms": (second - first) * 1000,
+    "status": status[0],
+    "modules": len(sys.modules),
+    "at_setup": [m for m in watched if m in after_setup],
+    "at_first_request": [m for m in watched if m in sys.modules],
+}))
+"""
+
+
+def spawn(extra_args: List[str] = ()) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *extra_args, "-c", CHILD, PATH, ",".join(WATCHED)],
+        cwd=PROJECT_DIR,
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+
+
+def run_once(samples: Dict[str, List[float]]) -> dict:
+    spawned = time.time()
+    proc = spawn()
+    assert proc.returncode == 0, f"worker failed:\n{proc.stderr}"
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    samples.setdefault("setup", []).append(result["setup_ms"])
+    samples.setdefault("first_request", []).append(result["first_request_ms"])
+    samples.setdefault("warm_request", []).append(result["warm_request_ms"])
+    # Incl. interpreter start: what the autoscaler actually waits for
+    samples.setdefault("time_to_first_response", []).append((result["wall_end"] - spawned) * 1000)
+    # CPU time of the worker up to that point; far less sensitive to other load on the machine
+    samples.setdefault("cpu_to_first_response", []).append(result["cpu_ms"])
+    return result
+
+
+def import_breakdown() -> None:
+    proc = spawn(["-X", "importtime"])
+    assert proc.returncode == 0, f"worker failed:\n{proc.stderr}"
+
+    by_package: Dict[str, int] = defaultdict(int)
+    top_level = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        by_package[name.strip().split(".")[0]] += int(self_us)
+        # Indentation marks nesting; unindented rows are what the code imported directly
+        if not name.startswith(" "):
+            top_level.append((int(cumulative_us), name.strip()))
+
+    total = sum(by_package.values())
+    print(f"\nimports total {total / 1000:.1f}ms self time")
+    print(f"{'package (self time)':<36}{'ms':>10}{'share':>8}")
+    for package, us in sorted(by_package.items(), key=lambda kv: -kv[1])[:TOP]:
+        print(f"{package:<36}{us / 1000:>10.1f}{us / total * 100:>7.1f}%")
+    print(f"\n{'top-level import (cumulative)':<50}{'ms':>10}")
+    for us, name in sorted(top_level, reverse=True)[:TOP]:
+        print(f"{name:<50}{us / 1000:>10.1f}")
+
+
+def main() -> int:
+    print(f"runs={RUNS} path={PATH} settings={os.environ.get('DJANGO_SETTINGS_MODULE', 'apistreamee.settings')}")
+    samples: Dict[str, List[float]] = {}
+    results = [run_once(samples) for _ in range(RUNS)]
+    report = summarize(samples)
+
+    baseline = {}
+    if os.environ.get("BENCH_COMPARE"):
+        with open(os.environ["BENCH_COMPARE"], encoding="utf-8") as fh:
+            baseline = json.load(fh)
+    print_report(report, baseline)
+
+    last = results[-1]
+    print(f"\nstatus={last['status']!r} modules={statistics.median(r['modules'] for r in results):.0f}")
+    for module in WATCHED:
+        when = "setup" if module in last["at_setup"] else "first request" if module in last["at_first_request"] else "-"
+        print(f"  {module:<36} loaded at: {when}")
+
+    if "--imports" in sys.argv[1:]:
+        import_breakdown()
+
+    if os.environ.get("BENCH_OUT"):
+        with open(os.environ["BENCH_OUT"], "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    except AssertionError as e:
+        print(str(e))
+        sys.exit(1)
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Twitch OAuth token endpoint and the Helix
+/users and /streams endpoints, for offline smoke tests and benchmarks.
+
+    python scripts/fake_helix.py --latency-ms 80 --jitter-ms 40 --error-rate 0.02 --ratelimit 800
+
+Point the API at it (any non-empty client id/secret is accepted):
+
+    TWITCH_CLIENT_ID=fake TWITCH_CLIENT_SECRET=fake \\
+    TWITCH_AUTH_BASE_URL=http://127.0.0.1:8787 \\
+    TWITCH_HELIX_BASE_URL=http://127.0.0.1:8787/helix \\
+    python manage.py runserver
+
+Users are synthetic and deterministic: every login resolves to a stable
+numeric id (logins starting with "missing" return no data, like a banned
+or unknown account), every id resolves back to its login if it was seen
+before, otherwise to "user_<id>". Whether a user is live is a stable
+function of the id and --live-rate.
+
+Rate limiting mimics Helix: a bucket of --ratelimit points refilled every
+--ratelimit-window seconds, reported via Ratelimit-Limit/-Remaining/-Reset
+and answered with 429 once empty. GET /_stats returns request counters;
+POST /_stats/reset clears them.
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+
+def stable_int(value: str) -> int:
+    return int(hashlib.sha1(value.encode()).hexdigest()[:12], 16)
+
+
+class FakeHelix:
+    def __init__(self, args):
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.lock = threading.Lock()
+        self.logins_by_id = {}
+        self.tokens = set()
+        self.stats = Counter()
+        self.bucket_remaining = args.ratelimit
+        self.bucket_reset = time.time() + args.ratelimit_window
+
+    # --- behaviour knobs ---
+
+    def delay(self) -> None:
+        latency = self.args.latency_ms + self.rng.uniform(-self.args.jitter_ms, self.args.jitter_ms)
+        if latency > 0:
+            time.sleep(latency / 1000)
+
+    def roll_error(self):
+        with self.lock:
+            roll = self.rng.random()
+        if roll < self.args.error_rate:
+            return self.rng.choice((500, 502, 503))
+        return None
+
+    def take_point(self):
+        """Returns (allowed, headers)."""
+        if not self.args.ratelimit:
+            return True, {}
+        with self.lock:
+            now = time.time()
+            if now >= self.bucket_reset:
+                self.bucket_remaining = self.args.ratelimit
+                self.bucket_reset = now + self.args.ratelimit_window
+            allowed = self.bucket_remaining > 0
+            if allowed:
+                self.bucket_remaining -= 1
+            headers = {
+                "Ratelimit-Limit": str(self.args.ratelimit),
+                "Ratelimit-Remaining": str(self.bucket_remaining),
+                "Ratelimit-Reset": str(int(self.bucket_reset)),
+            }
+        return allowed, headers
+
+    # --- synthetic data ---
+
+    def user_for_login(self, login: str):
+        if login.lower().startswith("missing"):
+            return None
+        user_id = str(stable_int(login.lower()) % 10**9)
+        with self.lock:
+            self.logins_by_id[user_id] = login.lower()
+        return self.user_payload(user_id, login.lower())
+
+    def user_for_id(self, user_id: str):
+        with self.lock:
+            login = self.logins_by_id.get(user_id, f"user_{user_id}")
+        return self.user_payload(user_id, login)
+
+    @staticmethod
+    def user_payload(user_id: str, login: str) -> dict:
+        return {
+            "id": user_id,
+            "login": login,
+            "display_name": login.capitalize(),
+            "type": "",
+            "broadcaster_type": "",
+            "description": "",
+            "profile_image_url": f"https://static-cdn.example/{user_id}-profile_image-300x300.png",
+            "offline_image_url": "",
+            "created_at": "2016-01-01T00:00:00Z",
+        }
+
+    def stream_for_id(self, user_id: str):
+        h = stable_int(f"live:{user_id}")
+        if (h % 10_000) / 10_000 >= self.args.live_rate:
+            return None
+        started = datetime.now(timezone.utc) - timedelta(minutes=h % 600)
+        return {
+            "id": str(h % 10**11),
+            "user_id": user_id,
+            "user_login": self.logins_by_id.get(user_id, f"user_{user_id}"),
+            "type": "live",
+            "viewer_count": h % 50_000,
+            "started_at": started.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        }
+
+
+def make_handler(fake: FakeHelix):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, fmt, *args):
+            if fake.args.verbose:
+                super().log_message(fmt, *args)
+
+        def send_json(self, status: int, body, headers=None):
+            raw = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(raw)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(raw)
+
+        def do_POST(self):
+            url = urlsplit(self.path)
+            length = int(self.headers.get("Content-Length") or 0)
+            form = parse_qs(self.rfile.read(length).decode()) if length else {}
+            query = {**parse_qs(url.query), **form}
+
+            if url.path == "/_stats/reset":
+                fake.stats.clear()
+                return self.send_json(200, {"ok": True})
+            if url.path != "/oauth2/token":
+                return self.send_json(404, {"error": "Not Found", "status": 404})
+
+            fake.stats["token"] += 1
+            fake.delay()
+            status = fake.roll_error()
+            if status:
+                fake.stats[f"token_{status}"] += 1
+                return self.send_json(status, {"error": "Internal Server Error", "status": status})
+            if not query.get("client_id") or not query.get("client_secret"):
+                return self.send_json(400, {"status": 400, "message": "missing client id"})
+            if query.get("grant_type") != ["client_credentials"]:
+                return self.send_json(400, {"status": 400, "message": "unsupported grant type"})
+
+            token = uuid.uuid4().hex
+            fake.tokens.add(token)
+            self.send_json(200, {"access_token": token, "expires_in": fake.args.token_ttl, "token_type": "bearer"})
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            query = parse_qs(url.query)
+
+            if url.path == "/_stats":
+                return self.send_json(200, dict(fake.stats))
+            if url.path not in ("/helix/users", "/helix/streams"):
+                return self.send_json(404, {"error": "Not Found", "status": 404})
+
+            endpoint = url.path.rsplit("/", 1)[-1]
+            fake.stats[endpoint] += 1
+
+            auth = self.headers.get("Authorization", "")
+            if not self.headers.get("Client-Id") or auth[len("Bearer "):] not in fake.tokens:
+                fake.stats[f"{endpoint}_401"] += 1
+                return self.send_json(401, {"error": "Unauthorized", "status": 401, "message": "Invalid OAuth token"})
+
+            allowed, headers = fake.take_point()
+            if not allowed:
+                fake.stats[f"{endpoint}_429"] += 1
+                return self.send_json(429, {"error": "Too Many Requests", "status": 429}, headers)
+
+            fake.delay()
+            status = fake.roll_error()
+            if status:
+                fake.stats[f"{endpoint}_{status}"] += 1
+                return self.send_json(status, {"error": "Internal Server Error", "status": status}, headers)
+
+            if endpoint == "users":
+                ids, logins = query.get("id", []), query.get("login", [])
+                if len(ids) + len(logins) > 100:
+                    return self.send_json(400, {"status": 400, "message": "too many ids/logins"}, headers)
+                users = [fake.user_for_login(login) for login in logins] + [fake.user_for_id(i) for i in ids]
+                data = [u for u in users if u]
+            else:
+                user_ids = query.get("user_id", [])
+                if len(user_ids) > 100:
+                    return self.send_json(400, {"status": 400, "message": "too many user_ids"}, headers)
+                data = [s for s in (fake.stream_for_id(i) for i in user_ids) if s]
+
+            self.send_json(200, {"data": data, "pagination": {}}, headers)
+
+    return Handler
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="mean added latency per request")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="uniform +/- jitter around --latency-ms")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with 5xx")
+    parser.add_argument("--ratelimit", type=int, default=800, help="points per window, 0 disables rate limiting")
+    parser.add_argument("--ratelimit-window", type=float, default=60.0)
+    parser.add_argument("--live-rate", type=float, default=0.1, help="share of users reported as live")
+    parser.add_argument("--token-ttl", type=int, default=3600)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(FakeHelix(args)))
+    print(f"fake Helix on http://{args.host}:{args.port} (helix base http://{args.host}:{args.port}/helix)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -6,7 +6,8 @@ Smoke test for Communities endpoints.
 Behavior:
 - Runs all steps best-effort (does not stop on first failure).
 - Collects failures and prints a summary at the end.
-- Attempts CREATE community (may be skipped if Twitch not configured).
+- Attempts CREATE community (skipped only if Twitch credentials are missing;
+  offline runs can point the API at scripts/fake_helix.py).
 - Subsequent tests use an EXISTING community first:
     1) Prefer the manually created community (default slug: "testcommunity")
     2) Otherwise pick the first community from GET /communities/
@@ -95,28 +96,12 @@ def auth_headers(token: str) -> Dict[str, str]:
 
 
 def is_twitch_not_configured(sc: int, data: Any) -> bool:
-    if isinstance(data, dict):
-        msg = _pretty(data).lower()
-        if "twitch" in msg and (
-            "not configured" in msg
-            or "missing twitch_client_id" in msg
-            or "missing twitch_client_secret" in msg
-        ):
-            return True
-        if "missing twitch_client_id" in msg or "missing twitch_client_secret" in msg:
-            return True
-
-    if isinstance(data, str):
-        s = data.lower()
-        if "twitchconfigerror" in s and "missing twitch_client_id" in s:
-            return True
-        if "missing twitch_client_id" in s or "missing twitch_client_secret" in s:
-            return True
-
-    if sc == 503:
-        return True
-
-    return False
+    """
+    Only the explicit config error from the serializer counts as "skip".
+    503 (Twitch unavailable) is a real failure; run scripts/fake_helix.py
+    for offline runs instead of skipping the create step.
+    """
+    return sc == 400 and "not configured" in _pretty(data).lower()
 
 
 def run_step(results: List[StepResult], name: str, fn: Callable[[], Any]) -> Any:
@@ -208,7 +193,8 @@ def patch_community(cfg: Config, token: str, community_id: int) -> Dict[str, Any
 def join_community(cfg: Config, token: str, community_id: int) -> None:
     url = f"{cfg.base_url}/communities/{community_id}/join/"
     sc, data = request_json("POST", url, headers=auth_headers(token), timeout_s=cfg.timeout_s)
-    if sc not in (200, 201):
+    # 202: buffered join (COMMUNITY_JOIN_BUFFER_MS > 0)
+    if sc not in (200, 201, 202):
         raise SmokeFail(f"POST /communities/{community_id}/join/ failed {sc}\n{_pretty(data)}")
 
 